@@ -103,6 +103,17 @@ def integration(session: Session, shell: str) -> None:
     )
 
 
+@nox.session(python=False)
+def benchmark(session: Session) -> None:
+    session.run(
+        "poetry",
+        "run",
+        "python",
+        f'{BASEPATH / "test" / "benchmark" / "bench.py"}',
+        *session.posargs,
+    )
+
+
 @nox.session(python=False)
 def mypy(session: Session) -> None:
     session.run(
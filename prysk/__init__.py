@@ -1,10 +1,14 @@
 """Functional testing framework for command line applications"""
 import sys
 
-import prysk.cli
+__version__ = "0.20.0"
 
 
 def main():
+    # Imported here, so that importing prysk (e.g. prysk.test) doesn't load
+    # the command line interface
+    import prysk.cli
+
     try:
         sys.exit(prysk.cli.main())
     except (BrokenPipeError, KeyboardInterrupt):
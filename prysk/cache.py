@@ -0,0 +1,230 @@
+"""Caches of passing test results and parsed test files"""
+
+import hashlib
+import marshal
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+from prysk import __version__
+from prysk.parse import (
+    ParsedTest,
+    parse,
+)
+from prysk.test import Result
+from prysk.trace import span
+
+__all__ = ["ParseCache", "ResultCache", "runcached"]
+
+# Bump whenever the cache key or the entry format changes
+_FORMAT = b"prysk-cache-1"
+_PARSE_FORMAT = b"prysk-parse-cache-2"
+
+# Header lines declaring files (globs relative to the test file) the
+# outcome of a test depends on, e.g.: prysk-depends: ../src/*.py
+_DEPENDS = re.compile(rb"^prysk-depends:(.*)$")
+
+
+def _dependencies(content, indent=2):
+    r"""Yield the dependency patterns declared in the header of a test.
+
+    The header consists of all lines before the first command.
+
+    >>> list(_dependencies(b'prysk-depends: a.py b/*.sh\n\n  $ true\n'))
+    ['a.py', 'b/*.sh']
+    >>> list(_dependencies(b'  $ true\nprysk-depends: a.py\n'))
+    []
+    """
+    cmdline = b" " * indent + b"$ "
+    for line in content.splitlines():
+        if line.startswith(cmdline):
+            return
+        match = _DEPENDS.match(line)
+        if match:
+            yield from (os.fsdecode(p) for p in match.group(1).split())
+
+
+class ResultCache:
+    """Directory based store of passing test results.
+
+    Each entry is a file named after the cache key of a test, containing the
+    actual output of the test. Entries are evicted once they haven't been
+    used for max_age seconds, or when the cache exceeds max_size bytes
+    (least recently used first).
+    """
+
+    def __init__(self, directory, max_age=None, max_size=None):
+        self.directory = Path(directory)
+        self.max_age = max_age
+        self.max_size = max_size
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, path, content, shell, **options):
+        """Compute the cache key of the test at path with content.
+
+        The key covers the version of prysk, the test itself, the shell
+        (including its options), all settings influencing the outcome of
+        the test (options) and the dependencies declared in the header of
+        the test.
+        """
+        digest = hashlib.sha256(_FORMAT)
+
+        def update(*values):
+            for value in values:
+                value = value if isinstance(value, bytes) else f"{value}".encode()
+                digest.update(b"%d:" % len(value))
+                digest.update(value)
+
+        # Escaping, matching and normalization may change between versions
+        update(__version__)
+        update(content)
+        update(*shell)
+        for name, value in sorted(options.items()):
+            update(name, value)
+
+        testdir = Path(path).resolve().parent
+        indent = options.get("indent", 2)
+        for pattern in _dependencies(content, indent):
+            matches = sorted(p for p in testdir.glob(pattern) if p.is_file())
+            update(pattern, len(matches))
+            for match in matches:
+                update(os.path.relpath(match, testdir), match.read_bytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached output for key, or None if there is none"""
+        entry = self.directory / key
+        try:
+            with open(entry, "rb") as f:
+                postout = f.read()
+            os.utime(entry)
+        except OSError:
+            return None
+        return postout.splitlines(True)
+
+    def put(self, key, postout):
+        """Store the output of a passing test under key"""
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.writelines(postout)
+            os.replace(tmp, self.directory / key)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def evict(self):
+        """Remove entries exceeding the configured age or size limits"""
+        entries = []
+        for entry in self.directory.iterdir():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort(reverse=True)
+
+        now, size = time.time(), 0
+        for mtime, entry_size, entry in entries:
+            size += entry_size
+            expired = self.max_age is not None and now - mtime > self.max_age
+            oversized = self.max_size is not None and size > self.max_size
+            if expired or oversized:
+                try:
+                    entry.unlink()
+                except OSError:
+                    pass
+
+
+class ParseCache:
+    """Directory based store of parsed test files.
+
+    There is one entry per test file and parse settings, which is only used
+    while the modification time and size of the file are unchanged.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def parse(self, file, indent=2, dos2unix=False):
+        """Return the ParsedTest of file (an open binary file object)"""
+        stat = os.fstat(file.fileno())
+        name = hashlib.sha256(
+            b"%s\0%s\0%d\0%d"
+            % (_PARSE_FORMAT, os.fsencode(os.path.abspath(file.name)), indent, dos2unix)
+        ).hexdigest()
+        entry = self.directory / name
+        version = (_PARSE_FORMAT, stat.st_mtime_ns, stat.st_size)
+        try:
+            with open(entry, "rb") as f:
+                cached = marshal.loads(f.read())
+            if cached[0] == version:
+                return ParsedTest.fromtuple(cached[1])
+        except (OSError, EOFError, ValueError, TypeError, IndexError):
+            pass
+
+        parsed = parse(file, indent, dos2unix)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(marshal.dumps((version, parsed.astuple())))
+            os.replace(tmp, entry)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return parsed
+
+
+def _refout(content, dos2unix=False):
+    """Split test content into lines the same way test() does"""
+    lines = []
+    for line in content.splitlines(True):
+        if dos2unix and line.endswith(b"\r\n"):
+            line = line[:-2] + b"\n"
+        elif not line.endswith(b"\n"):
+            line += b"\n"
+        lines.append(line)
+    return lines
+
+
+def runcached(tests, cache, shell, **options):
+    """Run tests, skipping the ones with a cached passing result.
+
+    tests should be a sequence of 2-tuples containing the following:
+
+        (test path, test function)
+
+    This function yields a new sequence where each test function is wrapped
+    with a function that looks up the test in the cache first. If it is
+    found, its cached result is returned without running the test.
+    Otherwise, the test is run and stored in the cache in case it passes.
+
+    options are the settings which influence the outcome of a test
+    (e.g. indent, cleanenv, dos2unix and escape7bit).
+    """
+    for path, test in tests:
+
+        def testwrapper(path=path, test=test):
+            """Run test unless it is cached"""
+            start = time.monotonic()
+            with span("cache lookup", path=f"{path}"):
+                with open(path, "rb") as f:
+                    content = f.read()
+                key = cache.key(path, content, shell, **options)
+                postout = cache.get(key)
+            if postout is not None:
+                refout = _refout(content, options.get("dos2unix", False))
+                duration = time.monotonic() - start
+                return Result(refout, postout, [], cached=True, duration=duration)
+
+            result = test()
+            refout, postout, diff = result
+            passed = not diff and result.timeout is None
+            if refout is not None and postout is not None and passed:
+                cache.put(key, postout)
+            return result
+
+        yield path, testwrapper
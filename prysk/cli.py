@@ -1,29 +1,33 @@
 """The command line interface implementation"""
 
-import argparse
-import configparser
+import heapq
 import os
 import shlex
-import shutil
+import signal
 import stat
 import sys
-import tempfile
-from collections import defaultdict
 from functools import partial
 from pathlib import Path
-from shutil import which
 
-from rich.console import Console
+from prysk import __version__
 
-from prysk.process import execute
-from prysk.settings import (
-    merge_settings,
-    settings_from,
+# Only modules needed for parsing the command line are imported up front,
+# everything else is imported where it's used, so that prysk starts
+# quickly (e.g. for --version or a single test).
+from prysk.options import (
+    ArgumentParser,
+    env_args,
+    load,
 )
-from prysk.test import runtests
-from prysk.xunit import runxunit
 
-VERSION = "0.20.0"
+VERSION = __version__
+
+# ANSI escape sequences for coloring diff lines by their first character
+_DIFF_COLORS = {b"+": b"\x1b[32m", b"-": b"\x1b[31m", b"@": b"\x1b[35m"}
+_RESET = b"\x1b[0m"
+
+# Diff output is written in batches of (at least) this many bytes
+_WRITE_SIZE = 64 * 1024
 
 
 class ExitCode:
@@ -48,39 +52,6 @@ def main(argv=None):
     return _Cli().main(argv)
 
 
-def load(config, supported, section="prysk"):
-    """
-    Load configuration options from a init style format config file.
-
-    :param supported: iterable of supported options and their type which should be collected.
-    :param section: which contains the options.
-    """
-    parser = configparser.ConfigParser()
-    parser.read(config)
-    dispatcher = defaultdict(
-        lambda: (parser.get, "--{}: invalid value: {!r}"),
-        {
-            bool: (parser.getboolean, "--{}: invalid boolean value: {!r}"),
-            int: (parser.getint, "--{}: invalid integer value: {!r}"),
-        },
-    )
-    if not parser.has_section(section):
-        return {}
-
-    config = {}
-    for _type, option in supported:
-        if not parser.has_option(section, option):
-            continue
-        try:
-            fetch, error_msg = dispatcher[_type]
-            config[option] = fetch(section, option)
-        except ValueError as ex:
-            fetch, error_msg = dispatcher[_type]
-            value = parser.get(section, option)
-            raise ValueError(error_msg.format(option, value)) from ex
-    return config
-
-
 def _conflicts(settings):
     conflicts = [
         ("--yes", settings.yes, "--no", settings.no),
@@ -89,6 +60,9 @@ def _conflicts(settings):
         ("--debug", settings.debug, "--interactive", settings.interactive),
         ("--debug", settings.debug, "--verbose", settings.verbose),
         ("--debug", settings.debug, "--xunit-file", settings.xunit_file),
+        ("--debug", settings.debug, "--json-lines", settings.json_lines),
+        ("--debug", settings.debug, "--update", settings.update),
+        ("--interactive", settings.interactive, "--update", settings.update),
     ]
     for option1, value1, option2, value2 in conflicts:
         if value1 and value2:
@@ -96,145 +70,22 @@ def _conflicts(settings):
     return None
 
 
-def _env_args(var, env=None):
-    env = env if env else os.environ
-    args = env.get(var, "").strip()
-    return shlex.split(args)
-
-
-class _ArgumentParser:
-    """argparse.Argumentparser compatible argument parser.
-
-    Allows inspection of options supported by the parser"""
-
-    @classmethod
-    def create_parser(cls):
-        parser = cls(
-            usage="prysk [OPTIONS] TESTS...",
-            prog="prysk",
-            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
-        )
-        parser.add_argument(
-            "tests",
-            metavar="TESTS",
-            type=Path,
-            nargs="+",
-            help="Path(s) to the tests to be executed",
-        )
-        parser.add_argument("-V", "--version", action="version", version=VERSION)
-        parser.add_argument(
-            "-q", "--quiet", action="store_true", help="don't print diffs"
-        )
-        parser.add_argument(
-            "-v",
-            "--verbose",
-            action="store_true",
-            help="show filenames and test status",
-        )
-        parser.add_argument(
-            "-i",
-            "--interactive",
-            action="store_true",
-            help="interactively merge changed test output",
-        )
-        parser.add_argument(
-            "-d",
-            "--debug",
-            action="store_true",
-            help="write script output directly to the terminal",
-        )
-        parser.add_argument(
-            "-y", "--yes", action="store_true", help="answer yes to all questions"
-        )
-        parser.add_argument(
-            "-n", "--no", action="store_true", help="answer no to all questions"
-        )
-        parser.add_argument(
-            "-E",
-            "--preserve-env",
-            action="store_true",
-            help="don't reset common environment variables",
-        )
-        parser.add_argument(
-            "--keep-tmpdir",
-            action="store_true",
-            help="keep temporary directories",
-        )
-        parser.add_argument(
-            "--shell",
-            action="store",
-            default="/bin/sh",
-            metavar="PATH",
-            help="shell to use for running tests",
-        )
-        parser.add_argument(
-            "--shell-opts",
-            action="store",
-            metavar="OPTS",
-            help="arguments to invoke shell with",
-        )
-        parser.add_argument(
-            "--indent",
-            action="store",
-            default=2,
-            metavar="NUM",
-            type=int,
-            help="number of spaces to use for indentation",
-        )
-        parser.add_argument(
-            "--color",
-            choices=["always", "never", "auto"],
-            default="auto",
-            help="Mode which shall be used for coloring the output",
-        )
-        parser.add_argument(
-            "--xunit-file",
-            action="store",
-            metavar="PATH",
-            help="path to write xUnit XML output",
-        )
-        parser.add_argument(
-            "--dos2unix",
-            action="store_true",
-            help="convert DOS/Windows line endings to UNIX line endings",
-        )
-        parser.add_argument(
-            "--escape7bit",
-            action="store_true",
-            help="escape all non-7-bit bytes (not just non-printable/invalid UTF-8)",
-        )
-        return parser
-
-    def __init__(self, *args, **kwargs):
-        self._options = []
-        self._parser = argparse.ArgumentParser(*args, **kwargs)
-
-    def add_argument(self, *args, **kwargs):
-        """See argparser.Argumentparser:add_argument"""
-
-        def is_boolean_option(a):
-            return a.nargs is not None and isinstance(a.const, bool)
-
-        action = self._parser.add_argument(*args, **kwargs)
-        if not action.type:
-            _type = bool if is_boolean_option(action) else None
-        else:
-            _type = action.type
-        self._options.append((_type, action.dest))
-        return action
-
-    def __getattr__(self, item):
-        return getattr(self._parser, item)
+def _usage(usage):
+    """Format the resource usage of a test for the verbose status line"""
+    if usage is None:
+        return ""
+    return (
+        f" (user {usage.user:.3f}s, sys {usage.system:.3f}s, "
+        f"max RSS {usage.maxrss / 1024 / 1024:.1f} MB, "
+        f"blocks {usage.inblock} in/{usage.oublock} out, "
+        f"context switches {usage.nvcsw} voluntary/{usage.nivcsw} involuntary)"
+    )
 
-    @property
-    def options(self):
-        """
-        Normalized options and their type except for -V, --version and -h, --help.
 
-        :return: an iterable containing all boolean options.
-        :rtype: Iterable[Tuple(type, str)]
-        """
-        return self._options
+def _terminate(signum, frame):
+    """Handle SIGTERM like SIGINT, so that runs killed (e.g. by a CI timeout)
+    are wound up: reports are completed and temporary files removed."""
+    raise KeyboardInterrupt
 
 
 class _CliError(Exception):
@@ -256,32 +107,83 @@ class _Cli:
     @staticmethod
     def _patch(cmd, diff):
         """Run echo [lines from diff] | cmd -p0"""
+        from prysk.process import execute
+
         _, retcode = execute([cmd, "-p0"], stdin=b"".join(diff))
         return retcode == 0
 
     def __init__(self):
-        self._stdout_console = Console(file=sys.stdout)
-        self._stderr_console = Console(file=sys.stderr)
-        self._argparser = _ArgumentParser.create_parser()
-        self._default_color_system = self._stdout_console.color_system
+        # The consoles are created once the color mode is known
+        self._stdout_console = None
+        self._stderr_console = None
+        self._argparser = ArgumentParser.create_parser(VERSION)
         self.tmpdir = None
 
     @property
     def stdout(self):
+        if self._stdout_console is None:
+            self._color_mode("auto")
         return partial(
             self._stdout_console.print, no_wrap=True, overflow="ignore", crop=False
         )
 
     @property
     def stderr(self):
-        return partial(self._stderr_console.print, no_wrap=True)
+        if self._stderr_console is None:
+            self._color_mode("auto")
+        return partial(
+            self._stderr_console.print, no_wrap=True, overflow="ignore", crop=False
+        )
 
     def _color_mode(self, mode):
+        from rich.console import Console
+
         dispatcher = {"auto": "auto", "never": None, "always": "standard"}
         mode = dispatcher[mode]
         self._stdout_console = Console(file=sys.stdout, color_system=mode)
         self._stderr_console = Console(file=sys.stderr, color_system=mode)
 
+    def _write_diff(self, diff, max_lines=None):
+        """Write the lines of diff to stdout as they are, in batches.
+
+        Lines are colored using ANSI escape sequences (if colors are
+        enabled), instead of going through rich's markup. Returns the list
+        of written lines, or None if the diff had more than max_lines lines.
+        """
+        console = self._stdout_console
+        colors = {}
+        if console.color_system and not console.legacy_windows:
+            colors = _DIFF_COLORS
+        out = console.file
+        # Keep the order of output written by rich so far
+        out.flush()
+        buffer = getattr(out, "buffer", None)
+
+        def write(data):
+            if buffer is None:
+                out.write(data.decode("utf-8", "replace"))
+            else:
+                buffer.write(data)
+
+        lines, chunks, size = [], [], 0
+        for line in diff:
+            if len(lines) == max_lines:
+                lines = None
+                break
+            lines.append(line)
+            color = colors.get(line[:1])
+            if color:
+                end = len(line) - line.endswith(b"\n")
+                line = color + line[:end] + _RESET + line[end:]
+            chunks.append(line)
+            size += len(line)
+            if size >= _WRITE_SIZE:
+                write(b"".join(chunks))
+                chunks, size = [], 0
+        write(b"".join(chunks))
+        (out if buffer is None else buffer).flush()
+        return lines
+
     def _log(self, msg=None, verbosemsg=None, verbose=False):
         """Write msg to standard out and flush.
 
@@ -293,7 +195,19 @@ class _Cli:
         msg = msg.encode("utf-8") if isinstance(msg, bytes) else msg
         self.stdout(msg, end="")
 
-    def _runcli(self, tests, quiet=False, verbose=False, patchcmd=None, answer=None):
+    def _runcli(
+        self,
+        tests,
+        quiet=False,
+        verbose=False,
+        patchcmd=None,
+        answer=None,
+        durations=None,
+        resources=False,
+        max_hunks=None,
+        max_bytes=None,
+        max_lines=None,
+    ):
         """Run tests with command line interface input/output.
 
         tests should be a sequence of 2-tuples containing the following:
@@ -310,8 +224,35 @@ class _Cli:
         changed output should be merged back into the original test. The
         answer is read from stdin. If 'y', the test is patched using patch
         based on the changed output.
+
+        Tests which have been updated with their actual output (see
+        prysk.update.runupdate) are reported as failed along with their
+        diff, but no .err file is written for them.
+
+        If max_hunks or max_bytes is set, the diffs of failing tests are cut
+        short after that many hunks or bytes (see prysk.diff.unified_diff),
+        unless they may be merged into the test (see patchcmd). Diffs are
+        only computed if they are printed or used by a later consumer. If
+        max_lines is set, at most that many lines of each diff are printed
+        (unless they may be merged), followed by a pointer to the .err file
+        (or a note that the test was updated).
+
+        Invalid (re) and (glob) patterns are reported once for each test,
+        along with the diff of failing tests or else before the summary.
+
+        If durations is set, the durations slowest commands (all commands if
+        0) are listed after the summary. If resources is True, the resource
+        usage of each test is shown along with its status (if verbose).
         """
-        total, skipped, failed = [0], [0], [0]
+        from rich.markup import escape
+
+        from prysk.diff import Diff
+        from prysk.trace import span
+
+        total, skipped, failed, cached, timedout = [0], [0], [0], [0], [0]
+        updated = [0]
+        timings = []
+        invalids = []
 
         for path, test in tests:
 
@@ -320,54 +261,82 @@ class _Cli:
                 total[0] += 1
                 self._log(None, f"{Path(path.parent.name, path.name)}: ", verbose)
 
-                refout, postout, diff = test()
+                result = test()
+                refout, postout, diff = result
+                timings.extend((path, timing) for timing in result.timings)
                 if refout is None:
                     skipped[0] += 1
                     self._log("[yellow]s[/yellow]", "empty\n", verbose)
-                    return refout, postout, diff
+                    return result
 
                 errpath = Path(f"{path}" + ".err")
+                usage = _usage(result.usage) if resources else ""
+                invalid = list(result.invalid)
                 if postout is None:
                     skipped[0] += 1
                     self._log(
                         "[yellow]s[/yellow]", "[yellow]skipped[/yellow]\n", verbose
                     )
-                elif not diff:
-                    self._log("[green].[/green]", "[green]passed[/green]\n", verbose)
+                elif result.cached:
+                    cached[0] += 1
+                    self._log(
+                        "[green].[/green]", "[green]passed[/green] (cached)\n", verbose
+                    )
+                    if errpath.exists():
+                        os.remove(errpath)
+                elif not diff and result.timeout is None:
+                    self._log(
+                        "[green].[/green]", f"[green]passed[/green]{usage}\n", verbose
+                    )
                     if errpath.exists():
                         os.remove(errpath)
                 else:
                     failed[0] += 1
-                    self._log("[red]![/red]", "[red]failed[/red]\n", verbose)
+                    if result.timeout is not None:
+                        timedout[0] += 1
+                        self._log(
+                            "[red]![/red]",
+                            f"[red]timed out[/red] after {result.timeout:g}s{usage}\n",
+                            verbose,
+                        )
+                    else:
+                        self._log(
+                            "[red]![/red]", f"[red]failed[/red]{usage}\n", verbose
+                        )
                     if not quiet:
                         self._log("\n", None, verbose)
 
-                    with open(errpath, "wb") as errfile:
-                        for line in postout:
-                            errfile.write(line)
+                    capped = max_hunks is not None or max_bytes is not None
+                    if capped and not patchcmd and isinstance(diff, Diff):
+                        diff = diff.truncated(max_hunks, max_bytes)
+
+                    if result.updated:
+                        updated[0] += 1
+                        if errpath.exists():
+                            os.remove(errpath)
+                    else:
+                        with span("write .err"), open(errpath, "wb") as errfile:
+                            for line in postout:
+                                errfile.write(line)
 
                     if not quiet:
-                        origdiff = diff
-                        diff = []
-                        for line in origdiff:
-                            _line = line.decode("utf-8")
-                            _line = (
-                                f"[green]{_line}[/green]"
-                                if _line.startswith("+")
-                                else _line
-                            )
-                            _line = (
-                                f"[red]{_line}[/red]"
-                                if _line.startswith("-")
-                                else _line
-                            )
-                            _line = (
-                                f"[magenta]{_line}[/magenta]"
-                                if _line.startswith("@")
-                                else _line
+                        for line, error in invalid:
+                            self.stdout(escape(f"{path}:{line}: {error}"))
+                        invalid = []
+                        limit = None if patchcmd else max_lines
+                        with span("report"):
+                            shown = self._write_diff(diff, limit)
+                        if shown is None:
+                            # No .err file is written for updated tests
+                            where = f"see {escape(str(errpath))}"
+                            if result.updated:
+                                where = f"{escape(str(path))} was updated"
+                            self._log(
+                                f"# Diff truncated after {max_lines} lines, "
+                                f"{where}\n"
                             )
-                            self.stdout(_line, end="")
-                            diff.append(line)
+                        else:
+                            diff = shown
 
                         if (
                             patchcmd
@@ -379,18 +348,50 @@ class _Cli:
                             else:
                                 self._log(f"{path}: merge failed\n")
 
-                return refout, postout, diff
+                    if result.updated:
+                        self._log(None, f"{path}: updated\n", verbose)
+
+                # Reported before the summary, unless shown with the diff
+                invalids.extend((path, line, error) for line, error in invalid)
+
+                return result._replace(diff=diff)
 
             yield path, testwrapper
 
         if total[0] > 0:
             self._log("\n", None, verbose)
+            for path, line, error in invalids:
+                self.stdout(escape(f"{path}:{line}: {error}"))
+            summary = (
+                f"# Ran [green]{total[0]}[/green] tests, "
+                f"[yellow]{skipped[0]}[/yellow] skipped, "
+                f"[red]{failed[0]}[/red] failed"
+            )
+            if cached[0]:
+                summary += f", [green]{cached[0]}[/green] cached"
+            if timedout[0]:
+                summary += f", [red]{timedout[0]}[/red] timed out"
+            if updated[0]:
+                summary += f", [yellow]{updated[0]}[/yellow] updated"
+            self._log(f"{summary}.\n")
+        if durations is not None and timings:
+            self._durations(timings, durations)
+
+    def _durations(self, timings, count):
+        """List the count slowest commands (all if count is 0)"""
+        from rich.markup import escape
+
+        if count:
+            timings = heapq.nlargest(count, timings, key=lambda t: t[1].wall)
+        else:
+            timings = sorted(timings, key=lambda t: t[1].wall, reverse=True)
+        self._log(f"# Slowest {len(timings)} commands:\n")
+        for path, timing in timings:
+            cpu = "-" if timing.cpu is None else f"{timing.cpu:.3f}s"
+            command = escape(timing.command.decode("utf-8", "replace"))
             self._log(
-                (
-                    f"# Ran [green]{total[0]}[/green] tests, "
-                    f"[yellow]{skipped[0]}[/yellow] skipped, "
-                    f"[red]{failed[0]}[/red] failed.\n"
-                )
+                f"{timing.wall:8.3f}s wall {cpu:>8} cpu  "
+                f"{path}:{timing.line}  $ {command}\n"
             )
 
     def _prompt(self, question, answers, auto=None):
@@ -423,8 +424,14 @@ class _Cli:
 
         Layers (Config file > ENV vars > CLI arguments)"""
         argv = sys.argv[1:] if argv is None else argv
-        argv.extend(_env_args("PRYSK"))
+        argv.extend(env_args("PRYSK"))
         args = self._argparser.parse_args(argv)
+
+        from prysk.settings import (
+            merge_settings,
+            settings_from,
+        )
+
         self._color_mode(args.color)
         options = self._argparser.options
 
@@ -433,6 +440,7 @@ class _Cli:
                 load(
                     Path(self._expandpath(os.environ.get("PRYSKRC", ".pryskrc"))),
                     options,
+                    choices=self._argparser.choices,
                 )
             )
         except ValueError as ex:
@@ -450,6 +458,8 @@ class _Cli:
         Sets up a directory where tests will run (called `tmpdir`).
         Also set $TMPDIR, $TMP, and $TMP environment variables to a `tmp` dir inside the tmpdir.
         """
+        import tempfile
+
         self.tmpdir = os.environ["PRYSK_TEMP"] = tempfile.mkdtemp("", "prysk-tests-")
         self.tmpdir = Path(self.tmpdir)
         proc_tmp = self.tmpdir / "tmp"
@@ -465,6 +475,7 @@ class _Cli:
         """
         if self.tmpdir is None:
             return
+        import shutil
 
         def on_rm_error(func, path, exc_info):
             os.chmod(path, stat.S_IWRITE)
@@ -479,6 +490,19 @@ class _Cli:
             self.stderr(f"{ex}")
             return ex.exit_code
 
+        from shutil import which
+
+        from prysk.parallel import (
+            History,
+            runparallel,
+            schedulers,
+        )
+        from prysk.test import runtests
+        from prysk.trace import (
+            start,
+            stop,
+        )
+
         conflict = _conflicts(settings)
 
         if conflict:
@@ -486,6 +510,10 @@ class _Cli:
             self.stderr(f"options {arg1} and {arg2} are mutually exclusive")
             return ExitCode.ERROR
 
+        if settings.json_lines == "-":
+            # Keep standard output a plain stream of JSON records
+            self._stdout_console = self._stderr_console
+
         shellcmd = which(settings.shell)
         if not shellcmd:
             self.stderr(f"shell not found: {settings.shell}")
@@ -513,6 +541,46 @@ class _Cli:
         else:
             answer = None
 
+        history = None
+        if settings.history_file is not None and not settings.debug:
+            history = History.load(settings.history_file)
+
+        cache = None
+        if settings.cache is not None and not settings.debug:
+            from prysk.cache import ResultCache
+
+            cache = ResultCache(
+                self._expandpath(settings.cache),
+                max_age=settings.cache_max_age * 24 * 60 * 60,
+                max_size=settings.cache_max_size * 1024 * 1024,
+            )
+
+        parse_cache = None
+        if settings.parse_cache is not None:
+            from prysk.cache import ParseCache
+
+            parse_cache = ParseCache(self._expandpath(settings.parse_cache))
+
+        if settings.trace_file is not None:
+            start()
+
+        try:
+            sigterm = signal.signal(signal.SIGTERM, _terminate)
+        except ValueError:  # not called from the main thread
+            sigterm = None
+
+        # Timings are only recorded if reported, as they slow down every command
+        timed = (
+            settings.durations is not None
+            or settings.xunit_file is not None
+            or settings.json_lines is not None
+        )
+        framing = settings.framing
+        if framing == "auto":
+            # Inline markers often arrive together, their commands would all
+            # seem to take no time. The fd handshake waits for each of them.
+            framing = "fd" if timed else "inline"
+
         self._setup()  # sets self.tmpdir
 
         try:
@@ -525,7 +593,39 @@ class _Cli:
                 debug=settings.debug,
                 dos2unix=settings.dos2unix,
                 escape7bit=settings.escape7bit,
+                timeout=settings.timeout,
+                command_timeout=settings.command_timeout,
+                framing=framing,
+                diff_engine=settings.diff_engine,
+                normalize=settings.normalize,
+                parse_cache=parse_cache,
+                cputimes=timed,
             )
+            if history is not None:
+                tests = history.record(tests)
+            if cache is not None:
+                from prysk.cache import runcached
+
+                tests = runcached(
+                    tests,
+                    cache,
+                    shell,
+                    indent=settings.indent,
+                    cleanenv=not settings.preserve_env,
+                    dos2unix=settings.dos2unix,
+                    escape7bit=settings.escape7bit,
+                    framing=framing,
+                    normalize=settings.normalize,
+                )
+            if settings.update:
+                from prysk.update import runupdate
+
+                # Before running tests in parallel, so that the test files
+                # are written by the worker threads
+                tests = runupdate(tests)
+            if settings.jobs > 1 and not settings.debug:
+                schedule = schedulers[settings.schedule](history)
+                tests = runparallel(tests, settings.jobs, schedule)
             if not settings.debug:
                 tests = self._runcli(
                     tests,
@@ -533,16 +633,27 @@ class _Cli:
                     verbose=settings.verbose,
                     patchcmd=patchcmd,
                     answer=answer,
+                    durations=settings.durations,
+                    resources=settings.resources,
+                    max_hunks=settings.max_diff_hunks,
+                    max_bytes=settings.max_diff_bytes,
+                    max_lines=settings.max_diff_lines,
                 )
                 if settings.xunit_file is not None:
+                    from prysk.xunit import runxunit
+
                     tests = runxunit(tests, settings.xunit_file)
+                if settings.json_lines is not None:
+                    from prysk.jsonlines import runjsonlines
+
+                    tests = runjsonlines(tests, settings.json_lines)
 
             hastests = False
             failed = False
             for path, test in tests:
                 hastests = True
-                _, _, diff = test()
-                if diff:
+                result = test()
+                if result.diff or result.timeout is not None:
                     failed = True
 
             if not hastests:
@@ -551,6 +662,17 @@ class _Cli:
 
             return ExitCode.TEST_FAILED if failed else ExitCode.SUCCESS
         finally:
+            # Complete the reports of interrupted runs (see runxunit)
+            tests.close()
+            if sigterm is not None:
+                signal.signal(signal.SIGTERM, sigterm)
+            tracer = stop()
+            if tracer is not None:
+                tracer.save(settings.trace_file)
+            if history is not None:
+                history.save()
+            if cache is not None:
+                cache.evict()
             if settings.keep_tmpdir:
                 self.stdout(f"# Kept temporary directory: [blue]{self.tmpdir}[/blue]")
             else:
@@ -1,10 +1,57 @@
 """Utilities for diffing test files and their output"""
 
+import bisect
 import codecs
 import difflib
+import functools
+import itertools
 import re
 
-__all__ = ["esc", "glob", "regex", "unified_diff"]
+__all__ = [
+    "ENGINES",
+    "TRUNCATED",
+    "Diff",
+    "esc",
+    "glob",
+    "invalid",
+    "merge",
+    "regex",
+    "unified_diff",
+]
+
+# Diff engines supported by unified_diff()
+ENGINES = ("auto", "difflib", "patience")
+
+# Last line of a diff which has been cut short
+TRUNCATED = b"[diff truncated]\n"
+
+
+# Above this number of lines (expected and actual output combined), the
+# "auto" engine uses the patience engine instead of difflib.
+_AUTO_THRESHOLD = 2000
+
+# Gaps between patience anchors which can't be diffed with at most this many
+# insertions and deletions are reported as replaced as a whole.
+_MAX_COST = 500
+
+# Compiled patterns are shared between all tests, the size of the cache
+# bounds the memory used for them.
+_PATTERN_CACHE_SIZE = 4096
+
+# Results of matching pairs of lines kept by each sequence matcher
+_MATCH_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=_PATTERN_CACHE_SIZE)
+def _compile(pattern):
+    """Compile a regular expression matching whole lines.
+
+    Returns None if the pattern is invalid.
+    """
+    try:
+        return re.compile(pattern + rb"\Z")
+    except re.error:
+        return None
 
 
 def _regex(pattern, s):
@@ -13,36 +60,73 @@ def _regex(pattern, s):
     >>> [bool(_regex(r, b'foobar')) for r in (b'foo.*', b'***')]
     [True, False]
     """
-    try:
-        return re.match(pattern + rb"\Z", s)
-    except re.error:
-        return False
+    compiled = _compile(pattern)
+    return compiled is not None and compiled.match(s)
 
 
-def _glob(el, l):
-    r"""Match a glob-like pattern.
+@functools.lru_cache(maxsize=_PATTERN_CACHE_SIZE)
+def _globpattern(el):
+    r"""Translate a glob-like pattern into a regular expression.
 
-    The only supported special characters are * and ?. Escaping is
-    supported.
-
-    >>> bool(_glob(br'\* \\ \? fo?b*', b'* \\ ? foobar'))
-    True
+    >>> _globpattern(br'\* \\ \? fo?b*')
+    b'\\*\\ \\\\\\ \\?\\ fo.b.*'
     """
     i, n = 0, len(el)
-    res = b""
+    res = []
     while i < n:
         c = el[i : i + 1]
         i += 1
-        if c == b"\\" and el[i] in b"*?\\":
-            res += el[i - 1 : i + 1]
+        if c == b"\\" and i < n and el[i] in b"*?\\":
+            res.append(el[i - 1 : i + 1])
             i += 1
         elif c == b"*":
-            res += b".*"
+            res.append(b".*")
         elif c == b"?":
-            res += b"."
+            res.append(b".")
         else:
-            res += re.escape(c)
-    return _regex(res, l)
+            res.append(re.escape(c))
+    return b"".join(res)
+
+
+def _glob(el, l):
+    r"""Match a glob-like pattern.
+
+    The only supported special characters are * and ?. Escaping is
+    supported.
+
+    >>> bool(_glob(br'\* \\ \? fo?b*', b'* \\ ? foobar'))
+    True
+    >>> bool(_glob(b'trailing \\', b'trailing \\'))
+    True
+    """
+    return _regex(_globpattern(el), l)
+
+
+def invalid(lines, indent=2):
+    r"""Yield the (re) and (glob) output lines with invalid patterns.
+
+    Yields (index, error message) tuples.
+
+    >>> list(invalid([b'  $ echo\n', b'  foo* (re)\n', b'  +++ (re)\n']))
+    [(2, 'invalid regular expression: multiple repeat at position 4')]
+    """
+    prefix = b" " * indent
+    command, continuation = prefix + b"$ ", prefix + b"> "
+    for i, line in enumerate(lines):
+        if not line.startswith(prefix) or line.startswith((command, continuation)):
+            continue
+        # Like in the diff, patterns include the indentation
+        if line.endswith(b" (re)\n"):
+            pattern = line[: -len(b" (re)\n")]
+        elif line.endswith(b" (glob)\n"):
+            pattern = _globpattern(line[: -len(b" (glob)\n")])
+        else:
+            continue
+        if _compile(pattern) is None:
+            try:
+                re.compile(pattern + rb"\Z")
+            except re.error as ex:
+                yield i, f"invalid regular expression: {ex}"
 
 
 def _matchannotation(keyword, matchfunc, el, l):
@@ -80,14 +164,13 @@ class _SequenceMatcher(difflib.SequenceMatcher):
 
     def __init__(self, *args, **kwargs):
         self._matchers = kwargs.pop("matchers", [])
+        # find_longest_match() compares the same pairs of lines many times
+        self._match = functools.lru_cache(maxsize=_MATCH_CACHE_SIZE)(self._match)
         super().__init__(*args, **kwargs)
 
     def _match(self, el, l):
         """Tests for matching lines using custom matchers"""
-        for matcher in self._matchers:
-            if matcher(el, l):
-                return True
-        return False
+        return any(matcher(el, l) for matcher in self._matchers)
 
     def find_longest_match(self, alo, ahi, blo, bhi):
         """Find longest matching block in a[alo:ahi] and b[blo:bhi]"""
@@ -110,6 +193,278 @@ class _SequenceMatcher(difflib.SequenceMatcher):
         return ret
 
 
+def _matching_blocks(blocks, a, b):
+    """Turn (i, j, size) tuples into matching blocks like difflib's"""
+    blocks.sort()
+    merged = []
+    for i, j, size in blocks:
+        if merged and merged[-1][0] + merged[-1][2] == i:
+            if merged[-1][1] + merged[-1][2] == j:
+                merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+                continue
+        merged.append((i, j, size))
+    merged.append((len(a), len(b), 0))
+    return [difflib.Match._make(block) for block in merged]
+
+
+def _matcher(a, b, matchers, engine):
+    """Create a sequence matcher for a and b using engine"""
+    # The matchers index lines many times (and difflib's replaces lines
+    # of a), so only the lines actually diffed are copied into lists.
+    a, b = list(a), list(b)
+    if engine == "auto":
+        engine = "patience" if len(a) + len(b) > _AUTO_THRESHOLD else "difflib"
+    if engine == "patience":
+        return _PatienceMatcher(a, b, matchers)
+    return _SequenceMatcher(None, a, b, matchers=matchers)
+
+
+class _SegmentedMatcher(difflib.SequenceMatcher):
+    r"""A sequence matcher diffing segments between anchor lines separately.
+
+    Anchor lines are lines of a starting with the anchor prefix (e.g.
+    command lines), which are expected to occur unchanged in b. Each of
+    them is paired with the next identical line of b, and the segments
+    between the anchors are diffed independently.
+
+    >>> a = [b'$ a\n', b'x\n', b'y\n', b'$ b\n', b'x\n']
+    >>> b = [b'$ a\n', b'y\n', b'$ b\n', b'x\n', b'y\n']
+    >>> for opcode in _SegmentedMatcher(a, b, [], 'difflib', b'$ ').get_opcodes():
+    ...     print(opcode)
+    ('equal', 0, 1, 0, 1)
+    ('delete', 1, 2, 1, 1)
+    ('equal', 2, 5, 1, 4)
+    ('insert', 5, 5, 4, 5)
+    """
+
+    def __init__(self, a, b, matchers, engine, anchor):
+        self._matchers = matchers
+        self._engine = engine
+        self._anchor = anchor
+        super().__init__(None, a, b, autojunk=False)
+
+    def _anchors(self):
+        """Yield the (i, j) positions of the paired anchor lines"""
+        a, b = self.a, self.b
+        j = 0
+        for i, line in enumerate(a):
+            if not line.startswith(self._anchor):
+                continue
+            try:
+                j = b.index(line, j)
+            except ValueError:
+                return
+            yield i, j
+            j += 1
+
+    def get_matching_blocks(self):
+        if self.matching_blocks is not None:
+            return self.matching_blocks
+
+        blocks = []
+        alo = blo = 0
+        for i, j in itertools.chain(self._anchors(), [(len(self.a), len(self.b))]):
+            segment = self.a[alo:i], self.b[blo:j]
+            if i > alo and _lockstep(*segment, self._matchers):
+                blocks.append((alo, blo, i - alo))
+            elif segment[0] and segment[1]:
+                matcher = _matcher(*segment, self._matchers, self._engine)
+                blocks.extend(
+                    (alo + x, blo + y, size)
+                    for x, y, size in matcher.get_matching_blocks()
+                    if size
+                )
+            blocks.append((i, j, 1))
+            alo, blo = i + 1, j + 1
+        # Drop the block of the sentinel anchor
+        blocks.pop()
+        self.matching_blocks = _matching_blocks(blocks, self.a, self.b)
+        return self.matching_blocks
+
+
+class _PatienceMatcher(difflib.SequenceMatcher):
+    r"""A sequence matcher based on patience and Myers diff.
+
+    Lines occurring exactly once in both sequences are used as anchors, the
+    gaps between them are diffed using Myers' algorithm. Unlike difflib's
+    algorithm, this takes linear time for large outputs with few
+    differences, and supports custom matchers natively.
+
+    >>> a = [b'$ a\n', b'x* (glob)\n', b'$ b\n', b'y\n']
+    >>> b = [b'$ a\n', b'xx\n', b'$ b\n', b'z\n']
+    >>> _PatienceMatcher(a, b, [glob]).get_opcodes()
+    [('equal', 0, 3, 0, 3), ('replace', 3, 4, 3, 4)]
+    """
+
+    def __init__(self, a, b, matchers):
+        self._matchers = matchers
+        super().__init__(None, a, b, autojunk=False)
+
+    def _match(self, el, l):
+        return el == l or any(matcher(el, l) for matcher in self._matchers)
+
+    def get_matching_blocks(self):
+        if self.matching_blocks is not None:
+            return self.matching_blocks
+
+        blocks = []
+        stack = [(0, len(self.a), 0, len(self.b))]
+        while stack:
+            alo, ahi, blo, bhi = stack.pop()
+            # Strip matching lines at both ends of the gap
+            start = alo
+            while alo < ahi and blo < bhi and self._match(self.a[alo], self.b[blo]):
+                alo, blo = alo + 1, blo + 1
+            if alo > start:
+                blocks.append((start, blo - (alo - start), alo - start))
+            end = ahi
+            while (
+                alo < ahi
+                and blo < bhi
+                and self._match(self.a[ahi - 1], self.b[bhi - 1])
+            ):
+                ahi, bhi = ahi - 1, bhi - 1
+            if ahi < end:
+                blocks.append((ahi, bhi, end - ahi))
+            if alo == ahi or blo == bhi:
+                continue
+
+            anchors = self._anchors(alo, ahi, blo, bhi)
+            if not anchors:
+                blocks.extend(self._myers(alo, ahi, blo, bhi))
+                continue
+            for i, j in anchors:
+                stack.append((alo, i, blo, j))
+                blocks.append((i, j, 1))
+                alo, blo = i + 1, j + 1
+            stack.append((alo, ahi, blo, bhi))
+
+        self.matching_blocks = _matching_blocks(blocks, self.a, self.b)
+        return self.matching_blocks
+
+    def _anchors(self, alo, ahi, blo, bhi):
+        """Return the longest increasing sequence of unique common lines"""
+        counts = {}
+        for i in range(alo, ahi):
+            line = self.a[i]
+            counts[line] = (i, -1) if line not in counts else (-1, -1)
+        for j in range(blo, bhi):
+            line = self.b[j]
+            if line in counts:
+                i, seen = counts[line]
+                counts[line] = (i, j if seen == -1 else -2)
+        pairs = [(i, j) for i, j in counts.values() if i >= 0 and j >= 0]
+        pairs.sort()
+
+        # Patience sorting: tails[n] is the index into pairs ending the best
+        # increasing sequence of length n + 1 found so far.
+        tails, heads, previous = [], [], []
+        for n, (_i, j) in enumerate(pairs):
+            pile = bisect.bisect_left(heads, j)
+            previous.append(tails[pile - 1] if pile else -1)
+            if pile == len(tails):
+                tails.append(n)
+                heads.append(j)
+            else:
+                tails[pile] = n
+                heads[pile] = j
+        anchors = []
+        n = tails[-1] if tails else -1
+        while n >= 0:
+            anchors.append(pairs[n])
+            n = previous[n]
+        anchors.reverse()
+        return anchors
+
+    def _myers(self, alo, ahi, blo, bhi):
+        """Return the matching blocks of a shortest edit script of a gap.
+
+        If the gap takes more than _MAX_COST insertions and deletions, no
+        blocks are returned.
+        """
+        a, b, match = self.a, self.b, self._match
+        n, m = ahi - alo, bhi - blo
+        # For each number of edits d, maps each diagonal k (x - y) to the
+        # furthest reaching point (x, snake start, previous diagonal).
+        trace = []
+        previous = {}
+        for d in range(min(n + m, _MAX_COST) + 1):
+            current = {}
+            low = -d if d <= m else -m + (d - m) % 2
+            high = d if d <= n else n - (d - n) % 2
+            for k in range(low, high + 1, 2):
+                if d == 0:
+                    x, before = 0, None
+                else:
+                    x, before = -1, None
+                    down = previous.get(k + 1)
+                    if down is not None and down[0] - k <= m:
+                        x, before = down[0], k + 1
+                    right = previous.get(k - 1)
+                    if right is not None and x < right[0] + 1 <= n:
+                        x, before = right[0] + 1, k - 1
+                    if before is None:
+                        continue
+                start, y = x, x - k
+                while x < n and y < m and match(a[alo + x], b[blo + y]):
+                    x, y = x + 1, y + 1
+                current[k] = (x, start, before)
+                if x == n and y == m:
+                    trace.append(current)
+                    return self._backtrack(trace, n - m, alo, blo)
+            trace.append(current)
+            previous = current
+        return []
+
+    @staticmethod
+    def _backtrack(trace, k, alo, blo):
+        blocks = []
+        for current in reversed(trace):
+            x, start, before = current[k]
+            if x > start:
+                blocks.append((alo + start, blo + start - k, x - start))
+            k = before
+        return blocks
+
+
+def _lockstep(l1, l2, matchers):
+    r"""Check whether the lines of l1 and l2 match one-to-one.
+
+    >>> _lockstep([b'a\n', b'? (glob)\n'], [b'a\n', b'b\n'], [glob])
+    True
+    >>> _lockstep([b'a\n', b'? (glob)\n'], [b'a\n', b'b\n'], [])
+    False
+    """
+    if len(l1) != len(l2):
+        return False
+    for el, l in zip(l1, l2):
+        if el != l and not any(matcher(el, l) for matcher in matchers):
+            return False
+    return True
+
+
+def _anchored_matcher(l1, l2, matchers, engine, anchor):
+    """Create a sequence matcher, segmented by anchor lines if set"""
+    if anchor:
+        return _SegmentedMatcher(l1, l2, matchers, engine, anchor)
+    return _matcher(l1, l2, matchers, engine)
+
+
+def _hunk(group, l1, l2):
+    """Yield the lines of a hunk (without its header)"""
+    for tag, i1, i2, j1, j2 in group:
+        if tag == "equal":
+            for line in l1[i1:i2]:
+                yield b" " + line
+            continue
+        if tag in ("replace", "delete"):
+            for line in l1[i1:i2]:
+                yield b"-" + line
+        if tag in ("replace", "insert"):
+            for line in l2[j1:j2]:
+                yield b"+" + line
+
+
 def unified_diff(
     l1,
     l2,
@@ -120,11 +475,28 @@ def unified_diff(
     n=3,
     lineterm=b"\n",
     matchers=None,
+    engine="auto",
+    anchor=None,
+    max_hunks=None,
+    max_bytes=None,
 ):
     r"""Compare two sequences of lines; generate the delta as a unified diff.
 
     This is like difflib.unified_diff(), but allows custom matchers.
 
+    engine is one of ENGINES: "difflib" uses difflib's algorithm,
+    "patience" uses patience diff (with Myers' algorithm between the
+    unique lines), which is much faster for large outputs. "auto" uses
+    "patience" for large outputs and "difflib" otherwise.
+
+    If anchor is set, lines of l1 starting with it (e.g. command lines) are
+    paired with the identical lines of l2, and the segments between them are
+    diffed independently. Hunks may still span multiple segments.
+
+    If max_hunks or max_bytes is set, the diff ends with a TRUNCATED line
+    once it would exceed that many hunks or bytes. With max_hunks=0 the
+    differences aren't computed at all.
+
     >>> l1 = [b'a\n', b'? (glob)\n']
     >>> l2 = [b'a\n', b'b\n']
     >>> (list(unified_diff(l1, l2, b'f1', b'f2', b'1970-01-01',
@@ -136,34 +508,115 @@ def unified_diff(
     >>> from prysk.diff import glob
     >>> list(unified_diff(l1, l2, matchers=[glob]))
     []
+    >>> list(unified_diff(l1, l2, engine='patience')) == list(unified_diff(l1, l2))
+    True
+    >>> list(unified_diff(l1, l2, max_bytes=20))
+    [b'--- \n', b'+++ \n', b'[diff truncated]\n']
     """
     if matchers is None:
         matchers = []
-    started = False
-    matcher = _SequenceMatcher(None, l1, l2, matchers=matchers)
-    for group in matcher.get_grouped_opcodes(n):
-        if not started:
-            if fromfiledate:
-                fromdate = b"\t" + fromfiledate
-            else:
-                fromdate = b""
-            if tofiledate:
-                todate = b"\t" + tofiledate
-            else:
-                todate = b""
-            yield b"--- " + fromfile + fromdate + lineterm
-            yield b"+++ " + tofile + todate + lineterm
-            started = True
+    # Most tests pass, which can be verified in linear time
+    if _lockstep(l1, l2, matchers):
+        return
+    if max_hunks == 0:
+        yield TRUNCATED
+        return
+    matcher = _anchored_matcher(l1, l2, matchers, engine, anchor)
+
+    fromdate = b"\t" + fromfiledate if fromfiledate else b""
+    todate = b"\t" + tofiledate if tofiledate else b""
+    header = [b"--- " + fromfile + fromdate + lineterm]
+    header.append(b"+++ " + tofile + todate + lineterm)
+    size = 0
+    for count, group in enumerate(matcher.get_grouped_opcodes(n)):
+        if count == max_hunks:
+            yield TRUNCATED
+            return
         i1, i2, j1, j2 = group[0][1], group[-1][2], group[0][3], group[-1][4]
-        yield b"@@ -%d,%d +%d,%d @@" % (i1 + 1, i2 - i1, j1 + 1, j2 - j1) + lineterm
-        for tag, i1, i2, j1, j2 in group:
-            if tag == "equal":
-                for line in l1[i1:i2]:
-                    yield b" " + line
-                continue
-            if tag in ("replace", "delete"):
-                for line in l1[i1:i2]:
-                    yield b"-" + line
-            if tag in ("replace", "insert"):
-                for line in l2[j1:j2]:
-                    yield b"+" + line
+        header.append(
+            b"@@ -%d,%d +%d,%d @@" % (i1 + 1, i2 - i1, j1 + 1, j2 - j1) + lineterm
+        )
+        for line in itertools.chain(header, _hunk(group, l1, l2)):
+            size += len(line)
+            if max_bytes is not None and size > max_bytes:
+                yield TRUNCATED
+                return
+            yield line
+        header = []
+
+
+def merge(l1, l2, matchers=None, engine="auto", anchor=None):
+    r"""Yield the lines of l1, with the lines differing from l2 replaced.
+
+    Lines of l1 matching lines of l2 (e.g. (re) and (glob) lines) are kept,
+    all others are replaced by the lines of l2 they were diffed against,
+    like applying the diff of l1 and l2 to l1 would do. See unified_diff()
+    for the arguments.
+
+    >>> list(merge([b'a\n', b'? (glob)\n', b'c\n'], [b'a\n', b'b\n', b'd\n'],
+    ...            matchers=[glob]))
+    [b'a\n', b'? (glob)\n', b'd\n']
+    """
+    if matchers is None:
+        matchers = []
+    if _lockstep(l1, l2, matchers):
+        yield from l1
+        return
+    matcher = _anchored_matcher(l1, l2, matchers, engine, anchor)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            yield from l1[i1:i2]
+        else:
+            yield from l2[j1:j2]
+
+
+class Diff:
+    r"""The unified diff of two sequences of lines, computed on demand.
+
+    A Diff is true if the lines differ, which is checked in linear time
+    without computing the differences. Iterating over it yields the lines
+    of the diff, which are computed anew each time (see unified_diff() for
+    the arguments).
+
+    >>> diff = Diff([b'a\n', b'b\n'], [b'a\n', b'c\n'], matchers=[glob])
+    >>> bool(diff), list(diff)[2:]
+    (True, [b'@@ -1,2 +1,2 @@\n', b' a\n', b'-b\n', b'+c\n'])
+    >>> list(diff.truncated(max_hunks=0))
+    [b'[diff truncated]\n']
+    >>> bool(Diff([b'a\n', b'* (glob)\n'], [b'a\n', b'b\n'], matchers=[glob]))
+    False
+    """
+
+    def __init__(self, l1, l2, *args, **kwargs):
+        self._args = (l1, l2) + args
+        self._kwargs = kwargs
+        self._differs = None
+
+    def __bool__(self):
+        if self._differs is None:
+            l1, l2 = self._args[:2]
+            matchers = self._kwargs.get("matchers") or []
+            self._differs = not _lockstep(l1, l2, matchers)
+        return self._differs
+
+    def __iter__(self):
+        if not self:
+            return iter(())
+        return unified_diff(*self._args, **self._kwargs)
+
+    def truncated(self, max_hunks=None, max_bytes=None):
+        """Return a Diff limited to max_hunks hunks and max_bytes bytes"""
+        kwargs = dict(self._kwargs, max_hunks=max_hunks, max_bytes=max_bytes)
+        diff = Diff(*self._args, **kwargs)
+        diff._differs = self._differs
+        return diff
+
+    def merged(self):
+        """Return an iterator over the first sequence of lines, with the
+        lines differing from the second replaced (see merge())"""
+        kwargs = {
+            key: value
+            for key, value in self._kwargs.items()
+            if key in ("matchers", "engine", "anchor")
+        }
+        return merge(*self._args[:2], **kwargs)
@@ -0,0 +1,146 @@
+"""Escaping of test output"""
+
+import re
+
+__all__ = ["escape_7bit", "escape_text", "escape_utf8"]
+
+_is_escaping_needed_7bit = re.compile(rb"[\x00-\x1f\x7f-\xff]").search
+
+# Bytes which may need escaping, apart from the newlines separating lines
+_is_escaping_candidate = re.compile(rb"[\x00-\x09\x0b-\x1f\x7f-\xff]").search
+
+# Number of escaped lines after which escape_text() checks whether they make
+# up most of the lines so far
+_DENSE_LINES = 64
+
+
+class _Escapes(dict):
+    """Translation table escaping characters which aren't printable.
+
+    Entries are computed on first use, so that the table covers all of
+    Unicode while only holding the characters actually seen.
+    """
+
+    def __missing__(self, code):
+        c = chr(code)
+        if c == "\\":
+            escaped = "\\\\"
+        elif c.isprintable():
+            escaped = c
+        else:
+            escaped = c.encode("unicode_escape").decode("ascii")
+        self[code] = escaped
+        return escaped
+
+
+_UTF8_ESCAPES = _Escapes()
+
+
+def escape_7bit(b):
+    r"""Escape bytes that aren't printable 7-bit ASCII.
+    Append `` (esc)`` if escaping was necessary.
+
+    Example usage:
+
+    >>> escape_7bit(b'foo \\')
+    b'foo \\'
+    >>> escape_7bit(b'foo \\ \r')
+    b'foo \\\\ \\r (esc)'
+    >>> escape_7bit('☺'.encode())
+    b'\\xe2\\x98\\xba (esc)'
+    """
+    if _is_escaping_needed_7bit(b):
+        return b.decode("latin1").encode("unicode_escape") + b" (esc)"
+    return b
+
+
+def escape_utf8(b):
+    r"""Escape bytes that aren't printable UTF-8, or can't be decoded as UTF-8 at all.
+    Append `` (esc)`` if escaping was necessary.
+
+    Example usage:
+
+    >>> escape_utf8(b'')
+    b''
+    >>> escape_utf8(b'foo \\')
+    b'foo \\'
+    >>> escape_utf8(b'foo \\ \r')
+    b'foo \\\\ \\r (esc)'
+    >>> escape_utf8('☺'.encode())
+    b'\xe2\x98\xba'
+    >>> escape_utf8('\t'.encode())
+    b'\\t (esc)'
+    >>> escape_utf8('\240'.encode())
+    b'\\xa0 (esc)'
+    >>> escape_utf8('☺'.encode() + b' \xff x\t \xff ' + '☺'.encode())
+    b'\xe2\x98\xba \\xff x\\t \\xff \xe2\x98\xba (esc)'
+    """
+    ret = []
+    while b:
+        try:
+            s = b.decode()
+        except UnicodeDecodeError as e:
+            assert b == e.object
+            ret.append(b[: e.start].decode().translate(_UTF8_ESCAPES).encode())
+            ret.append(b[e.start : e.end].decode("latin1").encode("unicode_escape"))
+            b = b[e.end :]
+        else:
+            # the entire original input decoded okay and is printable, skip escaping
+            if not ret and s.isprintable():
+                return b
+
+            ret.append(s.translate(_UTF8_ESCAPES).encode())
+            b = None
+
+    return b"".join(ret) + b" (esc)" if ret else b""
+
+
+def escape_text(data, escape7bit=False):
+    r"""Escape the lines of data (separated by newlines) where necessary.
+
+    The data is scanned as a whole for bytes which may need escaping, only
+    the lines containing any are passed to escape_7bit() (if escape7bit is
+    set) or escape_utf8(). Returns data unchanged if nothing was escaped.
+
+    Output which is printable UTF-8 as a whole is returned after decoding
+    it once. If most lines need a closer look, the remaining lines are all
+    escaped one by one, as finding them costs more than it saves.
+
+    >>> escape_text(b'foo\nb\tr\n' + '☺'.encode() + b'\n\xff')
+    b'foo\nb\\tr (esc)\n\xe2\x98\xba\n\\xff (esc)'
+    >>> escape_text(b'foo\n' + '☺'.encode(), escape7bit=True)
+    b'foo\n\\xe2\\x98\\xba (esc)'
+    """
+    match = _is_escaping_candidate(data)
+    if not match:
+        return data
+    if escape7bit:
+        escape = escape_7bit
+    else:
+        escape = escape_utf8
+        try:
+            text = data.decode()
+        except UnicodeDecodeError:
+            pass
+        else:
+            if all(map(str.isprintable, text.split("\n"))):
+                return data
+
+    pieces = []
+    last = escaped = 0
+    while match:
+        start = data.rfind(b"\n", 0, match.start()) + 1
+        end = data.find(b"\n", match.end())
+        if end == -1:
+            end = len(data)
+        pieces.append(data[last:start])
+        pieces.append(escape(data[start:end]))
+        last = end
+        escaped += 1
+        if escaped == _DENSE_LINES and data.count(b"\n", 0, end) < 2 * escaped:
+            # data[last:] starts with the newline ending the last line
+            pieces.append(b"\n".join(map(escape, data[last:].split(b"\n"))))
+            return b"".join(pieces)
+        match = _is_escaping_candidate(data, end)
+    pieces.append(data[last:])
+    return b"".join(pieces)
@@ -0,0 +1,98 @@
+"""JSON Lines output"""
+
+import json
+import sys
+
+from prysk.trace import span
+
+__all__ = ["runjsonlines"]
+
+
+def _status(result):
+    """Return the status of a test, as shown in verbose mode"""
+    refout, postout, diff = result
+    if refout is None:
+        return "empty"
+    if postout is None:
+        return "skipped"
+    if result.timeout is not None:
+        return "timeout"
+    return "failed" if diff else "passed"
+
+
+def _size(diff):
+    """Return the number of lines and bytes of diff, without keeping its lines"""
+    lines = size = 0
+    for line in diff or ():
+        lines += 1
+        size += len(line)
+    return lines, size
+
+
+def _record(path, result):
+    r"""Return the JSON record of a test result.
+
+    >>> from prysk.test import Result, Timing
+    >>> result = Result([b'  $ false\n'], [b'  $ false\n', b'  [1]\n'],
+    ...                 [b'@@ -1 +1,2 @@\n', b'   $ false\n', b'+  [1]\n'],
+    ...                 timings=[Timing(1, b'false', 0.25, 0.0, 1)], duration=0.5)
+    >>> record = json.loads(_record('a.t', result))
+    >>> record['status'], record['duration'], record['diff_lines']
+    ('failed', 0.5, 3)
+    >>> record['commands']
+    [{'line': 1, 'command': 'false', 'wall': 0.25, 'cpu': 0.0, 'returncode': 1}]
+    """
+    diff_lines, diff_bytes = _size(result.diff)
+    record = {
+        "path": f"{path}",
+        "status": _status(result),
+        "duration": round(result.duration, 6),
+        "cached": result.cached,
+        "timeout": result.timeout,
+        "commands": [
+            {
+                "line": timing.line,
+                "command": timing.command.decode("utf-8", "replace"),
+                "wall": round(timing.wall, 6),
+                "cpu": None if timing.cpu is None else round(timing.cpu, 6),
+                "returncode": timing.returncode,
+            }
+            for timing in result.timings
+        ],
+        "diff_lines": diff_lines,
+        "diff_bytes": diff_bytes,
+    }
+    return json.dumps(record, separators=(",", ":"))
+
+
+def runjsonlines(tests, path):
+    """Run tests with JSON Lines output.
+
+    tests should be a sequence of 2-tuples containing the following:
+
+        (test path, test function)
+
+    This function yields a new sequence where each test function is wrapped
+    with a function that writes a JSON record of the test result to path
+    (standard output if path is "-") as soon as the test has finished.
+    Each record is written as one line and flushed right away.
+
+    The diff of a failing test is only counted (as passed on, e.g. cut
+    short by the CLI), its lines aren't kept.
+    """
+    out = sys.stdout if f"{path}" == "-" else open(path, "w", encoding="utf-8")
+    try:
+        for testpath, test in tests:
+
+            def testwrapper():
+                """Run test and write its JSON record"""
+                result = test()
+                with span("write json lines"):
+                    out.write(_record(testpath, result) + "\n")
+                    out.flush()
+                return result
+
+            yield testpath, testwrapper
+    finally:
+        if out is not sys.stdout:
+            out.close()
@@ -0,0 +1,262 @@
+"""Compact storage for the lines of tests and their output"""
+
+import bisect
+import itertools
+from array import array
+from collections.abc import Sequence
+
+__all__ = ["Lines", "LinesView"]
+
+# Number of lines copied out of the buffer at once while iterating
+_BLOCK_LINES = 4096
+
+# Amount of data split into lines at once to compute their offsets
+_INDEX_SIZE = 1024 * 1024
+
+
+class _LinesBase(Sequence):
+    """Comparison and representation shared by Lines and LinesView"""
+
+    __slots__ = ()
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            line == other_line for line, other_line in zip(self, other)
+        )
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)!r})"
+
+
+class Lines(_LinesBase):
+    r"""A list-like sequence of lines (bytes) stored in a single buffer.
+
+    The lines are concatenated in a bytearray, along with an array of the
+    offsets they end at. For large outputs this takes a fraction of the
+    memory of a list holding a bytes object per line. Lines can only be
+    added at the end. Indexing returns bytes, slicing returns a LinesView
+    without copying any lines.
+
+    The offsets of newline terminated lines are only computed once the
+    lines are accessed, so adding many small batches of lines is cheap.
+
+    >>> lines = Lines([b'a\n', b'b\n'])
+    >>> lines.append(b'c\n')
+    >>> lines += [b'd']
+    >>> lines[1], lines[-1], len(lines)
+    (b'b\n', b'd', 4)
+    >>> lines[1:3] == [b'b\n', b'c\n']
+    True
+    >>> lines.index(b'c\n')
+    2
+    >>> lines.extend_text(b'e\nf', b'  ')
+    >>> lines[3:]
+    LinesView([b'd', b'  e\n', b'  f\n'])
+    """
+
+    __slots__ = ("_data", "_ends", "_plain")
+
+    def __init__(self, lines=()):
+        self._data = bytearray()
+        self._ends = array("q")
+        # Whether all lines end with their only newline and there are no
+        # carriage returns, so that blocks of lines can be split at C speed
+        self._plain = True
+        self.extend(lines)
+
+    @classmethod
+    def frombytes(cls, data):
+        """Create lines from data, splitting it after each newline"""
+        lines = cls()
+        lines.extend_bytes(data)
+        return lines
+
+    @classmethod
+    def frombuffers(cls, data, ends, plain):
+        """Create lines from the tuple returned by tobuffers()"""
+        lines = cls()
+        lines._data += data
+        lines._ends.frombytes(ends)
+        lines._plain = plain
+        return lines
+
+    def tobuffers(self):
+        """Return the data and line offsets as bytes (for serialization)"""
+        self._index()
+        return bytes(self._data), self._ends.tobytes(), self._plain
+
+    def append(self, line):
+        """Add a line at the end"""
+        terminated = line.endswith(b"\n") and line.find(b"\n") == len(line) - 1
+        if not terminated:
+            self._index()
+        self._data += line
+        if not terminated:
+            self._ends.append(len(self._data))
+        if self._plain:
+            self._plain = terminated and b"\r" not in line
+
+    def extend(self, lines):
+        """Add the lines of an iterable at the end"""
+        for line in lines:
+            self.append(line)
+
+    def __iadd__(self, lines):
+        self.extend(lines)
+        return self
+
+    def extend_bytes(self, data):
+        """Add the lines of data at the end, splitting it after each newline"""
+        cut = data.rfind(b"\n") + 1
+        self._data += data[:cut]
+        if self._plain:
+            self._plain = b"\r" not in data
+        if cut < len(data):
+            self.append(data[cut:])
+
+    def extend_text(self, text, prefix=b""):
+        """Add the lines of text (separated by newlines) at the end.
+
+        Each line is prefixed with prefix and gets a newline appended,
+        without creating a bytes object for each line.
+        """
+        data = self._data
+        data += prefix
+        data += text.replace(b"\n", b"\n" + prefix) if prefix else text
+        data += b"\n"
+        if self._plain:
+            self._plain = b"\r" not in text and b"\r" not in prefix
+
+    def _index(self):
+        """Compute the offsets of newline terminated lines added lately"""
+        data, ends = self._data, self._ends
+        pos = ends[-1] if ends else 0
+        while pos < len(data):
+            end = data.rfind(b"\n", pos, pos + _INDEX_SIZE) + 1
+            if not end:
+                end = data.find(b"\n", pos) + 1
+            parts = data[pos:end].split(b"\n")
+            lengths = map((1).__add__, map(len, parts))
+            offsets = itertools.accumulate(lengths, initial=pos)
+            # The last part is the empty remainder after the last newline
+            ends.extend(itertools.islice(offsets, 1, len(parts)))
+            pos = end
+
+    def __len__(self):
+        self._index()
+        return len(self._ends)
+
+    def _offset(self, index):
+        """Return the offset of the line at index (or the end of the data)"""
+        return self._ends[index - 1] if index else 0
+
+    @staticmethod
+    def _item(index, length):
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("line index out of range")
+        return index
+
+    def _slice(self, index, offset, length):
+        """Return a view of the lines within offset:offset + length"""
+        start, stop, step = index.indices(length)
+        if step != 1:
+            return [self[offset + i] for i in range(start, stop, step)]
+        return LinesView(self, offset + start, offset + max(start, stop))
+
+    def __getitem__(self, index):
+        self._index()
+        ends = self._ends
+        if isinstance(index, slice):
+            return self._slice(index, 0, len(ends))
+        index = self._item(index, len(ends))
+        return bytes(self._data[ends[index - 1] if index else 0 : ends[index]])
+
+    def _blocks(self, start, stop):
+        """Yield lists of the lines within start:stop, block by block"""
+        data, ends = self._data, self._ends
+        for first in range(start, stop, _BLOCK_LINES):
+            last = min(first + _BLOCK_LINES, stop)
+            offset = self._offset(first)
+            # A single copy of the block, lines are sliced from it
+            block = bytes(data[offset : ends[last - 1]])
+            if self._plain:
+                yield block.splitlines(True)
+                continue
+            begin = offset
+            lines = []
+            for end in ends[first:last]:
+                lines.append(block[begin - offset : end - offset])
+                begin = end
+            yield lines
+
+    def _iter(self, start, stop):
+        """Return an iterator over the lines within start:stop"""
+        return itertools.chain.from_iterable(self._blocks(start, stop))
+
+    def __iter__(self):
+        self._index()
+        return self._iter(0, len(self))
+
+    def _find(self, value, start, stop):
+        """Find the first line equal to value within start:stop"""
+        data, ends = self._data, self._ends
+        pos, limit = self._offset(start), self._offset(stop)
+        while True:
+            found = data.find(value, pos, limit)
+            if found < 0:
+                raise ValueError(f"{value!r} is not in lines")
+            index = bisect.bisect_right(ends, found, start, stop)
+            if (
+                index < stop
+                and found == self._offset(index)
+                and ends[index] - found == len(value)
+            ):
+                return index
+            pos = found + 1
+
+    def index(self, value, start=0, stop=None):
+        """Return the index of the first line equal to value.
+
+        The data is searched as a whole instead of line by line.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return self._find(value, start, max(start, stop))
+
+
+class LinesView(_LinesBase):
+    """A read-only view of a range of Lines.
+
+    The lines are shared with the underlying Lines, which may only have
+    lines added at the end while the view is in use.
+    """
+
+    __slots__ = ("_lines", "_start", "_stop")
+
+    def __init__(self, lines, start, stop):
+        self._lines = lines
+        self._start = start
+        self._stop = stop
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        lines = self._lines
+        if isinstance(index, slice):
+            return lines._slice(index, self._start, len(self))
+        return lines[self._start + lines._item(index, len(self))]
+
+    def __iter__(self):
+        return self._lines._iter(self._start, self._stop)
+
+    def index(self, value, start=0, stop=None):
+        """Return the index of the first line equal to value"""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        start, stop = self._start + start, self._start + max(start, stop)
+        return self._lines._find(value, start, stop) - self._start
@@ -0,0 +1,122 @@
+"""Normalization of volatile test output"""
+
+import functools
+import os
+import re
+
+__all__ = ["Normalizer", "normalizer", "substitution"]
+
+# Constructs which can match at the start or end of a line, but not next to
+# the newline separating it from its neighbours in a block of output
+_LINE_SENSITIVE = re.compile(rb"\\[AZ]|\(\?<?[=!]")
+
+
+def substitution(expression):
+    r"""Parse a sed style substitution (s/REGEX/REPLACEMENT/).
+
+    Any character following the s can be used as delimiter instead of /,
+    it can be escaped with a backslash within REGEX and REPLACEMENT.
+    Returns a (pattern, replacement) tuple of bytes. Raises ValueError if
+    the expression or its regular expression is invalid.
+
+    >>> substitution(r's/pid \d+/pid PID/')
+    (b'pid \\d+', b'pid PID')
+    >>> substitution(r's|/tmp/\|[^ ]*|TMP|')
+    (b'/tmp/|[^ ]*', b'TMP')
+    >>> substitution('s/[/x/')
+    Traceback (most recent call last):
+    ...
+    ValueError: invalid regular expression: unterminated character set at position 0
+    """
+    if len(expression) < 2 or expression[0] != "s" or expression[1] in "\\\n":
+        raise ValueError("expected s/REGEX/REPLACEMENT/")
+    delimiter = expression[1]
+    parts, part, escaped = [], [], False
+    for c in expression[2:]:
+        if escaped:
+            part.append(c if c == delimiter else "\\" + c)
+            escaped = False
+        elif c == "\\":
+            escaped = True
+        elif c == delimiter:
+            parts.append("".join(part))
+            part = []
+        else:
+            part.append(c)
+    if len(parts) != 2 or part or escaped:
+        raise ValueError("expected s/REGEX/REPLACEMENT/")
+
+    pattern, replacement = (os.fsencode(p) for p in parts)
+    try:
+        re.compile(pattern)
+    except re.error as ex:
+        raise ValueError(f"invalid regular expression: {ex}") from ex
+    return pattern, replacement
+
+
+class Normalizer:
+    r"""Applies substitutions to each line of test output in a single pass.
+
+    The patterns of all substitutions are combined into one regular
+    expression, which is applied to each line separately (like with sed),
+    so matches never span multiple lines. At each position of a line the
+    first substitution whose pattern matches is applied, the result isn't
+    subject to the other substitutions (unlike with consecutive sed
+    expressions). Replacements are expanded like with re.sub(), but
+    patterns can't refer to their own groups.
+
+    >>> normalize = Normalizer([(rb'pid \d+', b'pid PID'),
+    ...                         (rb'(\d+)\.\d+s', rb'\1s')])
+    >>> normalize(b'pid 42 took 1.25s\npid 7')
+    b'pid PID took 1s\npid PID'
+    >>> Normalizer([(rb'\s+$', b'')])(b'a  \nb ')
+    b'a\nb'
+    >>> Normalizer([(rb'^foo', b'X')])(b'x\nfoo\nfoo')
+    b'x\nX\nX'
+    """
+
+    def __init__(self, substitutions):
+        self._substitutions = []
+        # Maps the number of the group wrapping each pattern to its substitution
+        self._groups = {}
+        alternatives = []
+        group = 1
+        for pattern, replacement in substitutions:
+            compiled = re.compile(pattern)
+            template = b"\\" in replacement
+            self._groups[group] = len(self._substitutions)
+            self._substitutions.append((compiled, replacement, template))
+            alternatives.append(b"(" + pattern + b")")
+            group += 1 + compiled.groups
+        self._pattern = self._search = None
+        if alternatives:
+            pattern = b"|".join(alternatives)
+            self._pattern = re.compile(pattern)
+            # Most blocks don't contain any match, finding out for the whole
+            # block at once spares splitting it. With re.MULTILINE ^ and $
+            # match at each line like they do when applied to single lines.
+            if not _LINE_SENSITIVE.search(pattern):
+                self._search = re.compile(pattern, re.MULTILINE).search
+
+    def _replace(self, match):
+        pattern, replacement, template = self._substitutions[
+            self._groups[match.lastindex]
+        ]
+        if not template:
+            return replacement
+        return pattern.match(match.string, match.start()).expand(replacement)
+
+    def __call__(self, data):
+        """Return data with all substitutions applied to each of its lines"""
+        if self._pattern is None:
+            return data
+        if self._search is not None and self._search(data) is None:
+            return data
+        sub, replace = self._pattern.sub, self._replace
+        return b"\n".join([sub(replace, line) for line in data.split(b"\n")])
+
+
+@functools.lru_cache(maxsize=32)
+def normalizer(substitutions):
+    """Return a Normalizer for a tuple of substitutions, shared between tests"""
+    return Normalizer(substitutions)
@@ -0,0 +1,396 @@
+"""Command line options and configuration files"""
+
+import argparse
+import os
+import shlex
+from collections import defaultdict
+from pathlib import Path
+
+from prysk import normalize
+from prysk.diff import ENGINES
+from prysk.parallel import schedulers
+
+__all__ = ["ArgumentParser", "env_args", "jobs", "load", "substitution"]
+
+
+def load(config, supported, section="prysk", choices=None):
+    """
+    Load configuration options from a init style format config file.
+
+    :param supported: iterable of supported options and their type which should be collected.
+    :param section: which contains the options.
+    :param choices: optional mapping of options to the values they accept.
+    """
+    # Most test suites have no configuration file, spare loading configparser
+    if not os.path.exists(config):
+        return {}
+
+    import configparser
+
+    parser = configparser.ConfigParser()
+    parser.read(config)
+    dispatcher = defaultdict(
+        lambda: (parser.get, "--{}: invalid value: {!r}"),
+        {
+            bool: (parser.getboolean, "--{}: invalid boolean value: {!r}"),
+            int: (parser.getint, "--{}: invalid integer value: {!r}"),
+            float: (parser.getfloat, "--{}: invalid number value: {!r}"),
+            jobs: (
+                lambda *args: jobs(parser.get(*args)),
+                "--{}: invalid jobs value: {!r}",
+            ),
+            # One substitution per line
+            substitution: (
+                lambda *args: [
+                    substitution(line)
+                    for line in parser.get(*args).splitlines()
+                    if line.strip()
+                ],
+                "--{}: invalid substitution: {!r}",
+            ),
+        },
+    )
+    if not parser.has_section(section):
+        return {}
+
+    config = {}
+    for _type, option in supported:
+        if not parser.has_option(section, option):
+            continue
+        try:
+            fetch, error_msg = dispatcher[_type]
+            config[option] = fetch(section, option)
+        except (ValueError, argparse.ArgumentTypeError) as ex:
+            fetch, error_msg = dispatcher[_type]
+            value = parser.get(section, option)
+            raise ValueError(error_msg.format(option, value)) from ex
+        allowed = (choices or {}).get(option)
+        if allowed is not None and config[option] not in allowed:
+            expected = ", ".join(map(repr, allowed))
+            raise ValueError(
+                f"--{option}: invalid choice: {config[option]!r} "
+                f"(choose from {expected})"
+            )
+    return config
+
+
+def jobs(value):
+    """Parse the number of parallel jobs (a positive integer or 'auto')"""
+    if value == "auto":
+        return os.cpu_count() or 1
+    try:
+        count = int(value)
+    except ValueError:
+        count = 0
+    if count < 1:
+        raise argparse.ArgumentTypeError(
+            f"invalid jobs value: {value!r} (expected a positive integer or 'auto')"
+        )
+    return count
+
+
+def substitution(value):
+    """Parse a substitution (see prysk.normalize.substitution)"""
+    try:
+        return normalize.substitution(value)
+    except ValueError as ex:
+        raise argparse.ArgumentTypeError(
+            f"invalid substitution: {value!r} ({ex})"
+        ) from ex
+
+
+def env_args(var, env=None):
+    env = env if env else os.environ
+    args = env.get(var, "").strip()
+    return shlex.split(args)
+
+
+class ArgumentParser:
+    """argparse.Argumentparser compatible argument parser.
+
+    Allows inspection of options supported by the parser"""
+
+    @classmethod
+    def create_parser(cls, version):
+        parser = cls(
+            usage="prysk [OPTIONS] TESTS...",
+            prog="prysk",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        )
+        parser.add_argument(
+            "tests",
+            metavar="TESTS",
+            type=Path,
+            nargs="+",
+            help="Path(s) to the tests to be executed",
+        )
+        parser.add_argument("-V", "--version", action="version", version=version)
+        parser.add_argument(
+            "-q", "--quiet", action="store_true", help="don't print diffs"
+        )
+        parser.add_argument(
+            "-v",
+            "--verbose",
+            action="store_true",
+            help="show filenames and test status",
+        )
+        parser.add_argument(
+            "-i",
+            "--interactive",
+            action="store_true",
+            help="interactively merge changed test output",
+        )
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            help="update tests with their actual output, keeping (re), (glob) "
+            "and (esc) lines which still match",
+        )
+        parser.add_argument(
+            "-d",
+            "--debug",
+            action="store_true",
+            help="write script output directly to the terminal",
+        )
+        parser.add_argument(
+            "-y", "--yes", action="store_true", help="answer yes to all questions"
+        )
+        parser.add_argument(
+            "-n", "--no", action="store_true", help="answer no to all questions"
+        )
+        parser.add_argument(
+            "-E",
+            "--preserve-env",
+            action="store_true",
+            help="don't reset common environment variables",
+        )
+        parser.add_argument(
+            "--keep-tmpdir",
+            action="store_true",
+            help="keep temporary directories",
+        )
+        parser.add_argument(
+            "--shell",
+            action="store",
+            default="/bin/sh",
+            metavar="PATH",
+            help="shell to use for running tests",
+        )
+        parser.add_argument(
+            "--shell-opts",
+            action="store",
+            metavar="OPTS",
+            help="arguments to invoke shell with",
+        )
+        parser.add_argument(
+            "--indent",
+            action="store",
+            default=2,
+            metavar="NUM",
+            type=int,
+            help="number of spaces to use for indentation",
+        )
+        parser.add_argument(
+            "--color",
+            choices=["always", "never", "auto"],
+            default="auto",
+            help="Mode which shall be used for coloring the output",
+        )
+        parser.add_argument(
+            "--xunit-file",
+            action="store",
+            metavar="PATH",
+            help="path to write xUnit XML output",
+        )
+        parser.add_argument(
+            "--json-lines",
+            action="store",
+            metavar="PATH",
+            help="path to write a JSON record of each test to as it finishes "
+            "(- for standard output, other output then goes to standard error)",
+        )
+        parser.add_argument(
+            "--dos2unix",
+            action="store_true",
+            help="convert DOS/Windows line endings to UNIX line endings",
+        )
+        parser.add_argument(
+            "--escape7bit",
+            action="store_true",
+            help="escape all non-7-bit bytes (not just non-printable/invalid UTF-8)",
+        )
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            action="store",
+            default=1,
+            metavar="N",
+            type=jobs,
+            help="number of tests to run in parallel ('auto' uses all CPUs)",
+        )
+        parser.add_argument(
+            "--schedule",
+            choices=sorted(schedulers),
+            default="sorted",
+            help="order in which parallel tests are dispatched "
+            "('longest' runs the slowest tests first)",
+        )
+        parser.add_argument(
+            "--history-file",
+            action="store",
+            metavar="PATH",
+            help="path of a file recording test durations for scheduling",
+        )
+        parser.add_argument(
+            "--cache",
+            action="store",
+            metavar="DIR",
+            help="directory caching passing results, unchanged tests are skipped",
+        )
+        parser.add_argument(
+            "--cache-max-age",
+            action="store",
+            default=7,
+            metavar="DAYS",
+            type=int,
+            help="evict cache entries which haven't been used for DAYS days",
+        )
+        parser.add_argument(
+            "--cache-max-size",
+            action="store",
+            default=100,
+            metavar="MB",
+            type=int,
+            help="evict least recently used cache entries beyond MB megabytes",
+        )
+        parser.add_argument(
+            "--parse-cache",
+            action="store",
+            metavar="DIR",
+            help="directory caching parsed test files, unchanged tests aren't "
+            "parsed again",
+        )
+        parser.add_argument(
+            "--timeout",
+            action="store",
+            metavar="SECONDS",
+            type=float,
+            help="fail tests running longer than SECONDS",
+        )
+        parser.add_argument(
+            "--command-timeout",
+            action="store",
+            metavar="SECONDS",
+            type=float,
+            help="fail tests with a single command running longer than SECONDS",
+        )
+        parser.add_argument(
+            "--framing",
+            choices=["auto", "fd", "inline"],
+            default="auto",
+            help="how command boundaries are reported ('fd' uses file "
+            "descriptors 8 and 9 instead of marker lines in the output, tests "
+            "can't use them or the _prysk_ack variable; 'auto' uses 'fd' if "
+            "command timings are reported, which it makes accurate)",
+        )
+        parser.add_argument(
+            "--diff-engine",
+            choices=ENGINES,
+            default="auto",
+            help="algorithm used to diff the output of failing tests",
+        )
+        parser.add_argument(
+            "--max-diff-hunks",
+            action="store",
+            metavar="N",
+            type=int,
+            help="report at most N hunks of each diff (0 only reports whether "
+            "tests failed, without computing diffs)",
+        )
+        parser.add_argument(
+            "--max-diff-bytes",
+            action="store",
+            metavar="N",
+            type=int,
+            help="report at most N bytes of each diff",
+        )
+        parser.add_argument(
+            "--max-diff-lines",
+            action="store",
+            metavar="N",
+            type=int,
+            help="print at most N lines of each diff (the full output is "
+            "kept in the .err file)",
+        )
+        parser.add_argument(
+            "--normalize",
+            action="append",
+            metavar="s/REGEX/REPLACEMENT/",
+            type=substitution,
+            help="replace matches of REGEX in the output of commands before "
+            "comparing it (may be given multiple times)",
+        )
+        parser.add_argument(
+            "--durations",
+            action="store",
+            metavar="N",
+            type=int,
+            help="list the N slowest commands (0 lists all commands)",
+        )
+        parser.add_argument(
+            "--resources",
+            action="store_true",
+            help="show CPU time, peak memory, I/O and context switches of each "
+            "test (with --verbose)",
+        )
+        parser.add_argument(
+            "--trace-file",
+            action="store",
+            metavar="PATH",
+            help="path to write a timeline of the run in Chrome trace event format",
+        )
+        return parser
+
+    def __init__(self, *args, **kwargs):
+        self._options = []
+        self._choices = {}
+        self._parser = argparse.ArgumentParser(*args, **kwargs)
+
+    def add_argument(self, *args, **kwargs):
+        """See argparser.Argumentparser:add_argument"""
+
+        def is_boolean_option(a):
+            return a.nargs is not None and isinstance(a.const, bool)
+
+        action = self._parser.add_argument(*args, **kwargs)
+        if not action.type:
+            _type = bool if is_boolean_option(action) else None
+        else:
+            _type = action.type
+        self._options.append((_type, action.dest))
+        if action.choices is not None:
+            self._choices[action.dest] = action.choices
+        return action
+
+    def __getattr__(self, item):
+        return getattr(self._parser, item)
+
+    @property
+    def options(self):
+        """
+        Normalized options and their type except for -V, --version and -h, --help.
+
+        :return: an iterable containing all boolean options.
+        :rtype: Iterable[Tuple(type, str)]
+        """
+        return self._options
+
+    @property
+    def choices(self):
+        """
+        Options restricted to a set of values and the values they accept.
+
+        :return: a mapping of option names to their choices.
+        :rtype: Dict[str, Sequence[str]]
+        """
+        return self._choices
@@ -0,0 +1,204 @@
+"""Capturing and splitting the output of test shells"""
+
+import re
+import tempfile
+import time
+
+__all__ = ["Output", "parse_times", "strip"]
+
+# Amount of raw test output kept in memory before it is moved to a temporary
+# file (the processed output lines are always kept in memory)
+_SPOOL_SIZE = 4 * 1024 * 1024
+
+# Amount of test output read back and processed at once
+_BLOCK_SIZE = 1024 * 1024
+
+
+# Output of the times builtin, e.g. "0m0.004s 0m0.000s"
+_TIMES = re.compile(rb"(\d+)m(\d+(?:[.,]\d*)?)s")
+
+
+def parse_times(data):
+    r"""Parse the CPU time records written by prysk.test.test().
+
+    Each record consists of the index of a command marker, followed by the
+    output of the times shell builtin. Returns a dict mapping the indexes to
+    the user and system time used by the shell's children, summed up.
+    Incomplete records, and records in a format other than the POSIX one
+    (two lines of user and system time, as written by e.g. bash and dash),
+    are left out.
+
+    >>> parse_times(b'3\n0m0.01s 0m0.02s\n0m1.5s 1m0.25s\n'
+    ...           b'7\n0m0.01s 0m0.02s\n0m2.000000s 1m0')
+    {3: 61.75}
+    >>> parse_times(b'1\nshell  0.01s user 0.00s system\n'
+    ...           b'children  0.00s user 0.00s system\n2\n')
+    {}
+    """
+    records, record = [], None
+    for line in data.splitlines():
+        if line.isdigit():
+            record = [int(line)]
+            records.append(record)
+        elif record is not None:
+            record.append(line)
+
+    cputimes = {}
+    for record in records:
+        values = _TIMES.findall(record[2]) if len(record) == 3 else ()
+        if len(values) == 2:
+            seconds = (int(m) * 60 + float(s.replace(b",", b".")) for m, s in values)
+            cputimes[record[0]] = sum(seconds)
+    return cputimes
+
+
+class Output:
+    r"""Streaming demultiplexer for the output of a test shell.
+
+    Output is split into per-command segments as it arrives, either at the
+    salted command markers within the output or, if salt is None, at the
+    records passed to frame(). Segment data is written to a spooled
+    temporary file, so the raw output is moved to disk once it gets large
+    and is read back in blocks (see segments()). This bounds the memory
+    used for capturing and splitting the output, not for the output lines
+    built from it, which prysk.test.test() keeps in memory in full.
+
+    If timeout is set, the deadline is reset to timeout seconds in the
+    future every time a command marker shows up.
+
+    >>> output = Output(b'SALT')
+    >>> for chunk in (b'start\nSA', b'LT 0 0\nfoo\nbarSALT 2', b' 1\nbaz'):
+    ...     _ = output.write(chunk)
+    >>> output.finish()
+    >>> [(b''.join(blocks), rec and rec[:2]) for blocks, rec in output.segments()]
+    [(b'start\n', (0, 0)), (b'foo\nbar', (2, 1)), (b'baz', None)]
+
+    >>> output = Output(None)
+    >>> _ = output.write(b'foo SALT 0 0\n')
+    >>> output.frame(b'1 0')
+    >>> output.finish()
+    >>> [(b''.join(blocks), rec and rec[:2]) for blocks, rec in output.segments()]
+    [(b'foo SALT 0 0\n', (1, 0))]
+    """
+
+    def __init__(self, salt, timeout=None, spool_size=_SPOOL_SIZE):
+        self._salt = salt
+        self._pending = b""
+        self._spool = tempfile.SpooledTemporaryFile(max_size=spool_size)
+        self._start = 0
+        self._segments = []
+        self.timeout = timeout
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.rusage = None
+
+    def write(self, data):
+        """Feed a chunk of output"""
+        size = len(data)
+        if self._salt is None:
+            self._spool.write(data)
+            return size
+
+        data = self._pending + data if self._pending else data
+        salt, start = self._salt, 0
+        while True:
+            idx = data.find(salt, start)
+            end = -1 if idx < 0 else data.find(b"\n", idx)
+            if end < 0:
+                break
+            self._spool.write(data[start:idx])
+            self._record(data[idx + len(salt) : end])
+            start = end + 1
+
+        # Keep back a partial command marker, or what might be the
+        # beginning of one, until more output arrives.
+        cut = idx if idx >= 0 else max(start, len(data) - len(salt) + 1)
+        self._spool.write(data[start:cut])
+        self._pending = data[cut:]
+        return size
+
+    def frame(self, record):
+        """End the current segment with an out-of-band command record"""
+        self._record(record)
+
+    def _record(self, record):
+        index, ret = record.split()
+        end = self._spool.tell()
+        record = (int(index), int(ret), time.monotonic())
+        self._segments.append((self._start, end, record))
+        self._start = end
+        if self.timeout is not None:
+            self.deadline = time.monotonic() + self.timeout
+
+    def finish(self):
+        """Flush pending output once the shell is done"""
+        self._spool.write(self._pending)
+        self._pending = b""
+        end = self._spool.tell()
+        if end > self._start:
+            self._segments.append((self._start, end, None))
+            self._start = end
+
+    def segments(self):
+        """Yield (blocks, record) tuples for all segments.
+
+        blocks is an iterator over the output of the segment in blocks of
+        whole lines (apart from trailing output without a line ending),
+        record is an (index, return code, monotonic time) tuple for the
+        command marker ending the segment (or None for trailing output
+        without a marker).
+        """
+        for start, end, record in self._segments:
+            yield self._blocks(start, end), record
+
+    def _blocks(self, start, end):
+        spool = self._spool
+        spool.seek(start)
+        remaining = end - start
+        pending = b""
+        while remaining > 0:
+            data = spool.read(min(remaining, _BLOCK_SIZE))
+            remaining -= len(data)
+            if pending:
+                data = pending + data
+            # Split after the last newline, so that lines (including
+            # Windows style line endings) are never split across blocks
+            cut = data.rfind(b"\n") + 1 if remaining else len(data)
+            if cut:
+                yield data[:cut]
+            pending = data[cut:]
+
+    def expired(self):
+        """Check if the deadline of the running command has passed"""
+        return self.deadline is not None and self.deadline <= time.monotonic()
+
+    def close(self):
+        self._spool.close()
+
+
+def strip(block, dos2unix):
+    r"""Join the lines of a block of output with newlines, stripping line endings.
+
+    Lines are split at carriage returns as well (see bytes.splitlines()),
+    unless they are part of a Windows style line ending and dos2unix is set.
+    A missing line ending at the end of the block is marked with (no-eol).
+
+    >>> strip(b'a\nb\n', False)
+    b'a\nb'
+    >>> strip(b'a\r\nb\rc', True)
+    b'a\nb\r (no-eol)\nc (no-eol)'
+    """
+    if b"\r" not in block:
+        if block.endswith(b"\n"):
+            return block[:-1]
+        return block + b" (no-eol)"
+    stripped = []
+    for out in block.splitlines(True):
+        # Convert Windows style line endings to UNIX
+        if dos2unix and out.endswith(b"\r\n"):
+            out = out[:-2]
+        elif out.endswith(b"\n"):
+            out = out[:-1]
+        else:
+            out += b" (no-eol)"
+        stripped.append(out)
+    return b"\n".join(stripped)
@@ -0,0 +1,191 @@
+"""Utilities for running tests concurrently"""
+
+import os
+import time
+from pathlib import Path
+
+# json, tempfile, threading and concurrent.futures are imported where they're
+# used, as the schedulers are needed for parsing the command line (see
+# prysk.options)
+
+__all__ = ["History", "runparallel", "schedulers"]
+
+# Estimated seconds per byte of test file, used for unknown tests when
+# there is no history to derive a better estimate from.
+_SECONDS_PER_BYTE = 1e-5
+
+# Seconds between attempts to kill the tests running when a run is interrupted
+_KILL_INTERVAL = 0.05
+
+
+class History:
+    """Wall times of previous test runs, persisted as a small JSON file"""
+
+    VERSION = 1
+
+    def __init__(self, path=None, durations=None):
+        self.path = path
+        self.durations = {} if durations is None else durations
+
+    @classmethod
+    def load(cls, path):
+        """Load the history stored at path, an unreadable file yields an empty one"""
+        import json
+
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get("version") != cls.VERSION:
+            return cls(path)
+        return cls(path, dict(data.get("durations", {})))
+
+    def save(self):
+        """Atomically write the history back to its file"""
+        import json
+        import tempfile
+
+        path = Path(self.path)
+        fd, tmp = tempfile.mkstemp(prefix=f".{path.name}-", dir=path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": self.VERSION, "durations": self.durations},
+                    f,
+                    indent=1,
+                    sort_keys=True,
+                )
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def record(self, tests):
+        """Record the wall time of tests.
+
+        tests should be a sequence of 2-tuples containing the following:
+
+            (test path, test function)
+
+        This function yields a new sequence where each test function is
+        wrapped with a function that measures its wall time.
+        """
+        for path, test in tests:
+
+            def testwrapper(path=path, test=test):
+                """Run test and record its duration"""
+                start = time.monotonic()
+                result = test()
+                self.durations[f"{path}"] = time.monotonic() - start
+                return result
+
+            yield path, testwrapper
+
+    def estimate(self, path, rate=None):
+        """Estimate how long the test at path will take.
+
+        Tests without history are estimated based on their file size and
+        rate (seconds per byte), which defaults to the average rate of the
+        tests with history.
+        """
+        try:
+            return self.durations[f"{path}"]
+        except KeyError:
+            rate = self.rate() if rate is None else rate
+            return _size(path) * rate
+
+    def rate(self):
+        """Average time per byte of test file of the tests with history"""
+        seconds = size = 0
+        for path, duration in self.durations.items():
+            seconds += duration
+            size += _size(path)
+        return seconds / size if seconds and size else _SECONDS_PER_BYTE
+
+
+def _size(path):
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+
+def _sorted(history):
+    """Dispatch tests in discovery (sorted path) order"""
+    return list
+
+
+def _longest(history):
+    """Dispatch the tests expected to take longest first"""
+    history = History() if history is None else history
+
+    def schedule(tests):
+        rate = history.rate()
+        return sorted(tests, key=lambda t: history.estimate(t[0], rate), reverse=True)
+
+    return schedule
+
+
+# Maps scheduler names to factories creating a schedule function based on a
+# History (or None). A schedule function receives the list of
+# (test path, test function) tuples and returns them in dispatch order.
+schedulers = {
+    "sorted": _sorted,
+    "longest": _longest,
+}
+
+
+def runparallel(tests, jobs, schedule=None):
+    """Run tests concurrently and yield results in their original order.
+
+    tests should be a sequence of 2-tuples containing the following:
+
+        (test path, test function)
+
+    All test functions are dispatched to a pool of jobs worker threads
+    up front, in the order returned by schedule (if set). This function
+    yields a new sequence where each test function is replaced by one
+    waiting for, and returning, the result of the dispatched test.
+    Consumers therefore see results in the same order as they would when
+    running the tests one after another.
+
+    If the consumer stops before all results have been returned (e.g.
+    because of a KeyboardInterrupt), tests which haven't started are
+    cancelled and the processes of running tests are killed (see
+    prysk.process.kill_running).
+    """
+    import threading
+    from concurrent.futures import (
+        ThreadPoolExecutor,
+        wait,
+    )
+
+    from prysk.process import kill_running
+
+    workers = set()
+
+    def run(test):
+        workers.add(threading.get_ident())
+        return test()
+
+    tests = list(tests)
+    dispatch = tests if schedule is None else schedule(tests)
+    executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="prysk")
+    futures = {}
+    try:
+        for entry in dispatch:
+            futures[id(entry)] = executor.submit(run, entry[1])
+        for entry in tests:
+            yield entry[0], futures[id(entry)].result
+    finally:
+        for future in futures.values():
+            future.cancel()
+        # If the run was interrupted, the running tests are killed instead
+        # of waiting for them. Again until they are done, as workers may
+        # have been about to start a test shell.
+        running = [future for future in futures.values() if not future.done()]
+        while running:
+            kill_running(workers)
+            running = wait(running, timeout=_KILL_INTERVAL).not_done
+        executor.shutdown(wait=True)
@@ -0,0 +1,89 @@
+"""Parsing of test files"""
+
+from prysk.diff import invalid
+from prysk.lines import Lines
+
+__all__ = ["ParsedTest", "parse"]
+
+
+class ParsedTest:
+    """A test split into its expected output and the script to run.
+
+    refout holds the lines of the test (with normalized line endings) as
+    prysk.lines.Lines.
+
+    script is a list of (index, code) tuples: code is the code of the
+    command at refout[index], including its continuation lines. An index of
+    -1 denotes continuation lines preceding the first command.
+
+    after maps the index of each command (-1 for the start of the test) to
+    the lines which aren't part of its output, but follow it in the test
+    (e.g. comments and the next command line), joined into bytes.
+
+    invalid lists the (line number, error message) tuples of output lines
+    with invalid (re) or (glob) patterns.
+    """
+
+    __slots__ = ("refout", "script", "after", "invalid")
+
+    def __init__(self, refout, script, after, invalid):
+        self.refout = refout
+        self.script = script
+        self.after = after
+        self.invalid = invalid
+
+    def __eq__(self, other):
+        if not isinstance(other, ParsedTest):
+            return NotImplemented
+        return self.astuple() == other.astuple()
+
+    def astuple(self):
+        """Return the fields as a tuple (of types supported by marshal)"""
+        return self.refout.tobuffers(), self.script, self.after, self.invalid
+
+    @classmethod
+    def fromtuple(cls, fields):
+        """Create a ParsedTest from the fields returned by astuple()"""
+        refout, script, after, patterns = fields
+        return cls(Lines.frombuffers(*refout), script, after, patterns)
+
+
+def parse(lines, indent=2, dos2unix=False):
+    r"""Parse the lines of a test.
+
+    >>> parsed = parse([b'Comment\n', b'  $ echo a\n', b'  > b\n', b'  a'])
+    >>> list(parsed.refout)
+    [b'Comment\n', b'  $ echo a\n', b'  > b\n', b'  a\n']
+    >>> parsed.script
+    [(1, b'echo a\nb\n')]
+    >>> parsed.after
+    {-1: b'Comment\n  $ echo a\n  > b\n'}
+    """
+    prefix = b" " * indent
+    cmdline = prefix + b"$ "
+    conline = prefix + b"> "
+    refout, script, after = [], [], {}
+    pos = prepos = -1
+    for i, line in enumerate(lines):
+        # Convert Windows style line endings to UNIX
+        if dos2unix and line.endswith(b"\r\n"):
+            line = line[:-2] + b"\n"
+        elif not line.endswith(b"\n"):
+            line += b"\n"
+        refout.append(line)
+        if line.startswith(cmdline):
+            after.setdefault(pos, []).append(line)
+            prepos = pos
+            pos = i
+            script.append((i, [line[len(cmdline) :]]))
+        elif line.startswith(conline):
+            after.setdefault(prepos, []).append(line)
+            if not script:
+                script.append((-1, []))
+            script[-1][1].append(line[len(conline) :])
+        elif not line.startswith(prefix):
+            after.setdefault(pos, []).append(line)
+    script = [(index, b"".join(code)) for index, code in script]
+    after = {index: b"".join(lines) for index, lines in after.items()}
+    patterns = [(index + 1, error) for index, error in invalid(refout, indent)]
+    return ParsedTest(Lines.frombytes(b"".join(refout)), script, after, patterns)
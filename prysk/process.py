@@ -1,29 +1,311 @@
 """Utilities for running subprocesses"""
 
+import io
 import os
+import select
+import selectors
 import signal
 import subprocess
 import sys
+import threading
+import time
+from collections import namedtuple
 
-__all__ = ["PIPE", "STDOUT", "execute"]
+try:
+    import fcntl
+except ImportError:  # pragma: no cover (not available on Windows)
+    fcntl = None
+
+__all__ = [
+    "ACK_FD",
+    "FRAME_FD",
+    "PIPE",
+    "STDOUT",
+    "ResourceUsage",
+    "TimeoutExpired",
+    "execute",
+    "kill_running",
+]
 
 PIPE = subprocess.PIPE
 STDOUT = subprocess.STDOUT
+TimeoutExpired = subprocess.TimeoutExpired
+
+# File descriptors of the framing side channel in the child process (see
+# execute()). Shells like dash only support single digit descriptors.
+FRAME_FD = 8
+ACK_FD = 9
+
+# Writes of at most PIPE_BUF bytes to a pipe which has been reported
+# as writable never block.
+_PIPE_BUF = getattr(select, "PIPE_BUF", 512)
+_CHUNK_SIZE = 32768
+
+# Processes run by execute(), mapped to the thread running them and whether
+# they have their own process group, and those killed by kill_running()
+_running = {}
+_killed = set()
+
+# Resources used by a process and all of its children it waited for. CPU
+# times are in seconds, maxrss (the peak resident set size) in bytes.
+ResourceUsage = namedtuple(
+    "ResourceUsage",
+    ("user", "system", "maxrss", "inblock", "oublock", "nvcsw", "nivcsw"),
+)
+
+
+def _makepreexec(fds):
+    """Make a function setting up fds in a subprocess (None if there are none).
+
+    fds maps file descriptor numbers in the subprocess to the file
+    descriptors (in this process) they should refer to.
+
+    Running Python code in the child forces subprocess to fork() the whole
+    process, so it's only done when descriptors have to be moved (which
+    shells like dash can't do for numbers above 9). Otherwise subprocess
+    can use vfork() or posix_spawn(), which is much faster for large
+    processes and safe while other threads run.
+    """
+    if not fds:
+        return None
+
+    def preexec():
+        # Move sources out of the way first, so that they can't be
+        # clobbered by duplicating another source onto their number.
+        sources = {
+            target: fcntl.fcntl(fd, fcntl.F_DUPFD, max(fds) + 1)
+            for target, fd in fds.items()
+        }
+        for target, fd in sources.items():
+            os.dup2(fd, target)
+            os.close(fd)
+
+    return preexec
+
+
+class _Frames:
+    """Parent side of the framing side channel"""
+
+    def __init__(self):
+        self.read, self._write = os.pipe()
+        self._ack_read, self.ack = os.pipe()
+        self._pending = b""
+
+    @property
+    def fds(self):
+        """File descriptors for the child process (see _makepreexec)"""
+        return {FRAME_FD: self._write, ACK_FD: self._ack_read}
+
+    def started(self):
+        """Close the child's ends of the pipes once it has been started"""
+        os.close(self._write)
+        os.close(self._ack_read)
+
+    def receive(self, data):
+        """Yield the complete frame records received so far"""
+        *records, self._pending = (self._pending + data).split(b"\n")
+        yield from records
+
+    def acknowledge(self):
+        try:
+            os.write(self.ack, b"\n")
+        except BrokenPipeError:
+            pass
+
+    def close(self):
+        for fd in (self.read, self.ack):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def _drain(selector, fileobj, sink):
+    """Pass all output currently available from fileobj (non-blocking) to sink"""
+    while True:
+        try:
+            data = os.read(fileobj.fileno(), _CHUNK_SIZE)
+        except BlockingIOError:
+            return
+        if not data:
+            selector.unregister(fileobj)
+            fileobj.close()
+            return
+        sink.write(data)
+
+
+def _kill(process, group):
+    """Kill process, or its whole process group if group is set"""
+    try:
+        if group:
+            os.killpg(process.pid, signal.SIGKILL)
+        elif process.poll() is None:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def kill_running(threads):
+    """Kill the processes which execute() runs in threads (a set of idents).
+
+    Processes with their own process group are killed along with all
+    processes in it. The calls to execute() running them raise
+    KeyboardInterrupt instead of returning, as their output is incomplete.
+    """
+    for process, (thread, group) in list(_running.items()):
+        if thread in threads:
+            _killed.add(process)
+            _kill(process, group)
+
 
+def _exitcode(status):
+    """Convert a wait status into a return code like Popen.returncode"""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
 
-def _makeresetsigpipe():
-    """Make a function to reset SIGPIPE to SIG_DFL (for use in subprocesses).
 
-    Doing subprocess.Popen(..., preexec_fn=makeresetsigpipe()) will prevent
-    Python's SIGPIPE handler (SIG_IGN) from being inherited by the
-    child process.
+def _wait(process, timeout=None):
+    """Wait for process like Popen.wait() and return its resource usage.
+
+    The resource usage is None if it isn't available (e.g. on Windows).
     """
-    if sys.platform == "win32" or getattr(signal, "SIGPIPE", None) is None:
+    if not hasattr(os, "wait4") or process.returncode is not None:
+        process.wait(timeout)
         return None
-    return lambda: signal.signal(signal.SIGPIPE, signal.SIG_DFL)
 
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delay = 0.0005
+    while True:
+        try:
+            pid, status, rusage = os.wait4(
+                process.pid, 0 if deadline is None else os.WNOHANG
+            )
+        except ChildProcessError:
+            # Reaped by the subprocess module in the meantime
+            process.wait(timeout)
+            return None
+        if pid:
+            break
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutExpired(process.args, timeout)
+        delay = min(delay * 2, remaining, 0.05)
+        time.sleep(delay)
+
+    process.returncode = _exitcode(status)
+    # ru_maxrss is in kilobytes, except on macOS
+    maxrss = rusage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    return ResourceUsage(
+        rusage.ru_utime,
+        rusage.ru_stime,
+        maxrss,
+        rusage.ru_inblock,
+        rusage.ru_oublock,
+        rusage.ru_nvcsw,
+        rusage.ru_nivcsw,
+    )
+
+
+def _deadline(deadline, sink):
+    """Return the earliest of the overall and the sink's deadline"""
+    deadlines = [d for d in (deadline, getattr(sink, "deadline", None)) if d]
+    return min(deadlines) if deadlines else None
+
+
+def _communicate(process, stdin, sink, deadline, frames=None):
+    """Feed stdin to process and pass its output to sink until done.
+
+    If frames is set, frame records received on the side channel are passed
+    to sink.frame(), after all output the process produced before writing
+    the record has been passed to sink.write().
+
+    Returns the resource usage of the process (see _wait). Raises
+    TimeoutExpired if the deadline (see _deadline) passes first.
+    """
+    stdin = memoryview(stdin or b"")
+    offset = 0
+    with selectors.DefaultSelector() as selector:
+        if process.stdin:
+            if stdin:
+                selector.register(process.stdin, selectors.EVENT_WRITE)
+            else:
+                process.stdin.close()
+        if process.stdout:
+            selector.register(process.stdout, selectors.EVENT_READ)
+        if frames:
+            selector.register(frames.read, selectors.EVENT_READ)
+            if process.stdout:
+                os.set_blocking(process.stdout.fileno(), False)
+
+        while selector.get_map():
+            expiry = _deadline(deadline, sink)
+            remaining = None if expiry is None else expiry - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutExpired(process.args, None)
+
+            for key, _ in selector.select(remaining):
+                if key.fileobj is process.stdin:
+                    try:
+                        offset += os.write(key.fd, stdin[offset : offset + _PIPE_BUF])
+                    except BrokenPipeError:
+                        offset = len(stdin)
+                    if offset >= len(stdin):
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+                elif frames and key.fileobj == frames.read:
+                    data = os.read(key.fd, _CHUNK_SIZE)
+                    if not data:
+                        selector.unregister(key.fileobj)
+                    # The process waits for an acknowledgement after each
+                    # record, so all of its output up to the record is
+                    # available by now.
+                    for record in frames.receive(data):
+                        if process.stdout and not process.stdout.closed:
+                            _drain(selector, process.stdout, sink)
+                        sink.frame(record)
+                        frames.acknowledge()
+                elif frames:
+                    _drain(selector, key.fileobj, sink)
+                else:
+                    data = os.read(key.fd, _CHUNK_SIZE)
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+                    else:
+                        sink.write(data)
 
-def execute(args, stdin=None, stdout=None, stderr=None, cwd=None, env=None):
+    expiry = _deadline(deadline, sink)
+    remaining = None if expiry is None else max(expiry - time.monotonic(), 0)
+    return _wait(process, remaining)
+
+
+def _execute_windows(process, stdin, timeout, sink):
+    """Fallback for platforms without select() support for pipes"""
+    try:
+        out, _err = process.communicate(stdin, timeout)
+    except TimeoutExpired as ex:
+        process.kill()
+        out, _err = process.communicate()
+        raise TimeoutExpired(process.args, timeout, output=out) from ex
+    if sink is not None:
+        sink.write(out or b"")
+        sink.rusage = None
+        out = None
+    return out, process.returncode
+
+
+def execute(
+    args,
+    stdin=None,
+    stdout=None,
+    stderr=None,
+    cwd=None,
+    env=None,
+    timeout=None,
+    sink=None,
+    framed=False,
+):
     """Run a process and return its output and return code.
 
     stdin may either be None or a string to send to the process.
@@ -40,21 +322,104 @@ def execute(args, stdin=None, stdout=None, stderr=None, cwd=None, env=None):
     env can be set to a dictionary to override the process's environment
     variables.
 
+    timeout is the number of seconds the process may run. The process is
+    started in its own process group, which is killed as a whole once the
+    time is up; TimeoutExpired is raised afterwards. Its output attribute
+    holds the output captured so far.
+
+    sink can be set to a file-like object which receives the process's
+    output (see stdout) chunk by chunk as it is produced, instead of it
+    being returned. If the sink has a deadline attribute, it is treated as
+    an additional monotonic point in time at which the process is
+    considered to have timed out. Once the process has finished (or has
+    been killed), the sink's rusage attribute is set to the ResourceUsage
+    of the process and its children (None where this isn't available).
+
+    If framed is set, the process gets a side channel for framing its
+    output: lines it writes to file descriptor FRAME_FD are passed to
+    sink.frame() one by one, each after all output the process produced
+    before writing it. Once a frame record has been handled, a newline is
+    written to file descriptor ACK_FD of the process, which the process
+    has to wait for (e.g. using "read _ <&9") before producing more output.
+    Framing requires a sink and a POSIX system.
+
     This function returns a 2-tuple of (output, returncode).
     """
     if sys.platform == "win32":
         args = [os.fsdecode(arg) for arg in args]
 
-    process = subprocess.Popen(
-        args,
-        stdin=PIPE,
-        stdout=stdout,
-        stderr=stderr,
-        cwd=cwd,
-        env=env,
-        bufsize=-1,
-        preexec_fn=_makeresetsigpipe(),
-        close_fds=os.name == "posix",
-    )
-    out, _err = process.communicate(stdin)
-    return out, process.returncode
+    watched = timeout is not None or getattr(sink, "deadline", None) is not None
+    # Processes whose output is captured get their own process group, so
+    # that they can be killed with all processes they started
+    group = (watched or sink is not None) and hasattr(os, "killpg")
+    frames = _Frames() if framed else None
+    try:
+        process = subprocess.Popen(
+            args,
+            stdin=PIPE,
+            stdout=stdout,
+            stderr=stderr,
+            cwd=cwd,
+            env=env,
+            bufsize=-1,
+            preexec_fn=_makepreexec(frames.fds if frames else None),
+            # Signals ignored by Python (like SIGPIPE) get their default
+            # handlers back, without running Python code in the child
+            restore_signals=True,
+            # Descriptors set up by preexec_fn would be closed otherwise,
+            # all other descriptors are non-inheritable anyway.
+            close_fds=os.name == "posix" and not frames,
+            start_new_session=group,
+        )
+    except BaseException:
+        if frames:
+            frames.started()
+            frames.close()
+        raise
+    if frames:
+        frames.started()
+    _running[process] = (threading.get_ident(), group)
+    try:
+        return _finish(process, args, stdin, timeout, sink, frames, watched, group)
+    finally:
+        del _running[process]
+        if process in _killed:
+            _killed.discard(process)
+            raise KeyboardInterrupt
+
+
+def _finish(process, args, stdin, timeout, sink, frames, watched, group):
+    """Communicate with a process started by execute() until it's done"""
+    if not watched and sink is None:
+        out, _err = process.communicate(stdin)
+        return out, process.returncode
+    if sys.platform == "win32":
+        return _execute_windows(process, stdin, timeout, sink)
+
+    output = io.BytesIO() if sink is None else sink
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        usage = _communicate(process, stdin, output, deadline, frames)
+    except TimeoutExpired:
+        _kill(process, group)
+        usage = _wait(process)
+        out = None
+        if sink is None:
+            out = output.getvalue()
+        else:
+            sink.rusage = usage
+        raise TimeoutExpired(args, timeout, output=out) from None
+    except BaseException:
+        _kill(process, group)
+        process.wait()
+        raise
+    finally:
+        for pipe in (process.stdin, process.stdout):
+            if pipe and not pipe.closed:
+                pipe.close()
+        if frames:
+            frames.close()
+    if sink is None:
+        return output.getvalue(), process.returncode
+    sink.rusage = usage
+    return None, process.returncode
@@ -11,6 +11,7 @@ class Settings:
     quiet: bool = None
     verbose: bool = None
     interactive: bool = None
+    update: bool = None
     debug: bool = None
     yes: bool = None
     no: bool = None
@@ -21,8 +22,27 @@ class Settings:
     indent: int = None
     color: str = "auto"
     xunit_file: str = None
+    json_lines: str = None
     dos2unix: bool = None
     escape7bit: bool = None
+    jobs: int = None
+    schedule: str = None
+    history_file: str = None
+    cache: str = None
+    cache_max_age: int = None
+    cache_max_size: int = None
+    parse_cache: str = None
+    timeout: float = None
+    command_timeout: float = None
+    framing: str = None
+    diff_engine: str = None
+    max_diff_hunks: int = None
+    max_diff_bytes: int = None
+    max_diff_lines: int = None
+    normalize: list = None
+    durations: int = None
+    trace_file: str = None
+    resources: bool = None
 
 
 def settings_from(obj):
@@ -60,6 +80,9 @@ def merge_settings(lhs, rhs):
     for name, value in rhs_items.items():
         value = value if value is not None else lhs_items.get(name, None)
         setattr(lhs, name, value)
+    # Substitutions of both layers apply
+    if lhs_items.get("normalize") and rhs_items.get("normalize"):
+        lhs.normalize = rhs_items["normalize"] + lhs_items["normalize"]
     lhs.tests.extend(rhs.tests)
     lhs.shell_opts.extend(rhs.shell_opts)
     return lhs
@@ -1,97 +1,119 @@
 """Utilities for running individual tests"""
 
-import itertools
 import os
 import re
+import shlex
+import tempfile
 import time
+from collections import namedtuple
 from contextlib import contextmanager
 from pathlib import Path
 
 from prysk.diff import (
+    Diff,
     esc,
     glob,
     regex,
-    unified_diff,
+)
+from prysk.escape import escape_text
+from prysk.lines import Lines
+from prysk.normalize import normalizer
+from prysk.output import (
+    Output,
+    parse_times,
+    strip,
+)
+from prysk.parse import (
+    ParsedTest,
+    parse,
 )
 from prysk.process import (
+    ACK_FD,
+    FRAME_FD,
     PIPE,
     STDOUT,
+    TimeoutExpired,
     execute,
 )
+from prysk.trace import span
 
-__all__ = ["test", "testfile", "runtests"]
+__all__ = ["Result", "Timing", "test", "testfile", "runtests"]
 
 _SKIP = 80
 
-_is_escaping_needed_7bit = re.compile(rb"[\x00-\x1f\x7f-\xff]").search
 
+class Result(namedtuple("Result", ("refout", "postout", "diff"))):
+    r"""Outcome of a test run.
 
-def _escape_7bit(b):
-    r"""Escape bytes that aren't printable 7-bit ASCII.
-    Append `` (esc)`` if escaping was necessary.
+    A result unpacks like a 3-tuple of (refout, postout, diff), additional
+    details about the run are available as attributes:
 
-    Example usage:
+    cached
+        True if the outcome was taken from a result cache instead of
+        running the test.
 
-    >>> _escape_7bit(b'foo \\')
-    b'foo \\'
-    >>> _escape_7bit(b'foo \\ \r')
-    b'foo \\\\ \\r (esc)'
-    >>> _escape_7bit('☺'.encode())
-    b'\\xe2\\x98\\xba (esc)'
-    """
-    if _is_escaping_needed_7bit(b):
-        return b.decode("latin1").encode("unicode_escape") + b" (esc)"
-    return b
+    timeout
+        The limit (in seconds) the test exceeded, if it timed out. Timed
+        out tests always count as failed.
 
+    timings
+        A list of Timing tuples, one for each command that was run.
 
-def _escape_utf8(b):
-    r"""Escape bytes that aren't printable UTF-8, or can't be decoded as UTF-8 at all.
-    Append `` (esc)`` if escaping was necessary.
+    usage
+        The prysk.process.ResourceUsage of the test shell and the commands
+        it ran, if available.
 
-    Example usage:
+    invalid
+        A list of (line number, error message) tuples for the (re) and
+        (glob) lines of the test with invalid patterns. These lines only
+        match output that is identical to them, lines which did so are
+        left out.
 
-    >>> _escape_utf8(b'')
-    b''
-    >>> _escape_utf8(b'foo \\')
-    b'foo \\'
-    >>> _escape_utf8(b'foo \\ \r')
-    b'foo \\\\ \\r (esc)'
-    >>> _escape_utf8('☺'.encode())
-    b'\xe2\x98\xba'
-    >>> _escape_utf8('\t'.encode())
-    b'\\t (esc)'
-    >>> _escape_utf8('\240'.encode())
-    b'\\xa0 (esc)'
-    >>> _escape_utf8('☺'.encode() + b' \xff x\t \xff ' + '☺'.encode())
-    b'\xe2\x98\xba \\xff x\\t \\xff \xe2\x98\xba (esc)'
-    """
+    updated
+        True if the test file was rewritten with the actual output (see
+        prysk.update.runupdate()).
 
-    def _esc_unicode_c(c):
-        if c == "\\":
-            return b"\\\\"
-        if c.isprintable():
-            return c.encode()
-        return c.encode("unicode_escape")
+    duration
+        The wall time (in seconds) it took to run the test, measured by the
+        thread running it (see runtests()), or to look up a cached result.
 
-    ret = []
-    while b:
-        try:
-            s = b.decode()
-        except UnicodeDecodeError as e:
-            assert b == e.object
-            s = b[: e.start].decode()
-            ret.extend(_esc_unicode_c(c) for c in s)
-            ret.append(b[e.start : e.end].decode("latin1").encode("unicode_escape"))
-            b = b[e.end :]
-        else:
-            # the entire original input decoded okay and is printable, skip escaping
-            if not ret and s.isprintable():
-                return b
+    >>> refout, postout, diff = result = Result([b'  $ true\n'], None, [])
+    >>> result.cached, result.timeout, result.timings, result.usage
+    (False, None, (), None)
+    """
 
-            ret.extend(_esc_unicode_c(c) for c in s)
-            b = None
+    cached = False
+    timeout = None
+    timings = ()
+    usage = None
+    invalid = ()
+    updated = False
+    duration = 0.0
+
+    def __new__(cls, refout, postout, diff, **details):
+        result = super().__new__(cls, refout, postout, diff)
+        result.__dict__.update(details)
+        return result
+
+    def _replace(self, **kwargs):
+        result = super()._replace(**kwargs)
+        result.__dict__.update(self.__dict__)
+        return result
+
+
+class Timing(namedtuple("Timing", ("line", "command", "wall", "cpu", "returncode"))):
+    """Resources used by a single command of a test.
+
+    line is the (1-based) line number of the command in the test, command
+    its first line (without indentation and prompt), wall the elapsed time
+    and cpu the user and system time used by the processes it started (both
+    in seconds). wall is taken when the command's marker is received, which
+    is only accurate with "fd" framing (see test()). cpu is None if it
+    couldn't be determined, e.g. because the command timed out. returncode
+    is the exit status of the command (None if it timed out).
+    """
 
-    return b"".join(ret) + b" (esc)" if ret else b""
+    __slots__ = ()
 
 
 def _findtests(paths):
@@ -139,6 +161,16 @@ def cwd(path):
         os.chdir(_cwd)
 
 
+def _listed(result):
+    """Return a result with lists of lines instead of prysk.lines.Lines"""
+    refout, postout, diff = result
+    if refout is not None:
+        refout = list(refout)
+    if postout is not None:
+        postout = list(postout)
+    return Result(refout, postout, diff, **vars(result))
+
+
 def test(
     lines,
     shell="/bin/sh",
@@ -149,6 +181,13 @@ def test(
     debug=False,
     dos2unix=False,
     escape7bit=False,
+    cwd=None,
+    timeout=None,
+    command_timeout=None,
+    framing="inline",
+    diff_engine="auto",
+    normalize=None,
+    cputimes=False,
 ):
     r"""Run test lines and return input, output, and diff.
 
@@ -156,11 +195,44 @@ def test(
 
         (list of lines in test, same list with actual output, diff)
 
-    diff is a generator that yields the diff between the two lists.
+    diff is a prysk.diff.Diff of the two lists, which is only computed when
+    iterated over (or [] if the output matches).
 
     If a test exits with return code 80, the actual output is set to
     None and diff is set to [].
 
+    If the test exceeds timeout or one of its commands exceeds
+    command_timeout, the test shell and all of its children are killed.
+    The actual output then contains the output captured up to this point,
+    followed by a "[timed out after Ns]" line.
+
+    framing selects how the output of the individual commands is told
+    apart: "inline" writes a salted marker line to stdout after each
+    command, "fd" reports each command's status on a separate file
+    descriptor (see prysk.process.execute), which keeps the markers out of
+    the output entirely. "fd" falls back to "inline" on non-POSIX systems.
+    With "fd", the file descriptors FRAME_FD and ACK_FD (8 and 9) are
+    reserved in the test shell and the _prysk_ack variable is unset after
+    each command. The shell waits for each marker to be received, so only
+    "fd" gives accurate wall times in the timings of the result. Inline
+    markers are often read together, the commands before all but the first
+    of them then seem to take no time.
+
+    diff_engine selects the algorithm used to compute the diff of a failing
+    test (see prysk.diff.unified_diff).
+
+    lines may be a ParsedTest (see prysk.parse.parse), if it was parsed
+    using the same indent and dos2unix settings.
+
+    If cputimes is True, the CPU time used by each command is recorded in
+    the timings of the result, using the times builtin of the shell. This
+    makes each command a little slower, so it's off by default.
+
+    normalize is a sequence of (pattern, replacement) substitutions applied
+    to each line of the (escaped) output in a single pass (see
+    prysk.normalize), after replacing the path of the temporary directory
+    with $TMPDIR.
+
     Note that the TESTSHELL environment variable is available in the
     test (set to the specified shell). However, the TESTDIR and
     TESTFILE environment variables are not available. To run actual
@@ -191,7 +263,7 @@ def test(
     True
 
     :param lines: Test input
-    :type lines: bytes or collections.Iterable[bytes]
+    :type lines: bytes or collections.Iterable[bytes] or prysk.parse.ParsedTest
     :param shell: Shell to run test in
     :type shell: bytes or str or list[bytes] or list[str]
     :param indent: Amount of indentation to use for shell commands
@@ -209,13 +281,68 @@ def test(
     :param escape7bit: Whether to escape all non-7-bit bytes or only
       non-printable/invalid UTF-8
     :type escape7bit: bool
+    :param cwd: Optional working directory for the test shell
+    :type cwd: str or pathlib.Path or None
+    :param timeout: Optional number of seconds the test may run
+    :type timeout: float or None
+    :param command_timeout: Optional number of seconds a command may run
+    :type command_timeout: float or None
+    :param framing: How to delimit the output of commands ("inline" or "fd")
+    :type framing: str
+    :param diff_engine: Diff algorithm ("auto", "difflib" or "patience")
+    :type diff_engine: str
+    :param normalize: Optional substitutions applied to the output
+    :type normalize: list[(bytes, bytes)] or None
+    :param cputimes: Whether to record the CPU time used by each command
+    :type cputimes: bool
     return: Input, output, and diff iterables
     :rtype: (list[bytes], list[bytes], collections.Iterable[bytes])
     """
+    return _listed(
+        _test(
+            lines,
+            shell,
+            indent,
+            testname,
+            env,
+            cleanenv,
+            debug,
+            dos2unix,
+            escape7bit,
+            cwd,
+            timeout,
+            command_timeout,
+            framing,
+            diff_engine,
+            normalize,
+            cputimes,
+        )
+    )
+
+
+def _test(
+    lines,
+    shell="/bin/sh",
+    indent=2,
+    testname=None,
+    env=None,
+    cleanenv=True,
+    debug=False,
+    dos2unix=False,
+    escape7bit=False,
+    cwd=None,
+    timeout=None,
+    command_timeout=None,
+    framing="inline",
+    diff_engine="auto",
+    normalize=None,
+    cputimes=False,
+):
+    """Run test lines like test(), returning them as prysk.lines.Lines"""
     indent = b" " * indent
     cmdline = indent + b"$ "
     conline = indent + b"> "
-    salt = b"PRYSK%.5f" % time.time()
+    framed = framing == "fd" and os.name == "posix"
 
     def create_environment(environment, shell, clean=False):
         _env = os.environ.copy() if environment is None else environment
@@ -228,80 +355,128 @@ def test(
             _env["GREP_OPTIONS"] = ""
         return _env
 
-    lines = lines.splitlines(True) if isinstance(lines, bytes) else lines
+    if isinstance(lines, bytes):
+        lines = lines.splitlines(True)
     shell = [shell] if isinstance(shell, (bytes, str)) else shell
     env = create_environment(env, shell[0], clean=cleanenv)
 
     if debug:
-        return _debug(cmdline, conline, env, lines, shell)
-
-    after = {}
-    refout, postout = [], []
-    i = pos = prepos = -1
-    stdin = []
-    for i, line in enumerate(lines):
-        # Convert Windows style line endings to UNIX
-        if dos2unix and line.endswith(b"\r\n"):
-            line = line[:-2] + b"\n"
-        elif not line.endswith(b"\n"):
-            line += b"\n"
-        refout.append(line)
-        if line.startswith(cmdline):
-            after.setdefault(pos, []).append(line)
-            prepos = pos
-            pos = i
-            stdin.append(b"echo %s %d $?\n" % (salt, i))
-            stdin.append(line[len(cmdline) :])
-        elif line.startswith(conline):
-            after.setdefault(prepos, []).append(line)
-            stdin.append(line[len(conline) :])
-        elif not line.startswith(indent):
-            after.setdefault(pos, []).append(line)
-    stdin.append(b"echo %s %d $?\n" % (salt, i + 1))
-
-    output, retcode = execute(
-        shell + ["-"], stdin=b"".join(stdin), stdout=PIPE, stderr=STDOUT, env=env
-    )
-    if retcode == _SKIP:
-        return refout, None, []
-
-    pos = -1
-    for i, line in enumerate(output[:-1].splitlines(True)):
-        out, cmd = line, None
-        if salt in line:
-            out, cmd = line.split(salt, 1)
-
-        if out:
-            # Convert Windows style line endings to UNIX
-            if dos2unix and out.endswith(b"\r\n"):
-                out = out[:-2]
-            elif out.endswith(b"\n"):
-                out = out[:-1]
-            else:
-                out += b" (no-eol)"
-
-            if escape7bit:
-                out = _escape_7bit(out)
-            else:
-                out = _escape_utf8(out)
-
-            try:
-                tmpdir = os.environ["TMPDIR"].encode()
-            except KeyError:
-                pass
-            else:
-                out = re.sub(re.escape(tmpdir), b"$TMPDIR", out)
-
-            postout.append(indent + out + b"\n")
-
-        if cmd:
-            ret = int(cmd.split()[1])
-            if ret != 0:
-                postout.append(indent + b"[%d]\n" % ret)
-            postout += after.pop(pos, [])
-            pos = int(cmd.split()[0])
+        if isinstance(lines, ParsedTest):
+            lines = lines.refout
+        return _debug(cmdline, conline, env, lines, shell, cwd)
+
+    # The CPU time used by commands is taken from the times builtin. Its
+    # output is appended to a file and the trace output (set -x) discarded,
+    # so that it doesn't interfere with the test's output.
+    timespath = timesfile = None
+    if cputimes:
+        fd, timespath = tempfile.mkstemp(prefix="prysk-times-")
+        os.close(fd)
+        timesfile = os.fsencode(shlex.quote(timespath))
+    salt = None if framed else b"PRYSK%.5f" % time.time()
+
+    def marker(index):
+        times = b""
+        if timespath is not None:
+            times = b"; { echo %d; times; } >>%s 2>/dev/null" % (index, timesfile)
+        if framed:
+            # Traced (set -x) to /dev/null as well, the variable used for
+            # waiting for the acknowledgement is unset again
+            return (
+                b"{ echo %d $? >&%d%s; read _prysk_ack <&%d; unset _prysk_ack; }"
+                b" 2>/dev/null\n" % (index, FRAME_FD, times, ACK_FD)
+            )
+        return b"echo %s %d $?%s\n" % (salt, index, times)
+
+    if not isinstance(lines, ParsedTest):
+        lines = parse(lines, len(indent), dos2unix)
+    refout, after, patterns = lines.refout, dict(lines.after), lines.invalid
+    postout = Lines()
+    stdin = [
+        marker(index) + code if index >= 0 else code for index, code in lines.script
+    ]
+    stdin.append(marker(len(refout)))
+
+    substitutions = tuple(tuple(s) for s in normalize or ())
+    tmpdir = os.environ.get("TMPDIR", "").encode()
+    if tmpdir:
+        substitutions = ((re.escape(tmpdir), b"$TMPDIR"),) + substitutions
+    substitute = normalizer(substitutions)
+
+    output = Output(salt, command_timeout)
+    expired = killed = None
+    marks = []
+    try:
+        try:
+            with span("execute"):
+                _, retcode = execute(
+                    shell + ["-"],
+                    stdin=b"".join(stdin),
+                    stdout=PIPE,
+                    stderr=STDOUT,
+                    cwd=cwd,
+                    env=env,
+                    timeout=timeout,
+                    sink=output,
+                    framed=framed,
+                )
+        except TimeoutExpired:
+            expired = command_timeout if output.expired() else timeout
+            retcode = None
+            killed = time.monotonic()
+        if retcode == _SKIP:
+            return Result(refout, None, [])
+        output.finish()
+
+        with span("parse"):
+            pos = -1
+            for blocks, cmd in output.segments():
+                for block in blocks:
+                    text = escape_text(strip(block, dos2unix), escape7bit)
+                    if substitutions:
+                        text = substitute(text)
+                    postout.extend_text(text, indent)
+
+                if cmd:
+                    index, ret, stamp = cmd
+                    # Traced (set -x) markers can show up more than once
+                    if not marks or marks[-1][0] != index:
+                        marks.append((index, stamp, ret))
+                    if ret != 0:
+                        postout.append(indent + b"[%d]\n" % ret)
+                    postout.extend_bytes(after.pop(pos, b""))
+                    pos = index
+        if expired is not None:
+            marks.append((None, killed, None))
+        cpuseconds = {}
+        if timespath is not None:
+            with open(timespath, "rb") as f:
+                cpuseconds = parse_times(f.read())
+    finally:
+        output.close()
+        if timespath is not None:
+            os.unlink(timespath)
+
+    timings = []
+    # Each mark holds the return code of the command preceding it
+    for (index, start, _), (following, end, ret) in zip(marks, marks[1:]):
+        if index >= len(refout):
+            break
+        cpu = None
+        if index in cpuseconds and following in cpuseconds:
+            cpu = cpuseconds[following] - cpuseconds[index]
+        command = refout[index][len(cmdline) :].rstrip(b"\r\n")
+        timings.append(Timing(index + 1, command, end - start, cpu, ret))
+
+    if expired is None:
+        postout.extend_bytes(after.pop(pos, b""))
+    else:
+        postout.append(indent + b"[timed out after %gs]\n" % expired)
 
-    postout += after.pop(pos, [])
+    if patterns:
+        # Lines with invalid patterns still match identical output
+        actual = set(postout)
+        patterns = [(n, error) for n, error in patterns if refout[n - 1] not in actual]
 
     if testname:
         diff_path = bytes(testname)
@@ -309,15 +484,27 @@ def test(
     else:
         diff_path = error_path = b""
 
-    diff = unified_diff(
-        refout, postout, diff_path, error_path, matchers=[esc, glob, regex]
+    diff = Diff(
+        refout,
+        postout,
+        diff_path,
+        error_path,
+        matchers=[esc, glob, regex],
+        engine=diff_engine,
+        anchor=cmdline,
     )
-    for line in diff:
-        return refout, postout, itertools.chain([line], diff)
-    return refout, postout, []
-
-
-def _debug(cmdline, conline, env, lines, shell):
+    details = {
+        "timeout": expired,
+        "timings": timings,
+        "usage": output.rusage,
+        "invalid": patterns,
+    }
+    with span("diff"):
+        failed = bool(diff)
+    return Result(refout, postout, diff if failed else [], **details)
+
+
+def _debug(cmdline, conline, env, lines, shell, cwd=None):
     stdin = []
     for line in lines:
         if not line.endswith(b"\n"):
@@ -326,8 +513,8 @@ def _debug(cmdline, conline, env, lines, shell):
             stdin.append(line[len(cmdline) :])
         elif line.startswith(conline):
             stdin.append(line[len(conline) :])
-    execute(shell + ["-"], stdin=b"".join(stdin), env=env)
-    return [], [], []
+    execute(shell + ["-"], stdin=b"".join(stdin), cwd=cwd, env=env)
+    return Result([], [], [])
 
 
 def testfile(
@@ -340,6 +527,14 @@ def testfile(
     testname=None,
     dos2unix=False,
     escape7bit=False,
+    cwd=None,
+    timeout=None,
+    command_timeout=None,
+    framing="inline",
+    diff_engine="auto",
+    normalize=None,
+    parse_cache=None,
+    cputimes=False,
 ):
     """Run test at path and return input, output, and diff.
 
@@ -347,7 +542,8 @@ def testfile(
 
         (list of lines in test, same list with actual output, diff)
 
-    diff is a generator that yields the diff between the two lists.
+    diff is a prysk.diff.Diff of the two lists, which is only computed when
+    iterated over (or [] if the output matches).
 
     If a test exits with return code 80, the actual output is set to
     None and diff is set to [].
@@ -374,9 +570,68 @@ def testfile(
     :param escape7bit: Whether to escape all non-7-bit bytes or only
       non-printable/invalid UTF-8
     :type escape7bit: bool
+    :param cwd: Optional working directory for the test shell
+    :type cwd: str or pathlib.Path or None
+    :param timeout: Optional number of seconds the test may run
+    :type timeout: float or None
+    :param command_timeout: Optional number of seconds a command may run
+    :type command_timeout: float or None
+    :param framing: How to delimit the output of commands ("inline" or "fd")
+    :type framing: str
+    :param diff_engine: Diff algorithm ("auto", "difflib" or "patience")
+    :type diff_engine: str
+    :param normalize: Optional substitutions applied to the output
+    :type normalize: list[(bytes, bytes)] or None
+    :param parse_cache: Optional cache of parsed test files
+    :type parse_cache: prysk.cache.ParseCache or None
+    :param cputimes: Whether to record the CPU time used by each command
+    :type cputimes: bool
     :return: Input, output, and diff iterables
     :rtype: (list[bytes], list[bytes], collections.Iterable[bytes])
     """
+    return _listed(
+        _testfile(
+            path,
+            shell,
+            indent,
+            env,
+            cleanenv,
+            debug,
+            testname,
+            dos2unix,
+            escape7bit,
+            cwd,
+            timeout,
+            command_timeout,
+            framing,
+            diff_engine,
+            normalize,
+            parse_cache,
+            cputimes,
+        )
+    )
+
+
+def _testfile(
+    path,
+    shell="/bin/sh",
+    indent=2,
+    env=None,
+    cleanenv=True,
+    debug=False,
+    testname=None,
+    dos2unix=False,
+    escape7bit=False,
+    cwd=None,
+    timeout=None,
+    command_timeout=None,
+    framing="inline",
+    diff_engine="auto",
+    normalize=None,
+    parse_cache=None,
+    cputimes=False,
+):
+    """Run the test at path like testfile(), returning its lines as Lines"""
     with open(path, "rb") as f:
         abspath = path.resolve()
         env = env or os.environ.copy()
@@ -384,8 +639,11 @@ def testfile(
         env["TESTFILE"] = f"{abspath.name}"
         if testname is None:
             testname = path
-        return test(
-            f,
+        lines = f
+        if parse_cache is not None and not debug:
+            lines = parse_cache.parse(f, indent, dos2unix)
+        return _test(
+            lines,
             shell,
             indent=indent,
             testname=testname,
@@ -394,6 +652,13 @@ def testfile(
             debug=debug,
             dos2unix=dos2unix,
             escape7bit=escape7bit,
+            cwd=cwd,
+            timeout=timeout,
+            command_timeout=command_timeout,
+            framing=framing,
+            diff_engine=diff_engine,
+            normalize=normalize,
+            cputimes=cputimes,
         )
 
 
@@ -406,6 +671,13 @@ def runtests(
     debug=False,
     dos2unix=False,
     escape7bit=False,
+    timeout=None,
+    command_timeout=None,
+    framing="inline",
+    diff_engine="auto",
+    normalize=None,
+    parse_cache=None,
+    cputimes=False,
 ):
     """Run tests and yield results.
 
@@ -417,9 +689,17 @@ def runtests(
     and returns a 3-tuple:
 
         (list of lines in the test, same list with actual output, diff)
+
+    Unlike with testfile(), the lines are prysk.lines.Lines, which keep
+    them in a single buffer. They can be indexed, sliced and iterated over
+    like lists, list() converts them.
+
+    The duration attribute of the returned result is set to the wall time
+    of the test (see Result).
     """
     basenames, seen = set(), set()
-    tests = _findtests(paths)
+    with span("discover"):
+        tests = list(_findtests(paths))
     for i, path in enumerate(tests):
         abspath = path.resolve()
         if abspath in seen:
@@ -427,7 +707,7 @@ def runtests(
         seen.add(abspath)
 
         if not path.stat().st_size:
-            yield path, lambda: (None, None, None)
+            yield path, lambda: Result(None, None, None)
             continue
 
         basename = path.name
@@ -436,12 +716,13 @@ def runtests(
         else:
             basenames.add(basename)
 
-        def test():
+        def test(abspath=abspath, basename=basename, path=path):
             """Run test file"""
             testdir = tmpdir / basename
             os.mkdir(testdir)
-            with cwd(testdir):
-                return testfile(
+            start = time.monotonic()
+            with span("test", path=f"{path}"):
+                result = _testfile(
                     abspath,
                     shell,
                     indent=indent,
@@ -450,6 +731,16 @@ def runtests(
                     testname=path,
                     dos2unix=dos2unix,
                     escape7bit=escape7bit,
+                    cwd=testdir,
+                    timeout=timeout,
+                    command_timeout=command_timeout,
+                    framing=framing,
+                    diff_engine=diff_engine,
+                    normalize=normalize,
+                    parse_cache=parse_cache,
+                    cputimes=cputimes,
                 )
+            duration = time.monotonic() - start
+            return Result(*result, **dict(vars(result), duration=duration))
 
         yield path, test
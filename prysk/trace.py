@@ -0,0 +1,123 @@
+"""Timeline tracing in the Chrome trace event format"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import (
+    contextmanager,
+    nullcontext,
+)
+from pathlib import Path
+
+__all__ = ["Tracer", "span", "start", "stop"]
+
+_NOSPAN = nullcontext()
+
+# The active tracer (see start())
+_tracer = None
+
+
+class Tracer:
+    """Collects spans of all threads as trace events.
+
+    The resulting JSON file can be loaded into chrome://tracing or Perfetto,
+    where each thread is shown as a separate track.
+    """
+
+    def __init__(self):
+        self.events = []
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._threads = set()
+        self._lock = threading.Lock()
+
+    def _now(self):
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _register(self, tid):
+        """Emit the metadata naming the track of the current thread"""
+        with self._lock:
+            if tid in self._threads:
+                return
+            self._threads.add(tid)
+        self.events.append(
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self._pid,
+                "tid": tid,
+                "args": {"name": threading.current_thread().name},
+            }
+        )
+
+    @contextmanager
+    def span(self, name, **args):
+        """Record the time spent in the with block as a span named name"""
+        tid = threading.get_ident()
+        self._register(tid)
+        start = self._now()
+        try:
+            yield
+        finally:
+            event = {
+                "name": name,
+                "cat": "prysk",
+                "ph": "X",
+                "ts": start,
+                "dur": self._now() - start,
+                "pid": self._pid,
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+            self.events.append(event)
+
+    def save(self, path):
+        """Atomically write the trace to path"""
+        path = Path(path)
+        fd, tmp = tempfile.mkstemp(prefix=f".{path.name}-", dir=path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"traceEvents": list(self.events), "displayTimeUnit": "ms"}, f
+                )
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def start():
+    """Start tracing, spans are recorded until stop() is called"""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop():
+    """Stop tracing and return the tracer (or None if tracing wasn't started)"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def span(name, **args):
+    """Return a context manager recording a span if tracing is active.
+
+    args are shown alongside the span and have to be JSON serializable.
+
+    >>> with span('idle'):
+    ...     pass
+    >>> tracer = start()
+    >>> with span('work', path='a.t'):
+    ...     pass
+    >>> _ = stop()
+    >>> [(e['name'], e.get('args')) for e in tracer.events if e['ph'] == 'X']
+    [('work', {'path': 'a.t'})]
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NOSPAN
+    return tracer.span(name, **args)
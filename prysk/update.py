@@ -0,0 +1,66 @@
+"""Updating tests with their actual output"""
+
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+from prysk.diff import Diff
+from prysk.test import Result
+from prysk.trace import span
+
+__all__ = ["runupdate", "update"]
+
+
+def update(path, lines):
+    """Atomically replace the contents of the test at path with lines.
+
+    The lines are written to a temporary file next to the test, which is
+    moved into place once complete. The permissions of the test are kept.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}-", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.writelines(lines)
+        os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def runupdate(tests):
+    """Run tests and update the failing ones with their actual output.
+
+    tests should be a sequence of 2-tuples containing the following:
+
+        (test path, test function)
+
+    This function yields a new sequence where each test function is wrapped
+    with a function that rewrites the test file if its output changed (see
+    prysk.diff.merge()). Lines with (re), (glob) and (esc) annotations are
+    kept as long as they match. Tests which timed out aren't updated. The
+    results of updated tests have their updated attribute set.
+
+    The test files are written by the test functions themselves, so they
+    are updated concurrently if the tests are run in parallel.
+    """
+    for path, test in tests:
+
+        def testwrapper(path=path, test=test):
+            """Run test and update it"""
+            result = test()
+            refout, postout, diff = result
+            if (
+                postout is not None
+                and result.timeout is None
+                and isinstance(diff, Diff)
+                and diff
+            ):
+                with span("update"):
+                    update(path, diff.merged())
+                result = Result(*result, **dict(vars(result), updated=True))
+            return result
+
+        yield path, testwrapper
@@ -1,11 +1,15 @@
 """xUnit XML output"""
 
 import locale
+import os
 import re
 import socket
 import sys
 import time
 from inspect import cleandoc
+from pathlib import Path
+
+from prysk.trace import span
 
 __all__ = ["runxunit"]
 
@@ -23,6 +27,17 @@ _NARROW_QUOTE_ATTR_REGEX = (
 )
 _REPLACEMENT_CHAR = "\N{REPLACEMENT CHARACTER}"
 
+# Finished test cases are written to the report at least this often (in
+# seconds), or once they take up this many bytes
+_FLUSH_INTERVAL = 1.0
+_FLUSH_SIZE = 1024 * 1024
+
+# Room left in the header for the counts and time to grow, as it's
+# rewritten in place (enough for counts and seconds of ten digits each)
+_HEADER_SLACK = 40
+
+_FOOTER = b"</testsuite>\n"
+
 if sys.maxunicode >= 0x10FFFF:
     _CDATASUB = re.compile(_WIDE_CDATA_REGEX).sub
     _QUOTEATTRSUB = re.compile(_WIDE_QUOTE_ATTR_REGEX).sub
@@ -87,6 +102,123 @@ def _timestamp():
     return timestamp
 
 
+def _failure_message(result):
+    """Return the message attribute (if any) for a failed test"""
+    if result.timeout is None:
+        return ""
+    return f" message={_quoteattr(f'timed out after {result.timeout:g}s')}"
+
+
+def _properties(result):
+    """Return the lines of a properties element with resource usage and timings"""
+    properties = []
+    if result.usage is not None:
+        usage = result.usage
+        properties += [
+            ("usage:user", f"{usage.user:6f}"),
+            ("usage:system", f"{usage.system:6f}"),
+            ("usage:maxrss", f"{usage.maxrss}"),
+            ("usage:inblock", f"{usage.inblock}"),
+            ("usage:oublock", f"{usage.oublock}"),
+            ("usage:nvcsw", f"{usage.nvcsw}"),
+            ("usage:nivcsw", f"{usage.nivcsw}"),
+        ]
+    for timing in result.timings:
+        name = f"command:{timing.line}"
+        properties.append((f"{name}:wall", f"{timing.wall:6f}"))
+        if timing.cpu is not None:
+            properties.append((f"{name}:cpu", f"{timing.cpu:6f}"))
+    if not properties:
+        return []
+    return [
+        "    <properties>",
+        *(
+            f'      <property name="{name}" value="{value}"/>'
+            for name, value in properties
+        ),
+        "    </properties>",
+    ]
+
+
+class _Report:
+    """An xUnit report written while tests are running.
+
+    Test cases are appended to a temporary file next to the report. Each
+    flush writes the footer after them and rewrites the header (padded to
+    a fixed size) with the current counts, so the temporary file holds a
+    valid report of the tests finished so far. close() moves it into place.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.total = self.skipped = self.failed = 0
+        self._tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        self._file = open(self._tmp, "wb")
+        self._start = time.time()
+        self._timestamp = _timestamp()
+        self._hostname = socket.gethostname()
+        self._pending, self._pending_size = [], 0
+        self._flushed = time.monotonic()
+        self._size = len(self._header()) + _HEADER_SLACK
+        self._end = self._size
+        self.flush()
+
+    def _header(self):
+        suitetime = time.time() - self._start
+        # fmt: off
+        return cleandoc(f"""
+             <?xml version="1.0" encoding="utf-8"?>
+             <testsuite name="prysk"
+                        tests="{self.total}"
+                        failures="{self.failed}"
+                        skipped="{self.skipped}"
+                        timestamp={_quoteattr(self._timestamp)}
+                        hostname={_quoteattr(self._hostname)}
+                        time="{suitetime:6f}"
+        """).encode("utf-8")
+        # fmt: on
+
+    def add(self, testcase, skipped=False, failed=False):
+        """Add a test case, writing it once enough have accumulated"""
+        self.total += 1
+        self.skipped += skipped
+        self.failed += failed
+        data = testcase.encode("utf-8")
+        self._pending.append(data)
+        self._pending_size += len(data)
+        if (
+            self._pending_size >= _FLUSH_SIZE
+            or time.monotonic() - self._flushed >= _FLUSH_INTERVAL
+        ):
+            self.flush()
+
+    def flush(self):
+        """Write the pending test cases, the footer and the current counts"""
+        with span("write xunit"):
+            body = b"".join(self._pending)
+            self._pending, self._pending_size = [], 0
+            self._file.seek(self._end)
+            self._file.write(body + _FOOTER)
+            self._end += len(body)
+            # Whitespace is allowed before the end of the tag
+            self._file.seek(0)
+            self._file.write(self._header().ljust(self._size - 2) + b">\n")
+            self._file.flush()
+        self._flushed = time.monotonic()
+
+    def close(self):
+        """Write the remaining test cases and move the report into place"""
+        try:
+            try:
+                self.flush()
+            finally:
+                self._file.close()
+            os.replace(self._tmp, self.path)
+        except BaseException:
+            os.unlink(self._tmp)
+            raise
+
+
 def runxunit(tests, xmlpath):
     """Run tests with xUnit XML output.
 
@@ -96,86 +228,81 @@ def runxunit(tests, xmlpath):
 
     This function yields a new sequence where each test function is wrapped
     with a function that writes test results to an xUnit XML file.
+
+    Test results are written as tests finish (see _Report). If the sequence
+    isn't consumed to its end (e.g. the run is interrupted and the generator
+    closed), the file is still completed with the tests run so far.
     """
-    suitestart = time.time()
-    timestamp = _timestamp()
-    hostname = socket.gethostname()
-    total, skipped, failed = [0], [0], [0]
-    testcases = []
-
-    for path, test in tests:
-
-        def testwrapper():
-            """Run test and collect XML output"""
-            total[0] += 1
-
-            start = time.time()
-            refout, postout, diff = test()
-            testtime = time.time() - start
-
-            classname = f"{path}"
-            name = path.name
-
-            if postout is None:
-                skipped[0] += 1
-                testcase = "\n".join(
-                    [
-                        f"  <testcase classname={_quoteattr(classname)}",
-                        f"            name={_quoteattr(name)}",
-                        f'            time="{testtime:6f}">',
-                        "    <skipped/>",
-                        "  </testcase>",
-                        "",
-                    ]
-                )
-            elif diff:
-                failed[0] += 1
-                diff = list(diff)
-                diffu = "".join(
-                    l.decode(locale.getpreferredencoding(), "replace") for l in diff
-                )
-                testcase = "\n".join(
-                    [
-                        f"  <testcase classname={_quoteattr(classname)}",
-                        f"            name={_quoteattr(name)}",
-                        f'            time="{testtime:6f}">',
-                        f"    <failure>{_cdata(diffu)}</failure>",
-                        "  </testcase>",
-                        "",
-                    ]
-                )
-            else:
-                testcase = "\n".join(
-                    [
-                        f"  <testcase classname={_quoteattr(classname)}",
-                        f"            name={_quoteattr(name)}",
-                        f'            time="{testtime:6f}"/>',
-                        "",
-                    ]
-                )
-
-            testcases.append(testcase)
-            return refout, postout, diff
-
-        yield path, testwrapper
-
-    suitetime = time.time() - suitestart
-    # fmt: off
-    header = cleandoc(f"""
-         <?xml version="1.0" encoding="utf-8"?>
-         <testsuite name="prysk"
-                    tests="{total[0]}"
-                    failures="{failed[0]}"
-                    skipped="{skipped[0]}"
-                    timestamp={_quoteattr(timestamp)}
-                    hostname={_quoteattr(hostname)}
-                    time="{suitetime:6f}">
-    """) + "\n"
-    # fmt: on
-    footer = "</testsuite>\n"
-
-    with open(xmlpath, "wb") as xmlfile:
-        encoding = "utf-8"
-        xmlfile.write(header.encode(encoding))
-        [xmlfile.write(testcase.encode(encoding)) for testcase in testcases]
-        xmlfile.write(footer.encode(encoding))
+    report = _Report(xmlpath)
+    try:
+        for path, test in tests:
+
+            def testwrapper():
+                """Run test and collect XML output"""
+                result = test()
+                refout, postout, diff = result
+                # Measured where the test ran, as test() may only wait for
+                # a test running in parallel (see prysk.parallel)
+                testtime = result.duration
+                skipped = failed = False
+
+                classname = f"{path}"
+                name = path.name
+
+                if postout is None:
+                    skipped = True
+                    testcase = "\n".join(
+                        [
+                            f"  <testcase classname={_quoteattr(classname)}",
+                            f"            name={_quoteattr(name)}",
+                            f'            time="{testtime:6f}">',
+                            "    <skipped/>",
+                            "  </testcase>",
+                            "",
+                        ]
+                    )
+                elif diff or result.timeout is not None:
+                    failed = True
+                    diff = list(diff)
+                    diffu = "".join(
+                        l.decode(locale.getpreferredencoding(), "replace") for l in diff
+                    )
+                    testcase = "\n".join(
+                        [
+                            f"  <testcase classname={_quoteattr(classname)}",
+                            f"            name={_quoteattr(name)}",
+                            f'            time="{testtime:6f}">',
+                            *_properties(result),
+                            f"    <failure{_failure_message(result)}>"
+                            f"{_cdata(diffu)}</failure>",
+                            "  </testcase>",
+                            "",
+                        ]
+                    )
+                elif result.timings or result.usage is not None:
+                    testcase = "\n".join(
+                        [
+                            f"  <testcase classname={_quoteattr(classname)}",
+                            f"            name={_quoteattr(name)}",
+                            f'            time="{testtime:6f}">',
+                            *_properties(result),
+                            "  </testcase>",
+                            "",
+                        ]
+                    )
+                else:
+                    testcase = "\n".join(
+                        [
+                            f"  <testcase classname={_quoteattr(classname)}",
+                            f"            name={_quoteattr(name)}",
+                            f'            time="{testtime:6f}"/>',
+                            "",
+                        ]
+                    )
+
+                report.add(testcase, skipped=skipped, failed=failed)
+                return result._replace(diff=diff)
+
+            yield path, testwrapper
+    finally:
+        report.close()
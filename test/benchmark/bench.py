@@ -0,0 +1,349 @@
+"""Benchmarks for prysk.
+
+Runs micro-benchmarks of the output parsing, escaping, diffing, xUnit
+reporting and process spawning, as well as end-to-end timings of the
+command line interface on synthetic corpora (see corpus.py). Results are
+written as JSON and can be compared against the results of a previous run:
+
+    python test/benchmark/bench.py --output baseline.json
+    python test/benchmark/bench.py --baseline baseline.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from corpus import (
+    KINDS,
+    generate,
+)
+
+from prysk.cache import ParseCache
+from prysk.cli import VERSION
+from prysk.diff import (
+    esc,
+    glob,
+    regex,
+    unified_diff,
+)
+from prysk.escape import (
+    escape_7bit,
+    escape_text,
+    escape_utf8,
+)
+from prysk.lines import Lines
+from prysk.parse import parse
+from prysk.process import (
+    PIPE,
+    STDOUT,
+    execute,
+)
+from prysk.test import (
+    Result,
+    test,
+)
+from prysk.xunit import runxunit
+
+FORMAT = 1
+
+# Maps benchmark names to functions preparing a benchmark. They receive
+# the corpus directories and return the function to be timed.
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark preparation function under name"""
+
+    def register(prepare):
+        BENCHMARKS[name] = prepare
+        return prepare
+
+    return register
+
+
+def _mixed_lines(count, seed=0):
+    """Lines of ASCII, printable UTF-8, control characters and invalid UTF-8"""
+    rng = random.Random(seed)
+    samples = [b"plain ascii output", "☺ unicode".encode(), b"tab\tand\rcr"]
+    samples.append(b"invalid \xff\xfe utf-8")
+    return [rng.choice(samples) + b" %d" % i for i in range(count)]
+
+
+@benchmark("test.output")
+def _test_output(corpora):
+    count = 50000
+    program = f'BEGIN {{ for (i = 0; i < {count}; i++) print "line " i }}'
+    lines = [b"  $ awk '%s'\n" % program.encode()]
+    lines += [b"  line %d\n" % i for i in range(count)]
+    return lambda: test(lines)
+
+
+@benchmark("escape.utf8")
+def _escape_utf8_lines(corpora):
+    lines = _mixed_lines(100000)
+    return lambda: [escape_utf8(line) for line in lines]
+
+
+@benchmark("escape.7bit")
+def _escape_7bit_lines(corpora):
+    lines = _mixed_lines(100000)
+    return lambda: [escape_7bit(line) for line in lines]
+
+
+@benchmark("escape.lines")
+def _escape_lines(corpora):
+    data = b"\n".join(_mixed_lines(100000))
+    return lambda: escape_text(data)
+
+
+@benchmark("escape.unicode")
+def _escape_unicode_lines(corpora):
+    data = b"\n".join("héllo wörld ☺ %d".encode() % i for i in range(100000))
+    return lambda: escape_text(data)
+
+
+@benchmark("escape.ascii")
+def _escape_ascii_lines(corpora):
+    data = b"\n".join(b"plain ascii output %d" % i for i in range(100000))
+    return lambda: escape_text(data)
+
+
+@benchmark("lines")
+def _lines(corpora):
+    data = b"\n".join(b"output line %d" % i for i in range(1000000))
+
+    def run():
+        lines = Lines()
+        lines.extend_text(data, b"  ")
+        for _line in lines:
+            pass
+
+    return run
+
+
+def _diff(engine):
+    def prepare(corpora):
+        refout, postout = _failing_output()
+        matchers = [esc, glob, regex]
+        return lambda: list(
+            unified_diff(refout, postout, matchers=matchers, engine=engine)
+        )
+
+    return prepare
+
+
+def _failing_output():
+    rng = random.Random(0)
+    refout, postout = [], []
+    for i in range(5000):
+        number = rng.randrange(100000)
+        refout += [b"  $ cmd %d\n" % i, b"  out-\\d+ (re)\n", b"  out.* (glob)\n"]
+        postout += [b"  $ cmd %d\n" % i, b"  out-%d\n" % number, b"  out.%d\n" % i]
+        if i % 500 == 0:
+            postout[-1] = b"  changed\n"
+    return refout, postout
+
+
+benchmark("diff.unified")(_diff("difflib"))
+benchmark("diff.patience")(_diff("patience"))
+
+
+@benchmark("diff.passing")
+def _passing_diff(corpora):
+    refout, postout = [], []
+    for i in range(20000):
+        refout += [b"  $ cmd %d\n" % i, b"  out-\\d+ (re)\n", b"  out.* (glob)\n"]
+        postout += [b"  $ cmd %d\n" % i, b"  out-%d\n" % i, b"  out.%d\n" % i]
+    return lambda: list(unified_diff(refout, postout, matchers=[esc, glob, regex]))
+
+
+def _parse(cached):
+    def prepare(corpora):
+        paths = sorted(corpora["huge"].glob("*.t"))
+        cache = ParseCache(Path(corpora["huge"].parent, "parse-cache"))
+
+        def run():
+            for path in paths:
+                with open(path, "rb") as f:
+                    if cached:
+                        cache.parse(f)
+                    else:
+                        parse(f)
+
+        run()
+        return run
+
+    return prepare
+
+
+benchmark("parse")(_parse(False))
+benchmark("parse.cached")(_parse(True))
+
+
+@benchmark("xunit")
+def _xunit(corpora):
+    diff = [b"--- a.t\n", b"+++ a.t.err\n", b"@@ -1 +1 @@\n", b"-a\n", b"+b\n"]
+    results = []
+    for i in range(2000):
+        if i % 10 == 0:
+            results.append(Result([b"  $ a\n"], [b"  $ a\n", b"  b\n"], diff))
+        elif i % 10 == 1:
+            results.append(Result([b"  $ a\n"], None, []))
+        else:
+            results.append(Result([b"  $ a\n"], [b"  $ a\n"], []))
+    tests = [(Path(f"dir/test-{i}.t"), lambda r=r: r) for i, r in enumerate(results)]
+
+    def run():
+        with tempfile.TemporaryDirectory() as directory:
+            for _path, wrapped in runxunit(tests, Path(directory, "out.xml")):
+                wrapped()
+
+    return run
+
+
+def _spawn(ballast):
+    """Spawn shells like tests do, from many threads at once.
+
+    ballast is the number of MB of memory the benchmark process holds while
+    spawning, as the cost of fork() grows with the size of the parent.
+    """
+
+    def prepare(corpora):
+        count, jobs = 400, 16
+        memory = bytearray(ballast * 1024 * 1024)
+        # Touch every page, so that it's actually mapped
+        memory[::4096] = b"x" * len(range(0, len(memory), 4096))
+
+        def spawn(_):
+            execute(
+                ["/bin/sh", "-"],
+                stdin=b"true\n",
+                stdout=PIPE,
+                stderr=STDOUT,
+                cwd=corpora["small"],
+                timeout=60,
+            )
+
+        def run():
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                list(executor.map(spawn, range(count)))
+            return memory
+
+        return run
+
+    return prepare
+
+
+benchmark("spawn.parallel")(_spawn(0))
+benchmark("spawn.parallel.large")(_spawn(256))
+
+
+def _cli(kind, *options):
+    def prepare(corpora):
+        args = [sys.executable, "-m", "prysk", "-q", *options, f"{corpora[kind]}"]
+        return lambda: subprocess.run(args, check=True, stdout=subprocess.DEVNULL)
+
+    return prepare
+
+
+for _kind in KINDS:
+    benchmark(f"cli.{_kind}")(_cli(_kind))
+benchmark("cli.small.parallel")(_cli("small", "--jobs=auto"))
+
+
+def measure(function, repeat):
+    """Time repeat calls of function, returning the durations in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run(names, repeat, scale, seed):
+    """Run the benchmarks names, returning the results as a dict"""
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="prysk-benchmark-") as directory:
+        corpora = generate(directory, seed=seed, scale=scale)
+        for name in names:
+            times = measure(BENCHMARKS[name](corpora), repeat)
+            results[name] = {
+                "times": times,
+                "min": min(times),
+                "median": statistics.median(times),
+            }
+            print(f"{name:24} {results[name]['min']:10.4f}s", file=sys.stderr)
+    return {
+        "format": FORMAT,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "prysk": VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "scale": scale,
+        "seed": seed,
+        "benchmarks": results,
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Print how results compare to baseline, returning the regressed names"""
+    regressed = []
+    for name, result in results["benchmarks"].items():
+        try:
+            before = baseline["benchmarks"][name]["min"]
+        except KeyError:
+            continue
+        ratio = result["min"] / before
+        mark = ""
+        if ratio > max_regression:
+            regressed.append(name)
+            mark = "  REGRESSION"
+        print(f"{name:24} {before:10.4f}s {result['min']:10.4f}s {ratio:6.2f}x{mark}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="path to write the results (JSON) to")
+    parser.add_argument("--baseline", help="results (JSON) of a previous run")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=1.25,
+        help="fail if a benchmark is slower than baseline by this factor",
+    )
+    parser.add_argument("--filter", help="only run benchmarks matching a regex")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    names = [n for n in BENCHMARKS if not args.filter or re.search(args.filter, n)]
+    results = run(names, args.repeat, args.scale, args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("format") != FORMAT:
+            parser.error(f"unsupported baseline format: {args.baseline}")
+        if compare(results, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,122 @@
+"""Generator for synthetic test corpora used by the benchmarks.
+
+Each kind of corpus stresses a different part of prysk:
+
+small
+    many small test files with a few commands each
+huge
+    a few test files with thousands of commands
+output
+    tests with commands producing lots of output
+matchers
+    tests relying heavily on (re) and (glob) lines
+binary
+    tests producing output which isn't valid UTF-8
+
+All generated tests pass. The corpus only depends on seed and scale, so
+runs based on the same parameters are comparable.
+"""
+
+import argparse
+import random
+from pathlib import Path
+
+KINDS = ("small", "huge", "output", "matchers", "binary")
+
+_WORDS = (
+    "alpha bravo charlie delta echo foxtrot golf hotel india juliett kilo "
+    "lima mike november oscar papa quebec romeo sierra tango uniform victor"
+).split()
+
+
+def _small(rng, scale):
+    for i in range(200 * scale):
+        lines = [f"Small test {i}:\n", "\n"]
+        for _ in range(5):
+            word = rng.choice(_WORDS)
+            lines += [f"  $ echo {word}\n", f"  {word}\n"]
+        yield f"small-{i:04d}.t", lines
+
+
+def _huge(rng, scale):
+    for i in range(2 * scale):
+        lines = []
+        for j in range(2000):
+            word = rng.choice(_WORDS)
+            lines += [f"Step {j}:\n", "\n", f"  $ echo {word} {j}\n", f"  {word} {j}\n"]
+        yield f"huge-{i}.t", lines
+
+
+def _output(rng, scale):
+    for i in range(5 * scale):
+        count = rng.randrange(10000, 30000)
+        program = f'BEGIN {{ for (i = 0; i < {count}; i++) print "line " i }}'
+        lines = [f"  $ awk '{program}'\n"]
+        lines += [f"  line {n}\n" for n in range(count)]
+        yield f"output-{i}.t", lines
+
+
+def _matchers(rng, scale):
+    for i in range(20 * scale):
+        lines = []
+        for j in range(100):
+            word = rng.choice(_WORDS)
+            number = rng.randrange(100000)
+            lines += [
+                f"  $ echo {word}-{number}; echo {word}.{number}\n",
+                f"  {word}-\\d+ (re)\n",
+                f"  {word[0]}*.{str(number)[0]}* (glob)\n",
+            ]
+        yield f"matchers-{i:02d}.t", lines
+
+
+def _binary(rng, scale):
+    for i in range(20 * scale):
+        lines = []
+        for _ in range(100):
+            # Continuation bytes without a lead byte are never valid UTF-8
+            data = bytes(rng.randrange(0x80, 0xC0) for _ in range(16))
+            octal = "".join(f"\\{b:03o}" for b in data)
+            escaped = "".join(f"\\x{b:02x}" for b in data)
+            lines += [f"  $ printf 'x{octal}\\n'\n", f"  x{escaped} (esc)\n"]
+        yield f"binary-{i:02d}.t", lines
+
+
+_GENERATORS = {
+    "small": _small,
+    "huge": _huge,
+    "output": _output,
+    "matchers": _matchers,
+    "binary": _binary,
+}
+
+
+def generate(directory, kinds=KINDS, seed=0, scale=1):
+    """Write the corpora of kinds to subdirectories of directory.
+
+    Returns a dict mapping each kind to its directory.
+    """
+    directories = {}
+    for kind in kinds:
+        rng = random.Random(f"{seed}-{kind}")
+        path = Path(directory, kind)
+        path.mkdir(parents=True, exist_ok=True)
+        for name, lines in _GENERATORS[kind](rng, scale):
+            (path / name).write_text("".join(lines), encoding="utf-8")
+        directories[kind] = path
+    return directories
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", help="directory to write the corpora to")
+    parser.add_argument("--kind", choices=KINDS, action="append", dest="kinds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=int, default=1)
+    args = parser.parse_args(argv)
+    generate(args.directory, args.kinds or KINDS, args.seed, args.scale)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
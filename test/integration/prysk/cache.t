@@ -0,0 +1,82 @@
+Set up prysk alias and example tests:
+
+  $ . "$TESTDIR"/setup.sh
+
+Passing tests are cached:
+
+  $ prysk -q -v --cache=cache examples/bare.t examples/fail.t examples/test.t
+  examples/bare.t: passed
+  examples/fail.t: failed
+  examples/test.t: passed
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
+  # Ran 3 tests, 0 skipped, 1 failed.
+  [1]
+  $ prysk -q -v --cache=cache examples/bare.t examples/fail.t examples/test.t
+  examples/bare.t: passed (cached)
+  examples/fail.t: failed
+  examples/test.t: passed (cached)
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
+  # Ran 3 tests, 0 skipped, 1 failed, 2 cached.
+  [1]
+  $ rm examples/fail.t.err
+
+Changing a test, or the settings it runs with, invalidates its entry:
+
+  $ echo "  $ true" >> examples/bare.t
+  $ prysk -q -v --cache=cache examples/bare.t examples/test.t
+  examples/bare.t: passed
+  examples/test.t: passed (cached)
+  # Ran 2 tests, 0 skipped, 0 failed, 1 cached.
+  $ prysk -q -v --cache=cache --escape7bit examples/test.t
+  examples/test.t: passed
+  # Ran 1 tests, 0 skipped, 0 failed.
+
+Declared dependencies are part of the cache key:
+
+  $ cat > dep.t <<EOF
+  > prysk-depends: data/*.txt
+  > 
+  >   $ cat "\$TESTDIR"/data/*.txt
+  >   foo
+  > EOF
+  $ mkdir data
+  $ echo foo > data/a.txt
+  $ prysk -q -v --cache=cache dep.t
+  dep.t: passed
+  # Ran 1 tests, 0 skipped, 0 failed.
+  $ prysk -q -v --cache=cache dep.t
+  dep.t: passed (cached)
+  # Ran 1 tests, 0 skipped, 0 failed, 1 cached.
+  $ echo bar > data/a.txt
+  $ prysk -q -v --cache=cache dep.t
+  dep.t: failed
+  # Ran 1 tests, 0 skipped, 1 failed.
+  [1]
+
+Entries exceeding the size limit are evicted:
+
+  $ ls cache | wc -l | tr -d ' '
+  5
+  $ prysk -q --cache=cache --cache-max-size=0 examples/bare.t
+  .
+  # Ran 1 tests, 0 skipped, 0 failed, 1 cached.
+  $ ls cache | wc -l | tr -d ' '
+  0
+
+Parsed test files can be cached as well:
+
+  $ prysk -q --parse-cache=parsed examples/bare.t examples/fail.t
+  .!
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
+  # Ran 2 tests, 0 skipped, 1 failed.
+  [1]
+  $ ls parsed | wc -l | tr -d ' '
+  2
+  $ mv examples/fail.t.err fail.t.err
+  $ prysk -q --parse-cache=parsed examples/bare.t examples/fail.t
+  .!
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
+  # Ran 2 tests, 0 skipped, 1 failed.
+  [1]
+  $ cmp fail.t.err examples/fail.t.err
+  $ rm -r parsed fail.t.err examples/fail.t.err
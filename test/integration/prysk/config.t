@@ -49,6 +49,16 @@ Invalid option in .pryskrc:
   prysk: error: --verbose: invalid boolean value: 'hmm'
   [2]
   $ rm .pryskrc
+  $ cat > .pryskrc <<EOF
+  > [prysk]
+  > schedule = fastest
+  > EOF
+  $ prysk test.t
+  [Uu]sage: prysk \[OPTIONS\] TESTS\.\.\. (re)
+  
+  prysk: error: --schedule: invalid choice: 'fastest' (choose from 'longest', 'sorted')
+  [2]
+  $ rm .pryskrc
 
 Options in an environment variable:
 
@@ -59,3 +69,21 @@ Options in an environment variable:
   $ PRYSK='-y -n' prysk test.t
   options --yes and --no are mutually exclusive
   [2]
+
+Substitutions in .pryskrc:
+
+  $ cat > test.t <<EOF
+  >   $ echo took 12ms
+  >   took Nms
+  >   $ echo pid 4711
+  >   pid PID
+  > EOF
+  $ cat > .pryskrc <<EOF
+  > [prysk]
+  > normalize =
+  >   s/[0-9]*ms/Nms/
+  > EOF
+  $ prysk --normalize 's/pid [0-9]*/pid PID/' test.t
+  .
+  # Ran 1 tests, 0 skipped, 0 failed.
+  $ rm .pryskrc
@@ -0,0 +1,48 @@
+Set up prysk alias and example tests:
+
+  $ . "$TESTDIR"/setup.sh
+
+The slowest commands are listed with their wall and CPU time:
+
+  $ cat > slow.t <<EOF
+  >   $ echo fast
+  >   fast
+  >   $ sleep 1
+  >   $ sh -c 'sleep 0.5'
+  > EOF
+  $ prysk --durations=2 slow.t examples/bare.t
+  ..
+  # Ran 2 tests, 0 skipped, 0 failed.
+  # Slowest 2 commands:
+  \s+1\.\d{3}s wall\s+\d+\.\d{3}s cpu  slow\.t:3  \$ sleep 1 (re)
+  \s+0\.\d{3}s wall\s+\d+\.\d{3}s cpu  slow\.t:4  \$ sh -c 'sleep 0\.5' (re)
+
+All commands are listed with --durations=0:
+
+  $ prysk -q --durations=0 slow.t examples/bare.t | grep -c ' cpu  '
+  4
+
+Timed tests report command boundaries on file descriptors (see --framing),
+markers in the output can be read together, taking all their timings at once:
+
+  $ cat > framing.t <<EOF
+  >   $ [ -e /dev/fd/8 ] && echo framed
+  >   framed
+  > EOF
+  $ prysk --durations=1 framing.t
+  .
+  # Ran 1 tests, 0 skipped, 0 failed.
+  # Slowest 1 commands:
+  \s+\d+\.\d{3}s wall\s+\d+\.\d{3}s cpu  framing\.t:1  \$ \[ -e /dev/fd/8 \] && echo framed (re)
+  $ prysk -q framing.t > /dev/null
+  [1]
+  $ prysk -q --durations=1 --framing=inline framing.t > /dev/null
+  [1]
+  $ rm framing.t
+
+Commands of cached tests aren't run, so they aren't listed either:
+
+  $ prysk -q --cache=cache --durations=0 examples/bare.t > /dev/null
+  $ prysk -q --cache=cache --durations=0 examples/bare.t
+  .
+  # Ran 1 tests, 0 skipped, 0 failed, 1 cached.
@@ -6,6 +6,7 @@ Interactive mode (don't merge):
 
   $ prysk -n -i examples/fail.t
   !
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
   --- examples/fail.t
   +++ examples/fail.t.err
   @@ -1,18 +1,18 @@
@@ -53,6 +54,7 @@ Interactive mode (merge):
   $ cp examples/fail.t examples/fail.t.orig
   $ prysk -y -i examples/fail.t
   !
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
   --- examples/fail.t
   +++ examples/fail.t.err
   @@ -1,18 +1,18 @@
@@ -100,6 +102,7 @@ Verbose interactive mode (answer manually and don't merge):
 
   $ printf 'bad\nn\n' | prysk -v -i examples/fail.t
   examples/fail.t: failed
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
   --- examples/fail.t
   +++ examples/fail.t.err
   @@ -1,18 +1,18 @@
@@ -141,6 +144,7 @@ Verbose interactive mode (answer manually and don't merge):
   .*\b7a23dfa85773c77648f619ad0f9df554\b.* (re)
   $ printf 'bad\n\n' | prysk -v -i examples/fail.t
   examples/fail.t: failed
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
   --- examples/fail.t
   +++ examples/fail.t.err
   @@ -1,18 +1,18 @@
@@ -186,6 +190,7 @@ Verbose interactive mode (answer manually and merge):
   $ cp examples/fail.t examples/fail.t.orig
   $ printf 'bad\ny\n' | prysk -v -i examples/fail.t
   examples/fail.t: failed
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
   --- examples/fail.t
   +++ examples/fail.t.err
   @@ -1,18 +1,18 @@
@@ -245,6 +250,7 @@ Test missing patch(1) and patch(1) error:
   $ chmod +x patch
   $ PATH=$PWD prysk -y -i examples/fail.t
   !
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
   --- examples/fail.t
   +++ examples/fail.t.err
   @@ -1,18 +1,18 @@
@@ -0,0 +1,51 @@
+Set up prysk alias and example tests:
+
+  $ . "$TESTDIR"/setup.sh
+
+A JSON record is written for each test as soon as it finishes:
+
+  $ prysk -q --json-lines=results.jsonl examples
+  .s.!.s.
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
+  # Ran 7 tests, 2 skipped, 1 failed.
+  [1]
+  $ cut -d, -f1,2 results.jsonl
+  {"path":"examples/bare.t","status":"passed"
+  {"path":"examples/empty.t","status":"empty"
+  {"path":"examples/env.t","status":"passed"
+  {"path":"examples/fail.t","status":"failed"
+  {"path":"examples/missingeol.t","status":"passed"
+  {"path":"examples/skip.t","status":"skipped"
+  {"path":"examples/test.t","status":"passed"
+
+Records contain the wall and CPU time and the return code of each command,
+and the size of the diff of failing tests:
+
+  $ grep -o '{"line":36,[^}]*}' results.jsonl
+  {"line":36,"command":"\(exit 1\)","wall":\d+(\.\d+)?(e-\d+)?,"cpu":\d+(\.\d+)?(e-\d+)?,"returncode":1} (re)
+  $ grep -o '"diff_lines":.*' results.jsonl
+  "diff_lines":0,"diff_bytes":0}
+  "diff_lines":0,"diff_bytes":0}
+  "diff_lines":0,"diff_bytes":0}
+  "diff_lines":34,"diff_bytes":668}
+  "diff_lines":0,"diff_bytes":0}
+  "diff_lines":0,"diff_bytes":0}
+  "diff_lines":0,"diff_bytes":0}
+  $ rm results.jsonl examples/fail.t.err
+
+Records can be written to standard output, everything else is written to
+standard error then:
+
+  $ prysk --json-lines=- examples/bare.t examples/fail.t 2> /dev/null | cut -d, -f1,2
+  {"path":"examples/bare.t","status":"passed"
+  {"path":"examples/fail.t","status":"failed"
+  $ prysk --json-lines=- examples/bare.t examples/fail.t 2>&1 > /dev/null | tail -n 2
+  
+  # Ran 2 tests, 0 skipped, 1 failed.
+  $ rm examples/fail.t.err
+
+--json-lines can't be combined with --debug:
+
+  $ prysk -d --json-lines=- examples/bare.t
+  options --debug and --json-lines are mutually exclusive
+  [2]
@@ -6,6 +6,7 @@ Run prysk examples:
 
   $ prysk -q examples examples/fail.t
   .s.!.s.
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
   # Ran 7 tests, 2 skipped, 1 failed.
   [1]
   $ md5 examples/fail.t examples/fail.t.err
@@ -17,6 +18,7 @@ Run examples with bash:
 
   $ prysk --shell=/bin/bash -q examples examples/fail.t
   .s.!.s.
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
   # Ran 7 tests, 2 skipped, 1 failed.
   [1]
   $ md5 examples/fail.t examples/fail.t.err
@@ -24,6 +26,77 @@ Run examples with bash:
   .*\b7a23dfa85773c77648f619ad0f9df554\b.* (re)
   $ rm examples/fail.t.err
 
+Run examples in parallel (env.t is left out as it lists its own directory,
+which contains .err files depending on timing):
+
+  $ prysk -q -j 4 examples/[!e]*.t examples/fail.t
+  .!.s.
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
+  # Ran 5 tests, 1 skipped, 1 failed.
+  [1]
+  $ md5 examples/fail.t examples/fail.t.err
+  .*\b0f598c2b7b8ca5bcb8880e492ff6b452\b.* (re)
+  .*\b7a23dfa85773c77648f619ad0f9df554\b.* (re)
+  $ rm examples/fail.t.err
+  $ prysk -q -v -j auto examples/[!e]*.t
+  examples/bare.t: passed
+  examples/fail.t: failed
+  examples/missingeol.t: passed
+  examples/skip.t: skipped
+  examples/test.t: passed
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
+  # Ran 5 tests, 1 skipped, 1 failed.
+  [1]
+  $ rm examples/fail.t.err
+
+Schedule the slowest tests first, based on the durations of previous runs:
+
+  $ prysk -q -j 2 --schedule=longest --history-file=history.json examples/[!e]*.t
+  .!.s.
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
+  # Ran 5 tests, 1 skipped, 1 failed.
+  [1]
+  $ grep -c '"examples/' history.json
+  5
+  $ prysk -q -j 2 --schedule=longest --history-file=history.json examples/[!e]*.t
+  .!.s.
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
+  # Ran 5 tests, 1 skipped, 1 failed.
+  [1]
+  $ rm history.json examples/fail.t.err
+
+Report command boundaries on a separate file descriptor:
+
+  $ prysk -q --framing=fd examples examples/fail.t
+  .s.!.s.
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
+  # Ran 7 tests, 2 skipped, 1 failed.
+  [1]
+  $ md5 examples/fail.t examples/fail.t.err
+  .*\b0f598c2b7b8ca5bcb8880e492ff6b452\b.* (re)
+  .*\b7a23dfa85773c77648f619ad0f9df554\b.* (re)
+  $ rm examples/fail.t.err
+
+Show the resources used by each test:
+
+  $ prysk -q -v --resources examples/bare.t examples/skip.t
+  examples/bare.t: passed \(user \d+\.\d{3}s, sys \d+\.\d{3}s, max RSS \d+\.\d MB, blocks \d+ in/\d+ out, context switches \d+ voluntary/\d+ involuntary\) (re)
+  examples/skip.t: skipped
+  # Ran 2 tests, 1 skipped, 0 failed.
+
+Write a timeline of the run:
+
+  $ prysk -q -j 2 --trace-file=trace.json examples/bare.t examples/test.t
+  ..
+  # Ran 2 tests, 0 skipped, 0 failed.
+  $ grep -o '"name": "[a-z .]*"' trace.json | sort | uniq -c
+  \s+2 "name": "diff" (re)
+  \s+1 "name": "discover" (re)
+  \s+2 "name": "execute" (re)
+  \s+2 "name": "parse" (re)
+  \s+2 "name": "test" (re)
+  $ rm trace.json
+
 Verbose mode:
 
   $ prysk -q -v examples examples/fail.t
@@ -34,6 +107,7 @@ Verbose mode:
   examples/missingeol.t: passed
   examples/skip.t: skipped
   examples/test.t: passed
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
   # Ran 7 tests, 2 skipped, 1 failed.
   [1]
   $ md5 examples/fail.t examples/fail.t.err
@@ -151,3 +225,107 @@ Test running tests with the same filename in different directories:
   
   # Ran 2 tests, 0 skipped, 2 failed.
   [1]
+
+Normalize volatile output:
+
+  $ cat > normalize.t <<EOF
+  >   $ echo "pid 4711 took 12ms in \$TMPDIR"
+  >   pid PID took Nms in \$TMPDIR
+  > EOF
+  $ prysk -q normalize.t > /dev/null
+  [1]
+  $ prysk --normalize 's/pid [0-9]*/pid PID/' --normalize 's/[0-9]*ms/Nms/' \
+  >   normalize.t
+  .
+  # Ran 1 tests, 0 skipped, 0 failed.
+  $ cat > anchored.t <<EOF
+  >   $ printf 'x\\nfoo 1\\nfoo 2\\n'
+  >   x
+  >   X 1
+  >   X 2
+  > EOF
+  $ prysk --normalize 's/^foo/X/' anchored.t
+  .
+  # Ran 1 tests, 0 skipped, 0 failed.
+  $ rm anchored.t
+  $ prysk --normalize 's/[/x/' normalize.t
+  [Uu]sage: prysk \[OPTIONS\] TESTS\.\.\. (re)
+  prysk: error: argument --normalize: invalid substitution: 's/[/x/' (invalid regular expression: unterminated character set at position 0)
+  [2]
+  $ rm normalize.t
+
+Limit the size of reported diffs:
+
+  $ cat > hunks.t <<EOF
+  >   $ echo a; seq 10; echo b
+  >   x
+  >   1
+  >   2
+  >   3
+  >   4
+  >   5
+  >   6
+  >   7
+  >   8
+  >   9
+  >   10
+  >   y
+  > EOF
+  $ prysk --max-diff-hunks=1 hunks.t
+  !
+  --- hunks.t
+  +++ hunks.t.err
+  @@ -1,5 +1,5 @@
+     $ echo a; seq 10; echo b
+  -  x
+  +  a
+     1
+     2
+     3
+  [diff truncated]
+  
+  # Ran 1 tests, 0 skipped, 1 failed.
+  [1]
+  $ prysk --max-diff-bytes=60 hunks.t
+  !
+  --- hunks.t
+  +++ hunks.t.err
+  @@ -1,5 +1,5 @@
+  [diff truncated]
+  
+  # Ran 1 tests, 0 skipped, 1 failed.
+  [1]
+  $ prysk --max-diff-lines=2 hunks.t
+  !
+  --- hunks.t
+  +++ hunks.t.err
+  # Diff truncated after 2 lines, see hunks.t.err
+  
+  # Ran 1 tests, 0 skipped, 1 failed.
+  [1]
+  $ prysk --max-diff-hunks=0 --xunit-file=hunks.xml hunks.t
+  !
+  [diff truncated]
+  
+  # Ran 1 tests, 0 skipped, 1 failed.
+  [1]
+  $ grep -o '<failure.*' hunks.xml
+  <failure><![CDATA[[diff truncated]
+  $ rm hunks.t hunks.t.err hunks.xml
+
+Invalid patterns aren't reported if they match their output literally:
+
+  $ printf '  $ echo "a** (re)"\n  a** (re)\n' > invalid.t
+  $ prysk invalid.t examples/bare.t
+  ..
+  # Ran 2 tests, 0 skipped, 0 failed.
+
+Otherwise they are reported in quiet mode as well, before the summary:
+
+  $ printf '  $ echo "b"\n  a** (re)\n' > invalid.t
+  $ prysk -q invalid.t
+  !
+  invalid.t:2: invalid regular expression: multiple repeat at position 4
+  # Ran 1 tests, 0 skipped, 1 failed.
+  [1]
+  $ rm invalid.t invalid.t.err
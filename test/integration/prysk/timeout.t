@@ -0,0 +1,45 @@
+Set up prysk alias and example tests:
+
+  $ . "$TESTDIR"/setup.sh
+
+Tests exceeding the timeout are killed, including their background
+processes, and reported as failed with the output captured so far:
+
+  $ cat > hang.t <<EOF
+  >   $ echo started
+  >   started
+  >   $ (sleep 60; echo late) &
+  >   $ printf 'waiting'; sleep 60
+  >   waiting (no-eol)
+  >   $ echo never
+  >   never
+  > EOF
+  $ prysk --timeout=1 hang.t
+  !
+  --- hang.t
+  +++ hang.t.err
+  @@ -3,5 +3,4 @@
+     $ (sleep 60; echo late) &
+     $ printf 'waiting'; sleep 60
+     waiting (no-eol)
+  -  $ echo never
+  -  never
+  +  [timed out after 1s]
+  
+  # Ran 1 tests, 0 skipped, 1 failed, 1 timed out.
+  [1]
+
+  $ prysk -q -v --command-timeout=0.5 hang.t examples/test.t
+  hang.t: timed out after 0.5s
+  examples/test.t: passed
+  # Ran 2 tests, 0 skipped, 1 failed, 1 timed out.
+  [1]
+
+Timeouts are reported in xUnit output:
+
+  $ prysk -q --timeout=1 --xunit-file=prysk.xml hang.t
+  !
+  # Ran 1 tests, 0 skipped, 1 failed, 1 timed out.
+  [1]
+  $ grep '<failure' prysk.xml
+      <failure message="timed out after 1s"><![CDATA[--- hang.t
@@ -0,0 +1,66 @@
+Set up prysk alias and example tests:
+
+  $ . "$TESTDIR"/setup.sh
+
+Update failing tests with their actual output. Lines with (re), (glob)
+and (esc) annotations are kept as long as they still match, the result is
+the same as accepting the changes in interactive mode:
+
+  $ chmod 640 examples/fail.t
+  $ prysk -q --update --jobs=2 examples
+  .s.!.s.
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
+  # Ran 7 tests, 2 skipped, 1 failed, 1 updated.
+  [1]
+  $ md5 examples/fail.t
+  .*\b1d9e5b527f01fbf2d9b1c121d005108c\b.* (re)
+  $ ls -l examples/fail.t | cut -c1-10
+  -rw-r-----
+  $ ls -A examples | grep fail
+  fail.t
+  $ prysk -q examples
+  .s...s.
+  # Ran 7 tests, 2 skipped, 0 failed.
+
+Updated tests are reported in verbose mode:
+
+  $ printf '  $ echo new\n  old\n' > examples/bare.t
+  $ prysk -q -v --update examples/bare.t
+  examples/bare.t: failed
+  examples/bare.t: updated
+  # Ran 1 tests, 0 skipped, 1 failed, 1 updated.
+  [1]
+  $ cat examples/bare.t
+    $ echo new
+    new
+
+Truncated diffs of updated tests don't refer to a .err file:
+
+  $ printf '  $ echo 1; echo 2\n' > examples/bare.t
+  $ prysk --update --max-diff-lines=3 examples/bare.t
+  !
+  --- examples/bare.t
+  +++ examples/bare.t.err
+  @@ -1,1 +1,3 @@
+  # Diff truncated after 3 lines, examples/bare.t was updated
+  
+  # Ran 1 tests, 0 skipped, 1 failed, 1 updated.
+  [1]
+  $ ls examples/bare.t*
+  examples/bare.t
+
+Tests which timed out aren't updated:
+
+  $ printf '  $ sleep 5\n' > examples/bare.t
+  $ prysk -q --update --timeout=0.5 examples/bare.t
+  !
+  # Ran 1 tests, 0 skipped, 1 failed, 1 timed out.
+  [1]
+  $ cat examples/bare.t
+    $ sleep 5
+
+--update can't be combined with --interactive:
+
+  $ prysk -i --update examples/bare.t
+  options --interactive and --update are mutually exclusive
+  [2]
@@ -19,6 +19,9 @@ Usage:
     -v, --verbose         show filenames and test status (default: False)
     -i, --interactive     interactively merge changed test output (default:
                           False)
+    --update              update tests with their actual output, keeping (re),
+                          (glob) and (esc) lines which still match (default:
+                          False)
     -d, --debug           write script output directly to the terminal (default:
                           False)
     -y, --yes             answer yes to all questions (default: False)
@@ -33,10 +36,58 @@ Usage:
                           Mode which shall be used for coloring the output
                           (default: auto)
     --xunit-file PATH     path to write xUnit XML output (default: None)
+    --json-lines PATH     path to write a JSON record of each test to as it
+                          finishes (- for standard output, other output then
+                          goes to standard error) (default: None)
     --dos2unix            convert DOS/Windows line endings to UNIX line endings
                           (default: False)
     --escape7bit          escape all non-7-bit bytes (not just non-
                           printable/invalid UTF-8) (default: False)
+    -j N, --jobs N        number of tests to run in parallel ('auto' uses all
+                          CPUs) (default: 1)
+    --schedule {longest,sorted}
+                          order in which parallel tests are dispatched
+                          ('longest' runs the slowest tests first) (default:
+                          sorted)
+    --history-file PATH   path of a file recording test durations for scheduling
+                          (default: None)
+    --cache DIR           directory caching passing results, unchanged tests are
+                          skipped (default: None)
+    --cache-max-age DAYS  evict cache entries which haven't been used for DAYS
+                          days (default: 7)
+    --cache-max-size MB   evict least recently used cache entries beyond MB
+                          megabytes (default: 100)
+    --parse-cache DIR     directory caching parsed test files, unchanged tests
+                          aren't parsed again (default: None)
+    --timeout SECONDS     fail tests running longer than SECONDS (default: None)
+    --command-timeout SECONDS
+                          fail tests with a single command running longer than
+                          SECONDS (default: None)
+    --framing {auto,fd,inline}
+                          how command boundaries are reported ('fd' uses file
+                          descriptors 8 and 9 instead of marker lines in the
+                          output, tests can't use them or the _prysk_ack
+                          variable; 'auto' uses 'fd' if command timings are
+                          reported, which it makes accurate) (default: auto)
+    --diff-engine {auto,difflib,patience}
+                          algorithm used to diff the output of failing tests
+                          (default: auto)
+    --max-diff-hunks N    report at most N hunks of each diff (0 only reports
+                          whether tests failed, without computing diffs)
+                          (default: None)
+    --max-diff-bytes N    report at most N bytes of each diff (default: None)
+    --max-diff-lines N    print at most N lines of each diff (the full output is
+                          kept in the .err file) (default: None)
+    --normalize s/REGEX/REPLACEMENT/
+                          replace matches of REGEX in the output of commands
+                          before comparing it (may be given multiple times)
+                          (default: None)
+    --durations N         list the N slowest commands (0 lists all commands)
+                          (default: None)
+    --resources           show CPU time, peak memory, I/O and context switches
+                          of each test (with --verbose) (default: False)
+    --trace-file PATH     path to write a timeline of the run in Chrome trace
+                          event format (default: None)
 
 
 
@@ -67,3 +118,8 @@ Usage:
   $ prysk --shell=./badsh nop.t
   shell not found: ./badsh
   [2]
+
+  $ prysk -j 0 nop.t
+  [Uu]sage: prysk \[OPTIONS\] TESTS\.\.\. (re)
+  prysk: error: argument -j/--jobs: invalid jobs value: '0' (expected a positive integer or 'auto')
+  [2]
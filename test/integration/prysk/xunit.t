@@ -12,9 +12,10 @@ xUnit XML output:
   examples/missingeol.t: passed
   examples/skip.t: skipped
   examples/test.t: passed
+  examples/fail.t:13: invalid regular expression: multiple repeat at position 4
   # Ran 7 tests, 2 skipped, 1 failed.
   [1]
-  $ cat prysk.xml
+  $ grep -v '<property ' prysk.xml
   <?xml version="1.0" encoding="utf-8"?>
   <testsuite name="prysk"
              tests="7"
@@ -22,10 +23,13 @@ xUnit XML output:
              skipped="2"
              timestamp="\d+-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\+\d{2}:\d{2}" (re)
              hostname="[^"]+" (re)
-             time="\d+\.\d{6}"> (re)
+             time="\d+\.\d{6}" *> (re)
     <testcase classname="examples/bare.t"
               name="bare.t"
-              time="\d+\.\d{6}"/> (re)
+              time="\d+\.\d{6}"> (re)
+      <properties>
+      </properties>
+    </testcase>
     <testcase classname="examples/empty.t"
               name="empty.t"
               time="\d+\.\d{6}"> (re)
@@ -33,10 +37,15 @@ xUnit XML output:
     </testcase>
     <testcase classname="examples/env.t"
               name="env.t"
-              time="\d+\.\d{6}"/> (re)
+              time="\d+\.\d{6}"> (re)
+      <properties>
+      </properties>
+    </testcase>
     <testcase classname="examples/fail.t"
               name="fail.t"
               time="\d+\.\d{6}"> (re)
+      <properties>
+      </properties>
       <failure><![CDATA[--- examples/fail.t
   +++ examples/fail.t.err
   @@ -1,18 +1,18 @@
@@ -75,7 +84,10 @@ xUnit XML output:
     </testcase>
     <testcase classname="examples/missingeol.t"
               name="missingeol.t"
-              time="\d+\.\d{6}"/> (re)
+              time="\d+\.\d{6}"> (re)
+      <properties>
+      </properties>
+    </testcase>
     <testcase classname="examples/skip.t"
               name="skip.t"
               time="\d+\.\d{6}"> (re)
@@ -83,6 +95,55 @@ xUnit XML output:
     </testcase>
     <testcase classname="examples/test.t"
               name="test.t"
-              time="\d+\.\d{6}"/> (re)
+              time="\d+\.\d{6}"> (re)
+      <properties>
+      </properties>
+    </testcase>
   </testsuite>
+
+The resource usage of each test and the wall and CPU time of each
+command are recorded as properties:
+
+  $ grep -A 10 '<properties>' prysk.xml | head -n 11
+      <properties>
+        <property name="usage:user" value="\d+\.\d{6}"/> (re)
+        <property name="usage:system" value="\d+\.\d{6}"/> (re)
+        <property name="usage:maxrss" value="\d+"/> (re)
+        <property name="usage:inblock" value="\d+"/> (re)
+        <property name="usage:oublock" value="\d+"/> (re)
+        <property name="usage:nvcsw" value="\d+"/> (re)
+        <property name="usage:nivcsw" value="\d+"/> (re)
+        <property name="command:1:wall" value="\d+\.\d{6}"/> (re)
+        <property name="command:1:cpu" value="\d+\.\d{6}"/> (re)
+      </properties>
   $ rm prysk.xml examples/fail.t.err
+
+The report is written while the tests run. If the run is interrupted,
+the tests finished so far are reported:
+
+  $ mkdir interrupted
+  $ printf '  $ echo a\n  a\n' > interrupted/a.t
+  $ printf '  $ kill -TERM $PPID\n' > interrupted/b.t
+  $ prysk -q --xunit-file=prysk.xml interrupted
+  . (no-eol)
+  [2]
+  $ grep -v '<property ' prysk.xml
+  <?xml version="1.0" encoding="utf-8"?>
+  <testsuite name="prysk"
+             tests="1"
+             failures="0"
+             skipped="0"
+             timestamp="\d+-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\+\d{2}:\d{2}" (re)
+             hostname="[^"]+" (re)
+             time="\d+\.\d{6}" *> (re)
+    <testcase classname="interrupted/a.t"
+              name="a.t"
+              time="\d+\.\d{6}"> (re)
+      <properties>
+      </properties>
+    </testcase>
+  </testsuite>
+  $ ls -A interrupted
+  a.t
+  b.t
+  $ rm -r prysk.xml interrupted
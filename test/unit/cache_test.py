@@ -0,0 +1,100 @@
+import os
+from pathlib import Path
+
+import prysk.cache
+from prysk.cache import (
+    ParseCache,
+    ResultCache,
+    runcached,
+)
+from prysk.parse import parse
+from prysk.test import Result
+
+
+def create_test(directory, name, content):
+    path = Path(directory) / name
+    path.write_bytes(content)
+    return path
+
+
+def test_key_depends_on_shell_and_options(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    path = create_test(tmp_path, "a.t", b"  $ true\n")
+    content = path.read_bytes()
+    key = cache.key(path, content, ["/bin/sh"], indent=2)
+    assert key == cache.key(path, content, ["/bin/sh"], indent=2)
+    assert key != cache.key(path, content, ["/bin/bash"], indent=2)
+    assert key != cache.key(path, content, ["/bin/sh", "-x"], indent=2)
+    assert key != cache.key(path, content, ["/bin/sh"], indent=4)
+    assert key != cache.key(path, content + b"\n", ["/bin/sh"], indent=2)
+
+
+def test_key_depends_on_prysk_version(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache")
+    path = create_test(tmp_path, "a.t", b"  $ true\n")
+    content = path.read_bytes()
+    key = cache.key(path, content, ["/bin/sh"])
+    monkeypatch.setattr(prysk.cache, "__version__", "999.0.0")
+    assert key != cache.key(path, content, ["/bin/sh"])
+
+
+def test_runcached_only_runs_uncached_tests(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    path = create_test(tmp_path, "a.t", b"  $ echo 1\n  1\n")
+    calls = []
+
+    def test():
+        calls.append(path)
+        return Result([b"  $ echo 1\n", b"  1\n"], [b"  $ echo 1\n", b"  1\n"], [])
+
+    for _ in range(2):
+        for _, wrapped in runcached([(path, test)], cache, ["/bin/sh"]):
+            result = wrapped()
+
+    assert calls == [path]
+    assert result.cached
+    assert result.postout == [b"  $ echo 1\n", b"  1\n"]
+    assert not result.diff
+
+
+def test_evict_removes_expired_entries(tmp_path):
+    cache = ResultCache(tmp_path, max_age=60)
+    cache.put("old", [b"old\n"])
+    cache.put("new", [b"new\n"])
+    os.utime(tmp_path / "old", (0, 0))
+    cache.evict()
+    assert cache.get("old") is None
+    assert cache.get("new") == [b"new\n"]
+
+
+def test_parse_cache_reparses_changed_files(tmp_path, monkeypatch):
+    cache = ParseCache(tmp_path / "cache")
+    path = create_test(tmp_path, "a.t", b"  $ echo 1\n  > 2\n  1 (re)\n")
+    with open(path, "rb") as f:
+        parsed = cache.parse(f)
+    assert parsed == parse(path.read_bytes().splitlines(True))
+    assert len(os.listdir(tmp_path / "cache")) == 1
+
+    # Entries are used as long as the file's size and mtime are unchanged
+    monkeypatch.setattr("prysk.cache.parse", None)
+    with open(path, "rb") as f:
+        assert cache.parse(f) == parsed
+    monkeypatch.undo()
+
+    path.write_bytes(b"  $ echo 2\n")
+    with open(path, "rb") as f:
+        assert cache.parse(f).refout == [b"  $ echo 2\n"]
+    with open(path, "rb") as f:
+        assert cache.parse(f, indent=4).script == []
+    assert len(os.listdir(tmp_path / "cache")) == 2
+
+
+def test_parse_cache_ignores_corrupt_entries(tmp_path):
+    cache = ParseCache(tmp_path / "cache")
+    path = create_test(tmp_path, "a.t", b"  $ echo 1\n")
+    with open(path, "rb") as f:
+        cache.parse(f)
+    for entry in (tmp_path / "cache").iterdir():
+        entry.write_bytes(b"garbage")
+    with open(path, "rb") as f:
+        assert cache.parse(f).script == [(0, b"echo 1\n")]
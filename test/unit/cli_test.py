@@ -1,11 +1,17 @@
+import argparse
+import io
+import os
 from collections import namedtuple
 from inspect import cleandoc
 
 import pytest
+from rich.console import Console
 
-from prysk.cli import (
-    _ArgumentParser,
-    _env_args,
+from prysk.cli import _Cli
+from prysk.options import (
+    ArgumentParser,
+    env_args,
+    jobs,
     load,
 )
 
@@ -43,7 +49,7 @@ def config_file(tmp_path, request):
 
 
 def test_argument_parser_collects_options():
-    parser = _ArgumentParser()
+    parser = ArgumentParser()
     parser.add_argument("-o", "--option", action="store_true")
     parser.add_argument("-i", "--iflag", action="store_true")
     parser.add_argument(
@@ -117,6 +123,16 @@ def test_load_config_fails_on_incompatible_types(
         config = load(config_file, supported_options, section)
 
 
+def test_load_config_fails_on_invalid_choices(tmp_path):
+    config = tmp_path / ".pryskrc"
+    config.write_text("[prysk]\nschedule = fastest\n")
+    with pytest.raises(ValueError) as execinfo:
+        load(config, [(None, "schedule")], choices={"schedule": ["longest", "sorted"]})
+    assert str(execinfo.value) == (
+        "--schedule: invalid choice: 'fastest' (choose from 'longest', 'sorted')"
+    )
+
+
 @pytest.mark.parametrize(
     "var,env,expected",
     [
@@ -125,4 +141,42 @@ def test_load_config_fails_on_incompatible_types(
     ],
 )
 def test_returns_empty_list_of_args(var, env, expected):
-    assert expected == _env_args(var, env)
+    assert expected == env_args(var, env)
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("1", 1),
+        ("8", 8),
+        ("auto", os.cpu_count() or 1),
+    ],
+)
+def test_jobs(value, expected):
+    assert expected == jobs(value)
+
+
+@pytest.mark.parametrize("value", ["0", "-2", "many"])
+def test_jobs_rejects_invalid_values(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        jobs(value)
+
+
+@pytest.mark.parametrize(
+    "color_system, expected",
+    [
+        (None, b"--- a.t\n+[b] :smile:\n x\n"),
+        (
+            "standard",
+            b"\x1b[31m--- a.t\x1b[0m\n\x1b[32m+[b] :smile:\x1b[0m\n x\n",
+        ),
+    ],
+)
+def test_diffs_are_written_without_markup(color_system, expected):
+    cli = _Cli()
+    out = io.TextIOWrapper(io.BytesIO(), encoding="utf-8")
+    cli._stdout_console = Console(file=out, color_system=color_system)
+    diff = [b"--- a.t\n", b"+[b] :smile:\n", b" x\n"]
+    assert cli._write_diff(iter(diff)) == diff
+    assert out.buffer.getvalue() == expected
+    assert cli._write_diff(iter(diff), max_lines=2) is None
@@ -0,0 +1,101 @@
+import pytest
+
+from prysk.diff import (
+    TRUNCATED,
+    _SequenceMatcher,
+    esc,
+    glob,
+    merge,
+    regex,
+    unified_diff,
+)
+
+
+def _output(count, changed=()):
+    refout, postout = [], []
+    for i in range(count):
+        refout += [b"  $ echo %d\n" % i, b"  line-\\d+ (re)\n", b"  line.* (glob)\n"]
+        postout += [b"  $ echo %d\n" % i, b"  line-%d\n" % i, b"  line.%d\n" % i]
+    for i in changed:
+        postout[i] = b"  changed\n"
+    return refout, postout
+
+
+@pytest.mark.parametrize("changed", [(), (1,), (5, 300, 301), (2999,)])
+def test_engines_produce_the_same_diff(changed):
+    refout, postout = _output(1000, changed)
+    matchers = [esc, glob, regex]
+    diffs = [
+        list(unified_diff(refout, postout, matchers=matchers, engine=e, anchor=a))
+        for e in ("difflib", "patience")
+        for a in (None, b"  $ ")
+    ]
+    assert all(diff == diffs[0] for diff in diffs)
+    assert bool(diffs[0]) == bool(changed)
+
+
+def test_patience_engine_handles_reordered_output():
+    refout = [b"  $ cmd\n"] + [b"  %d\n" % i for i in range(10)]
+    postout = [b"  $ cmd\n"] + [b"  %d\n" % i for i in (5, 6, 7, 8, 9, 0, 1, 2, 3, 4)]
+    diff = list(unified_diff(refout, postout, engine="patience"))
+    assert diff[2:] == [
+        b"@@ -1,11 +1,11 @@\n",
+        b"   $ cmd\n",
+        *(b"-  %d\n" % i for i in range(5)),
+        *(b"   %d\n" % i for i in range(5, 10)),
+        *(b"+  %d\n" % i for i in range(5)),
+    ]
+
+
+def test_segments_are_aligned_independently():
+    refout = [b"  $ a\n", b"  x\n", b"  $ b\n", b"  y\n", b"  x\n"]
+    postout = [b"  $ a\n", b"  $ b\n", b"  x\n", b"  y\n", b"  x\n"]
+    diff = list(unified_diff(refout, postout, anchor=b"  $ "))
+    assert diff[2:] == [
+        b"@@ -1,5 +1,5 @@\n",
+        b"   $ a\n",
+        b"-  x\n",
+        b"   $ b\n",
+        b"+  x\n",
+        b"   y\n",
+        b"   x\n",
+    ]
+
+
+@pytest.mark.parametrize("max_hunks, max_bytes", [(0, None), (2, None), (None, 100)])
+def test_truncated_diff_is_a_prefix_of_the_full_diff(max_hunks, max_bytes):
+    refout, postout = _output(100, (5, 100, 200))
+    full = list(unified_diff(refout, postout, matchers=[glob, regex]))
+    diff = list(
+        unified_diff(
+            refout,
+            postout,
+            matchers=[glob, regex],
+            max_hunks=max_hunks,
+            max_bytes=max_bytes,
+        )
+    )
+    assert diff[-1] == TRUNCATED
+    assert diff[:-1] == full[: len(diff) - 1]
+    if max_bytes is not None:
+        assert sum(map(len, diff[:-1])) <= max_bytes
+    if max_hunks is not None:
+        assert sum(line.startswith(b"@@") for line in diff) == max_hunks
+
+
+@pytest.mark.parametrize("engine", ["difflib", "patience"])
+def test_merged_lines_keep_matching_patterns(engine):
+    refout, postout = _output(100, (1, 5, 200))
+    merged = list(merge(refout, postout, [glob, regex], engine, anchor=b"  $ "))
+    assert merged[:6] == refout[:1] + [b"  changed\n"] + refout[2:5] + postout[5:6]
+    assert merged[200] == b"  changed\n"
+    assert len(merged) == len(refout)
+    assert not list(unified_diff(merged, postout, matchers=[glob, regex]))
+
+
+def test_sequence_matcher_bounds_its_memo(monkeypatch):
+    monkeypatch.setattr("prysk.diff._MATCH_CACHE_SIZE", 16)
+    refout, postout = _output(100, changed=range(0, 300, 3))
+    matcher = _SequenceMatcher(None, refout, postout, matchers=[regex, glob])
+    matcher.get_opcodes()
+    assert 0 < matcher._match.cache_info().currsize <= 16
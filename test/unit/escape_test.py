@@ -0,0 +1,27 @@
+import pytest
+
+from prysk.escape import (
+    escape_7bit,
+    escape_text,
+    escape_utf8,
+)
+
+SAMPLES = [b"plain", "☺ unicode".encode(), b"tab\there", b"bad \xff", b"back\\slash"]
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        [b"line %d" % i for i in range(1000)],
+        ["☺ %d".encode() % i for i in range(1000)],
+        [SAMPLES[i % len(SAMPLES)] for i in range(1000)],
+        [SAMPLES[3] if i % 100 == 0 else SAMPLES[i % 3] for i in range(1000)],
+        [b"cr\r", b""] * 500,
+    ],
+    ids=["ascii", "utf8", "dense", "sparse", "empty"],
+)
+@pytest.mark.parametrize("escape7bit", [False, True])
+def test_escape_text_escapes_like_single_lines(lines, escape7bit):
+    escape = escape_7bit if escape7bit else escape_utf8
+    expected = b"\n".join(escape(line) for line in lines)
+    assert escape_text(b"\n".join(lines), escape7bit) == expected
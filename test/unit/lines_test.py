@@ -0,0 +1,61 @@
+import pytest
+
+from prysk.diff import (
+    glob,
+    unified_diff,
+)
+from prysk.lines import Lines
+
+LINES = [b"  $ echo a\n", b"  a\n", b"\n", b"  a\n", b"  b (no-eol)\n", b"x"]
+
+
+def test_lines_behave_like_a_list():
+    lines = Lines(LINES)
+    assert lines == LINES
+    assert LINES == lines
+    assert list(lines) == LINES
+    assert len(lines) == len(LINES)
+    for index in range(-len(LINES), len(LINES)):
+        assert lines[index] == LINES[index]
+    with pytest.raises(IndexError):
+        lines[len(LINES)]  # pylint: disable=pointless-statement
+
+
+@pytest.mark.parametrize(
+    "index",
+    [slice(None), slice(1, 4), slice(-2, None), slice(4, 1), slice(None, None, 2)],
+)
+def test_slices_are_list_compatible(index):
+    view = Lines(LINES)[index]
+    assert view == LINES[index]
+    assert view[1:] == LINES[index][1:]
+    for value in set(LINES[index]):
+        assert view.index(value) == LINES[index].index(value)
+
+
+def test_index_only_finds_whole_lines():
+    lines = Lines([b"  aa\n", b"a\n", b"  a\n", b"  a\n"])
+    assert lines.index(b"  a\n") == 2
+    assert lines.index(b"  a\n", 3) == 3
+    assert lines[1:].index(b"a\n") == 0
+    with pytest.raises(ValueError):
+        lines.index(b"a\n", 2)
+
+
+def test_extend_text_matches_appending_lines():
+    lines = Lines([b"  $ echo\n"])
+    lines.extend_text(b"a\n\nb", b"  ")
+    assert lines == [b"  $ echo\n", b"  a\n", b"  \n", b"  b\n"]
+    assert Lines.frombuffers(*lines.tobuffers()) == lines
+
+
+def test_diff_of_lines_matches_diff_of_lists():
+    refout = [b"  $ echo\n"] + [b"  %d* (glob)\n" % i for i in range(3000)]
+    postout = [b"  $ echo\n"] + [b"  %d0\n" % i for i in range(3000)]
+    postout[1500] = b"  changed\n"
+    for anchor in (None, b"  $ "):
+        expected = list(unified_diff(refout, postout, matchers=[glob], anchor=anchor))
+        diff = unified_diff(
+            Lines(refout), Lines(postout), matchers=[glob], anchor=anchor
+        )
+        assert list(diff) == expected
@@ -0,0 +1,17 @@
+from prysk.output import Output
+
+
+def test_output_spills_large_segments_to_disk():
+    output = Output(b"SALT", spool_size=16)
+    data = b"".join(b"line %d\n" % i for i in range(1000))
+    for i in range(0, len(data), 7):
+        output.write(data[i : i + 7])
+    output.write(b"lastSALT 1 0\n")
+    output.finish()
+    try:
+        assert output._spool._rolled
+        ((lines, record),) = output.segments()
+        assert b"".join(lines) == data + b"last"
+        assert record[:2] == (1, 0)
+    finally:
+        output.close()
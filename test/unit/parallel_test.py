@@ -0,0 +1,102 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from prysk.parallel import (
+    History,
+    runparallel,
+    schedulers,
+)
+from prysk.test import test as run
+
+
+def test_runparallel_preserves_order():
+    release = threading.Event()
+
+    def slow():
+        release.wait(timeout=5)
+        return "slow"
+
+    def fast():
+        release.set()
+        return "fast"
+
+    tests = [(Path("slow.t"), slow), (Path("fast.t"), fast)]
+    results = [(path, test()) for path, test in runparallel(tests, jobs=2)]
+    assert results == [(Path("slow.t"), "slow"), (Path("fast.t"), "fast")]
+
+
+def test_runparallel_runs_every_test_once():
+    calls = []
+
+    def make_test(name):
+        def test():
+            calls.append(name)
+            return name
+
+        return test
+
+    names = [f"{i}.t" for i in range(10)]
+    tests = [(Path(name), make_test(name)) for name in names]
+    assert [test() for _, test in runparallel(tests, jobs=3)] == names
+    assert sorted(calls) == sorted(names)
+
+
+def test_history_roundtrip(tmp_path):
+    path = tmp_path / "history.json"
+    history = History.load(path)
+    assert history.durations == {}
+
+    tests = [(Path("a.t"), lambda: "a")]
+    assert [test() for _, test in history.record(tests)] == ["a"]
+    history.save()
+
+    assert set(History.load(path).durations) == {"a.t"}
+
+
+def test_history_ignores_corrupt_files(tmp_path):
+    path = tmp_path / "history.json"
+    path.write_text("{not json")
+    assert History.load(path).durations == {}
+
+
+def test_longest_schedule_uses_history_and_file_sizes(tmp_path):
+    small = tmp_path / "small.t"
+    small.write_bytes(b"x" * 10)
+    big = tmp_path / "big.t"
+    big.write_bytes(b"x" * 1000)
+    slow = tmp_path / "slow.t"
+    slow.write_bytes(b"x" * 2000)
+    history = History(durations={f"{slow}": 60.0})
+
+    schedule = schedulers["longest"](history)
+    tests = [(path, None) for path in (big, slow, small)]
+    assert [path for path, _ in schedule(tests)] == [slow, big, small]
+
+
+def test_sorted_schedule_keeps_discovery_order():
+    tests = [(Path(f"{name}.t"), None) for name in "cab"]
+    assert schedulers["sorted"](None)(tests) == tests
+
+
+def test_interrupted_runparallel_kills_running_tests():
+    started = threading.Semaphore(0)
+
+    def slow():
+        started.release()
+        # Killing the shell alone wouldn't do, the child keeps stdout open
+        return run(b"  $ sh -c 'trap \"\" INT TERM; sleep 30'\n")
+
+    tests = [(Path(f"{i}.t"), slow) for i in range(3)]
+    results = runparallel(tests, jobs=2)
+    _, first = next(results)
+    for _ in range(2):
+        assert started.acquire(timeout=5)
+    time.sleep(0.2)
+    start = time.monotonic()
+    results.close()
+    assert time.monotonic() - start < 5
+    with pytest.raises(KeyboardInterrupt):
+        first()
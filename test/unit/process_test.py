@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from prysk.process import (
+    ACK_FD,
+    FRAME_FD,
+    PIPE,
+    STDOUT,
+    TimeoutExpired,
+    execute,
+)
+
+
+def test_execute_returns_output_and_return_code():
+    output, retcode = execute(
+        ["/bin/sh", "-"], stdin=b"echo foo; exit 3\n", stdout=PIPE, stderr=STDOUT
+    )
+    assert (output, retcode) == (b"foo\n", 3)
+
+
+def test_execute_restores_default_sigpipe_handler():
+    # yes is killed by SIGPIPE (128 + 13) instead of failing with EPIPE
+    output, retcode = execute(
+        ["/bin/sh", "-"],
+        stdin=b"(yes; echo $? >&2) | head -n 1\n",
+        stdout=PIPE,
+        stderr=STDOUT,
+        timeout=10,
+    )
+    assert (sorted(output.splitlines()), retcode) == ([b"141", b"y"], 0)
+
+
+def test_execute_with_timeout_returns_output():
+    output, retcode = execute(["cat"], stdin=b"x" * 100000, stdout=PIPE, timeout=10)
+    assert (output, retcode) == (b"x" * 100000, 0)
+
+
+def test_execute_kills_process_group_on_timeout():
+    start = time.monotonic()
+    with pytest.raises(TimeoutExpired) as ex:
+        execute(
+            ["/bin/sh", "-"],
+            stdin=b"echo started; (sleep 30; echo late) & sleep 30\n",
+            stdout=PIPE,
+            stderr=STDOUT,
+            timeout=0.5,
+        )
+    assert ex.value.output == b"started\n"
+    assert time.monotonic() - start < 10
+
+
+def test_execute_honors_sink_deadline():
+    class Sink:
+        deadline = time.monotonic() + 0.5
+
+        def write(self, data):
+            pass
+
+    with pytest.raises(TimeoutExpired):
+        execute(["/bin/sh", "-"], stdin=b"sleep 30\n", stdout=PIPE, sink=Sink())
+
+
+def test_execute_passes_frames_after_preceding_output():
+    class Sink:
+        def __init__(self):
+            self.events = []
+
+        def write(self, data):
+            self.events.append(data)
+
+        def frame(self, record):
+            self.events.append(("frame", record))
+
+    script = b"".join(
+        b"printf %d; echo %d >&%d; read _ <&%d\n" % (i, i, FRAME_FD, ACK_FD)
+        for i in range(100)
+    )
+    sink = Sink()
+    output, retcode = execute(
+        ["/bin/sh", "-"], stdin=script, stdout=PIPE, sink=sink, framed=True
+    )
+    assert (output, retcode) == (None, 0)
+    expected, received = [], []
+    for i in range(100):
+        expected += [b"%d" % i, ("frame", b"%d" % i)]
+    for event in sink.events:
+        if received and isinstance(event, bytes) and isinstance(received[-1], bytes):
+            received[-1] += event
+        else:
+            received.append(event)
+    assert received == expected
+
+
+def test_execute_reports_resource_usage_to_sink():
+    class Sink:
+        rusage = None
+
+        def write(self, data):
+            pass
+
+    sink = Sink()
+    script = b"i=0; while [ $i -lt 20000 ]; do i=$((i+1)); done; exit 3\n"
+    output, retcode = execute(["/bin/sh", "-"], stdin=script, stdout=PIPE, sink=sink)
+    assert (output, retcode) == (None, 3)
+    assert sink.rusage.user + sink.rusage.system > 0
+    assert sink.rusage.maxrss > 0
@@ -46,6 +46,11 @@ def test_settings_from(expected, obj):
             Settings(yes=True, debug=False),
             Settings(yes=False, debug=True),
         ),
+        (
+            Settings(normalize=[(b"b", b"B"), (b"a", b"A")]),
+            Settings(normalize=[(b"a", b"A")]),
+            Settings(normalize=[(b"b", b"B")]),
+        ),
     ],
 )
 def test_merge_settings(expected, lhs, rhs):
@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import prysk
+
+# Upper bounds for the time spent importing modules (as reported by
+# python -X importtime), as multiples of the time python -c pass spends on
+# it. Generous enough for slow CI machines, while catching heavy imports.
+VERSION_BUDGET = 15
+TEST_BUDGET = 40
+
+# Modules which must only be imported by the features using them
+DEFERRED = (
+    "concurrent.futures",
+    "configparser",
+    "prysk.cache",
+    "prysk.jsonlines",
+    "prysk.update",
+    "prysk.xunit",
+    "socket",
+)
+
+# Runs prysk with the remaining arguments, then writes the names of all
+# imported modules to the file named by the first argument
+_SCRIPT = """
+import sys
+
+output = sys.argv.pop(1)
+try:
+    from prysk import main
+
+    main()
+finally:
+    modules = sorted(sys.modules)
+    with open(output, "w", encoding="utf-8") as f:
+        f.write("\\n".join(modules))
+"""
+
+
+def environment():
+    """Environment for running prysk from this source tree"""
+    env = dict(os.environ)
+    path = [os.path.dirname(os.path.dirname(prysk.__file__)), env.get("PYTHONPATH")]
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, path))
+    return env
+
+
+def imported(args, cwd):
+    """Run prysk with args, returning the names of the modules it imported"""
+    output = cwd / "modules.txt"
+    command = [sys.executable, "-c", _SCRIPT, f"{output}", *args]
+    process = subprocess.run(command, cwd=cwd, env=environment(), capture_output=True)
+    assert process.returncode == 0, process.stderr
+    return set(output.read_text(encoding="utf-8").splitlines())
+
+
+def importtime(args, cwd, runs=3):
+    """Run python with args, returning the least total import time (s) of runs"""
+    command = [sys.executable, "-X", "importtime", *args]
+    # The first run compiles the modules, like an installation does
+    subprocess.run(command, cwd=cwd, env=environment(), capture_output=True)
+    totals = []
+    for _ in range(runs):
+        process = subprocess.run(
+            command, cwd=cwd, env=environment(), capture_output=True
+        )
+        assert process.returncode == 0, process.stderr
+        total = 0
+        for line in process.stderr.decode().splitlines():
+            if line.startswith("import time:") and "self [us]" not in line:
+                total += int(line[len("import time:") :].split("|")[0])
+        totals.append(total / 1e6)
+    return min(totals)
+
+
+def test_version_only_imports_the_command_line_parser(tmp_path):
+    modules = imported(["--version"], tmp_path)
+    assert "prysk.options" in modules
+    for name in (*DEFERRED, "prysk.settings", "prysk.test", "rich", "tempfile"):
+        assert name not in modules
+
+
+@pytest.mark.parametrize("args", [[], ["--verbose"]])
+def test_single_test_only_imports_what_it_needs(tmp_path, args):
+    (tmp_path / "echo.t").write_bytes(b"  $ echo hi\n  hi\n")
+    modules = imported([*args, "echo.t"], tmp_path)
+    assert "prysk.test" in modules
+    for name in DEFERRED:
+        assert name not in modules
+
+
+def test_version_imports_within_budget(tmp_path):
+    baseline = importtime(["-c", "pass"], tmp_path)
+    assert (
+        importtime(["-m", "prysk", "--version"], tmp_path) < VERSION_BUDGET * baseline
+    )
+
+
+def test_single_test_imports_within_budget(tmp_path):
+    (tmp_path / "echo.t").write_bytes(b"  $ echo hi\n  hi\n")
+    baseline = importtime(["-c", "pass"], tmp_path)
+    assert importtime(["-m", "prysk", "echo.t"], tmp_path) < TEST_BUDGET * baseline
@@ -1,9 +1,14 @@
+import shutil
 from pathlib import Path
 
+import pytest
+
 from prysk.test import (
     _findtests,
     cwd,
+    testfile,
 )
+from prysk.test import test as run
 
 
 def create_directory(root, name):
@@ -53,3 +58,79 @@ def test_findtests_accepts_explicit_dirs(tmp_path):
     _ = create_file(hidden_subdir, "sub_visible.t", "")
     expected = (file,)
     assert tuple(_findtests([hidden_directory])) == expected
+
+
+def test_result_contains_timings_of_commands():
+    lines = b"  $ false\n  [1]\n  $ sleep 0.2\n  > true\n\n  $ echo x\n  x\n"
+    result = run(lines, cputimes=True)
+    assert [(t.line, t.command, t.returncode) for t in result.timings] == [
+        (1, b"false", 1),
+        (3, b"sleep 0.2", 0),
+        (6, b"echo x", 0),
+    ]
+    assert result.timings[1].wall >= 0.2
+    assert all(t.cpu is not None and t.cpu >= 0 for t in result.timings)
+
+
+def test_cpu_times_are_only_recorded_on_request():
+    result = run(b"  $ true\n  $ echo x\n  x\n")
+    assert [t.cpu for t in result.timings] == [None, None]
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="requires bash")
+def test_cpu_times_of_unknown_format_are_left_out():
+    # bash lets functions take precedence over builtins, like times
+    lines = b"  $ times() { echo 0.01s 0.02s; }\n  $ true\n"
+    result = run(lines, shell=shutil.which("bash"), cputimes=True)
+    assert [t.cpu for t in result.timings] == [None, None]
+
+
+def test_output_is_normalized_after_escaping(monkeypatch, tmp_path):
+    monkeypatch.setenv("TMPDIR", f"{tmp_path}")
+    lines = [b"  $ printf 'pid 42\\t%s\\n' \"$TMPDIR\"\n"]
+    normalize = [(rb"pid (\d+)", rb"process \1"), (rb"\\t", b" ")]
+    result = run(lines, normalize=normalize)
+    assert result.postout[1:] == [b"  process 42 $TMPDIR (esc)\n"]
+
+
+def test_output_is_normalized_line_by_line():
+    lines = [b"  $ printf 'a  \\nb\\n'\n", b"  a b\n"]
+    result = run(lines, normalize=[(rb"\s+", b" ")])
+    assert result.postout[1:] == [b"  a \n", b"  b\n"]
+    assert result.diff
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        (rb"^foo", [b"  x\n", b"  N 1\n", b"  N 2\n"]),
+        (rb"\d$", [b"  x\n", b"  foo N\n", b"  foo N\n"]),
+        (rb"\Afoo", [b"  x\n", b"  N 1\n", b"  N 2\n"]),
+        (rb"(?<!\n)foo", [b"  x\n", b"  N 1\n", b"  N 2\n"]),
+    ],
+)
+def test_anchored_substitutions_apply_to_each_line(pattern, expected):
+    lines = [b"  $ printf 'x\\nfoo 1\\nfoo 2\\n'\n"]
+    result = run(lines, normalize=[(pattern, b"N")])
+    assert result.postout[1:] == expected
+
+
+def test_fd_framing_is_hidden_from_traced_commands():
+    lines = b'  $ set -x\n  $ echo "${_prysk_ack-unset}"\n  + echo unset\n  unset\n'
+    result = run(lines, framing="fd")
+    assert not result.diff
+
+
+def test_literally_matching_invalid_patterns_are_left_out():
+    lines = b'  $ printf "a** (re)\\nb\\n"\n  a** (re)\n  b** (re)\n'
+    result = run(lines)
+    assert result.diff
+    assert [line for line, _ in result.invalid] == [3]
+
+
+def test_test_returns_lists(tmp_path):
+    path = tmp_path / "echo.t"
+    path.write_bytes(b"  $ echo hi\n  hi\n")
+    for refout, postout, _ in (run(path.read_bytes()), testfile(path)):
+        assert isinstance(refout, list) and isinstance(postout, list)
+        assert refout + postout[1:] == [b"  $ echo hi\n", b"  hi\n", b"  hi\n"]
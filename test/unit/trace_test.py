@@ -0,0 +1,39 @@
+import json
+import threading
+
+from prysk.trace import (
+    span,
+    start,
+    stop,
+)
+
+
+def _work():
+    with span("worker"):
+        pass
+
+
+def test_spans_are_recorded_on_one_track_per_thread(tmp_path):
+    tracer = start()
+    try:
+        with span("main", path="a.t"):
+            worker = threading.Thread(target=_work, name="prysk_0")
+            worker.start()
+            worker.join()
+    finally:
+        assert stop() is tracer
+    with span("ignored"):
+        pass
+
+    tracer.save(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+
+    names = {e["tid"]: e["args"]["name"] for e in events if e["ph"] == "M"}
+    spans = {e["name"]: e for e in events if e["ph"] == "X"}
+    assert sorted(spans) == ["main", "worker"]
+    assert names[spans["worker"]["tid"]] == "prysk_0"
+    assert names[spans["main"]["tid"]] == threading.current_thread().name
+    assert spans["main"]["args"] == {"path": "a.t"}
+    main, worker = spans["main"], spans["worker"]
+    assert main["ts"] <= worker["ts"]
+    assert worker["ts"] + worker["dur"] <= main["ts"] + main["dur"]
@@ -0,0 +1,58 @@
+import os
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from prysk import xunit
+from prysk.parallel import runparallel
+from prysk.test import (
+    Result,
+    runtests,
+)
+
+
+def _tests(count):
+    return [
+        (Path(f"test-{i}.t"), lambda: Result([b"  $ a\n"], [b"  $ a\n"], []))
+        for i in range(count)
+    ]
+
+
+def test_report_is_valid_while_tests_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(xunit, "_FLUSH_INTERVAL", 0)
+    xmlpath = tmp_path / "report.xml"
+    tests = xunit.runxunit(_tests(3), xmlpath)
+    for i, (_path, test) in enumerate(tests, 1):
+        test()
+        (tmp,) = (p for p in tmp_path.iterdir() if p != xmlpath)
+        suite = ET.parse(tmp).getroot()
+        assert suite.get("tests") == f"{i}"
+        assert len(suite.findall("testcase")) == i
+    assert os.listdir(tmp_path) == ["report.xml"]
+    assert ET.parse(xmlpath).getroot().get("tests") == "3"
+
+
+def test_interrupted_run_leaves_partial_report(tmp_path):
+    xmlpath = tmp_path / "report.xml"
+    tests = xunit.runxunit(_tests(3), xmlpath)
+    _path, test = next(tests)
+    test()
+    next(tests)
+    tests.close()
+    assert os.listdir(tmp_path) == ["report.xml"]
+    suite = ET.parse(xmlpath).getroot()
+    assert suite.get("tests") == "1"
+    assert [t.get("name") for t in suite.findall("testcase")] == ["test-0.t"]
+
+
+def test_report_contains_durations_of_parallel_tests(tmp_path):
+    for name in ("a.t", "b.t"):
+        (tmp_path / name).write_bytes(b"  $ sleep 0.3\n")
+    tmpdir = tmp_path / "tmp"
+    tmpdir.mkdir()
+    tests = runtests([tmp_path], tmpdir, ["/bin/sh"])
+    xmlpath = tmp_path / "report.xml"
+    for _path, test in xunit.runxunit(runparallel(tests, jobs=2), xmlpath):
+        test()
+    testcases = ET.parse(xmlpath).getroot().findall("testcase")
+    # b.t finishes while a.t is waited for, its duration must not be 0
+    assert [float(t.get("time")) >= 0.3 for t in testcases] == [True, True]